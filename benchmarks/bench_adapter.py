@@ -0,0 +1,171 @@
+"""
+Benchmark of ViteJsAdapter operations against local mock VITE node (benchmarks/mock_node.py)
+
+Run from the repository root:
+python -m benchmarks.bench_adapter --iterations 20 --wallets 100 --page-sizes 20,100,1000 --latency 20
+python -m benchmarks.bench_adapter --worker --operations balance,balances,transactions --output bench.json
+python -m benchmarks.bench_adapter --rpc --operations balance,balances (balance reads served by ViteRPC)
+
+Prints (or writes to --output) JSON with calls, errors, ops/sec and p50 / p99 / max latency (ms)
+of every operation, peak RSS of python and NodeJS processes and the mock node config,
+so results can be compared across releases.
+"""
+import platform
+import subprocess
+import argparse
+import resource
+import time
+import json
+import sys
+import os
+
+from src import ViteJsAdapter
+from .mock_node import MockNode, MockLedger
+
+
+OPERATIONS = ('create', 'create_batch', 'derive', 'balance', 'balances', 'transactions', 'update', 'send', 'listener')
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def measure(call, iterations: int, before=None) -> dict:
+    """
+    Run call() iterations times, response with error counts as failed call
+    :param call: function() -> response dict
+    :param iterations: int
+    :param before: function(), run before every call, not measured (i.e. to add pending blocks)
+    """
+    latencies = []
+    errors = 0
+
+    for _ in range(iterations):
+        if before:
+            before()
+
+        started = time.perf_counter()
+        response = call()
+        latencies.append(time.perf_counter() - started)
+        errors += bool(response.get('error'))
+
+    latencies.sort()
+    return {
+        'calls': iterations,
+        'errors': errors,
+        'ops_per_sec': round(iterations / sum(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+
+
+def peak_rss() -> dict:
+    """Peak RSS in MB of this process and of the largest finished NodeJS process"""
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return {'python_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+            'nodejs_mb': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)}
+
+
+def node_version() -> str | None:
+    try:
+        return subprocess.run(['node', '--version'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ViteJsAdapter benchmark with local mock VITE node')
+    parser.add_argument('--operations', default=','.join(OPERATIONS), help=f"comma separated: {', '.join(OPERATIONS)}")
+    parser.add_argument('--iterations', type=int, default=20, help='calls of every operation')
+    parser.add_argument('--wallets', type=int, default=100, help='wallets of balances and listener passes')
+    parser.add_argument('--page-sizes', default='20,100,1000', help='comma separated get_transactions page sizes')
+    parser.add_argument('--worker', action='store_true', help='run calls through long-lived NodeJS worker')
+    parser.add_argument('--rpc', action='store_true', help='serve balance reads by ViteRPC, without NodeJS')
+    parser.add_argument('--mnemonics', default=None, help='wallet seed phrase, default is new wallet')
+    parser.add_argument('--latency', type=float, default=0, help='ms of every mock node request')
+    parser.add_argument('--jitter', type=float, default=0, help='ms, +- random latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='0-1, share of failed mock node requests')
+    parser.add_argument('--blocks', type=int, default=1000, help='height of every account')
+    parser.add_argument('--tokens', type=int, default=1, help='token balances of every account')
+    parser.add_argument('--data-size', type=int, default=0, help='bytes of data field of every block')
+    parser.add_argument('--output', default=None, help='JSON file path, default is stdout')
+    args = parser.parse_args()
+
+    operations = args.operations.split(',')
+    ledger = MockLedger(args.blocks, args.tokens, data_size=args.data_size)
+    node = MockNode(ledger, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=0).start()
+
+    # NodeJS processes inherit the env, so all calls go to the mock node
+    os.environ.update(node.env)
+    provider = ViteJsAdapter(nodejs_logs=False, debug=False, worker=args.worker, metrics=True, rpc=args.rpc)
+
+    mnemonics = args.mnemonics or provider.create_wallet()['data']['mnemonics']
+    derived = provider.derive_addresses(mnemonics, range(max(args.wallets, 2)))['data']
+    wallets = [{'address': wallet['address'], 'mnemonics': mnemonics, 'address_id': wallet['address_id']}
+               for wallet in derived]
+    sender, recipient = wallets[0], wallets[1]
+    results = dict()
+
+    for operation in operations:
+        match operation:
+            case 'create':
+                results[operation] = measure(provider.create_wallet, args.iterations)
+            case 'create_batch':
+                results[f'{operation}_{args.wallets}'] = measure(
+                    lambda: provider.create_wallets(args.wallets), args.iterations)
+            case 'derive':
+                # Keyring would answer repeated derivations without NodeJS call
+                results[operation] = measure(
+                    lambda: (provider.keyring.clear(), provider.derive_addresses(mnemonics, range(10)))[1],
+                    args.iterations)
+            case 'balance':
+                results[operation] = measure(lambda: provider.get_balance(address=sender['address']), args.iterations)
+            case 'balances':
+                results[f'{operation}_{len(wallets)}'] = measure(
+                    lambda: provider.get_balances(wallets, cached=False), args.iterations)
+            case 'transactions':
+                for page_size in map(int, args.page_sizes.split(',')):
+                    results[f'{operation}_{page_size}'] = measure(
+                        lambda: provider.get_transactions(sender['address'], page_size=page_size), args.iterations)
+            case 'update':
+                results[operation] = measure(
+                    lambda: provider.get_updates(**recipient), args.iterations,
+                    before=lambda: ledger.credit(recipient['address']))
+            case 'send':
+                results[operation] = measure(
+                    lambda: provider.send_transaction(recipient['address'], mnemonics, ledger.tokens[0]['tokenId'], 1,
+                                                      address=sender['address']), args.iterations)
+            case 'listener':
+                # One pass of 'poll' mode listener: balances of all wallets, receive wallets with pending blocks
+                filter_ = provider.transaction_filter(['__all__'])
+                results[f'{operation}_pass_{len(wallets)}'] = measure(
+                    lambda: provider._poll_wallets(wallets, filter_, None) or {'error': 0}, args.iterations,
+                    before=lambda: ledger.credit(wallets[-1]['address']))
+            case _:
+                parser.error(f"unknown operation {operation}")
+
+    provider.close()
+    node.stop()
+
+    report = {
+        'operations': results,
+        'phases': {operation: stats['phases'] for operation, stats in provider.metrics_stats()['operations'].items()},
+        'peak_rss': peak_rss(),
+        'config': {**{name: value for name, value in vars(args).items() if name not in ('mnemonics', 'output')},
+                   'python': platform.python_version(), 'node': node_version(), 'platform': platform.platform(),
+                   'mock_requests': node.requests, 'mock_errors': node.errors},
+        }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark of typed result records (src/models.py) against the dict representation of transactions
+
+Run from the repository root:
+python -m benchmarks.bench_models --transactions 100000 --tokens 4 --page-size 100
+
+Transactions are generated by MockLedger and parsed from JSON pages (as responses of the node are),
+prints JSON with memory held by the dicts and by Transaction records built from them (tracemalloc,
+after the dicts are dropped), time of the conversion from dicts and of summing amounts
+(int and Decimal in token units).
+"""
+import tracemalloc
+import argparse
+import json
+import time
+import gc
+
+from decimal import Decimal
+
+from src.tokens import TokenRegistry
+from src.models import Transaction
+from .mock_node import MockLedger
+
+
+def pages(args) -> list[str]:
+    """JSON pages of account blocks, account chains of args.accounts addresses"""
+    ledger = MockLedger(args.transactions, args.tokens, data_size=args.data_size)
+    addresses = [f"vite_{str(index).zfill(50)}" for index in range(args.accounts)]
+    blocks = [ledger._account_block(addresses[height % args.accounts], height)
+              for height in range(args.transactions, 0, -1)]
+    return [json.dumps(blocks[index:index + args.page_size]) for index in range(0, len(blocks), args.page_size)]
+
+
+def held(build) -> tuple[object, int]:
+    """Result of build() and bytes it keeps allocated"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(call, repeat: int) -> float:
+    """Best time of repeat calls in ms"""
+    best = float('inf')
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - started)
+
+    return round(best * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Typed result records benchmark')
+    parser.add_argument('--transactions', type=int, default=100_000)
+    parser.add_argument('--tokens', type=int, default=4, help='distinct tokens of the transactions')
+    parser.add_argument('--accounts', type=int, default=10, help='distinct addresses of the transactions')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--data-size', type=int, default=0, help='bytes of block data field')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    raw = pages(args)
+
+    # Dicts as returned by get_transactions() pages
+    dicts, dicts_bytes = held(lambda: [block for page in raw for block in json.loads(page)])
+
+    # Records built page by page, so the dicts of only one page are alive at once, token infos are shared
+    registry = TokenRegistry()
+    records, records_bytes = held(
+        lambda: [Transaction.from_dict(block, registry) for page in raw for block in json.loads(page)])
+
+    print(json.dumps({
+        'transactions': len(dicts),
+        'tokens': args.tokens,
+        'accounts': args.accounts,
+        'memory_mb': {
+            'dicts': round(dicts_bytes / 2 ** 20, 2),
+            'records': round(records_bytes / 2 ** 20, 2),
+            'ratio': round(dicts_bytes / max(records_bytes, 1), 2),
+        },
+        'convert_ms': timed(lambda: [Transaction.from_dict(block, registry) for block in dicts], args.repeat),
+        'sum_amount_ms': {
+            'dicts': timed(lambda: sum(int(block['amount']) for block in dicts), args.repeat),
+            'records': timed(lambda: sum(record.amount for record in records), args.repeat),
+        },
+        'sum_value_ms': {
+            'dicts': timed(lambda: sum(Decimal(block['amount']).scaleb(-int(block['tokenInfo']['decimals']))
+                                       for block in dicts), args.repeat),
+            'records': timed(lambda: sum(record.value for record in records), args.repeat),
+        },
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark of local PoW solver (src/pow.py)
+
+Run from the repository root:
+python -m benchmarks.bench_pow --processes 4 --difficulty 1000000 --solves 5
+
+Prints JSON with hashes/sec of every core (all cores hashing at once)
+and time to solve nonce for given difficulty (the first solve includes start of the processes).
+"""
+import multiprocessing
+import argparse
+import json
+import time
+import os
+
+from src import pow
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local PoW solver benchmark')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds of hashing per core')
+    parser.add_argument('--difficulty', type=int, default=1_000_000)
+    parser.add_argument('--solves', type=int, default=5)
+    args = parser.parse_args()
+
+    # Every core hashing at once, rates are lower than of single idle core
+    with multiprocessing.Pool(args.processes) as pool:
+        per_core = pool.map(pow.hashrate, [args.duration] * args.processes)
+
+    # Processes are started by the first solve and kept, as by the adapter
+    solver = pow.PowSolver(args.processes)
+    solve_times = []
+
+    try:
+        for _ in range(args.solves):
+            data_hash = os.urandom(32).hex()
+            started = time.perf_counter()
+            nonce = solver.solve(args.difficulty, data_hash)
+            solve_times.append(time.perf_counter() - started)
+            assert pow.check_nonce(args.difficulty, data_hash, nonce)
+    finally:
+        solver.close()
+
+    print(json.dumps({
+        'processes': args.processes,
+        'hashes_per_sec_per_core': [round(rate) for rate in per_core],
+        'hashes_per_sec_total': round(sum(per_core)),
+        'difficulty': args.difficulty,
+        'solve_sec_avg': round(sum(solve_times) / len(solve_times), 3),
+        'solve_sec_max': round(max(solve_times), 3),
+        'expected_sec': round(args.difficulty / sum(per_core), 3),
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
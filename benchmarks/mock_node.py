@@ -0,0 +1,475 @@
+"""
+Local mock of the VITE node (gvite) JSON-RPC API over HTTP and websocket, for benchmarks
+without hitting public nodes. Only calls used by vitejs/*.js scripts are served.
+
+Run from the repository root:
+python -m benchmarks.mock_node --port 23456 --latency 20 --jitter 10 --error-rate 0.01
+
+and point the scripts to it:
+VITE_HTTP_NODE=http://127.0.0.1:23456/ VITE_WS_NODE=ws://127.0.0.1:23456/
+
+Ledger is kept in memory: every account starts with `blocks` blocks, `tokens` token balances
+and `pending` unreceived blocks. Sent blocks move to the unreceived blocks of the recipient
+(subscribers are notified), received ones are removed from them, so update, send and
+the transaction listener see consistent state.
+"""
+import itertools
+import threading
+import argparse
+import hashlib
+import base64
+import random
+import struct
+import json
+import time
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+VITE_TOKEN_ID = 'tti_5649544520544f4b454e6e40'
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def _hash(*parts) -> str:
+    return hashlib.sha256(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def _token(index: int) -> dict:
+    if not index:
+        return {'tokenName': 'Vite Token', 'tokenSymbol': 'VITE', 'decimals': 18, 'tokenId': VITE_TOKEN_ID, 'index': 0}
+
+    token_id = f"tti_{_hash('token', index)[:24]}"
+    return {'tokenName': f'Token {index}', 'tokenSymbol': f'TKN{index}', 'decimals': 8, 'tokenId': token_id,
+            'index': index}
+
+
+class MockLedger:
+    """In-memory account chains and unreceived blocks"""
+
+    def __init__(self, blocks: int = 100, tokens: int = 1, pending: int = 0, data_size: int = 0,
+                 pow_difficulty: str = None):
+        """
+        :param blocks: int, initial height of every account
+        :param tokens: int, number of token balances of every account (also tokens of generated blocks)
+        :param pending: int, initial number of unreceived blocks of every account
+        :param data_size: int, bytes of the data field of generated blocks (result size)
+        :param pow_difficulty: str, PoW difficulty required for every block, default is None (enough quota)
+        """
+        self.blocks = blocks
+        self.tokens = [_token(index) for index in range(max(tokens, 1))]
+        self.pending = pending
+        self.data = base64.b64encode(b'x' * data_size).decode() if data_size else None
+        self.pow_difficulty = pow_difficulty
+        self.snapshot_height = 1
+        self._sends = itertools.count(1)
+        self._accounts: dict[str, dict] = dict()
+        self._by_hash: dict[str, dict] = dict()
+        self._subscribers: list = list()
+        self._lock = threading.RLock()
+
+    def _account(self, address: str) -> dict:
+        account = self._accounts.get(address)
+
+        if account is None:
+            account = self._accounts[address] = {'height': self.blocks, 'blocks': dict(), 'unreceived': list()}
+
+            for _ in range(self.pending):
+                account['unreceived'].append(self._generated_send(address))
+
+        return account
+
+    def _generated_send(self, to_address: str) -> dict:
+        # Unreceived block from made up sender account
+        from_address = f"vite_{_hash('sender', to_address)[:50]}"
+        return self._block(from_address, 2, next(self._sends), to_address=to_address, amount=str(10 ** 18))
+
+    def _block(self, address: str, block_type: int, height: int, to_address: str = None, amount: str = '0',
+               token: dict = None, hash_: str = None, previous_hash: str = None, from_address: str = None,
+               send_block_hash: str = None) -> dict:
+        token = token or self.tokens[height % len(self.tokens)]
+
+        return {
+            'blockType': block_type, 'height': str(height),
+            'hash': hash_ or _hash(address, height),
+            'previousHash': previous_hash or (_hash(address, height - 1) if height > 1 else '0' * 64),
+            'address': address, 'fromAddress': from_address or address, 'toAddress': to_address or address,
+            'sendBlockHash': send_block_hash or '0' * 64,
+            'tokenId': token['tokenId'], 'tokenInfo': token, 'amount': amount, 'fee': '0',
+            'data': self.data, 'difficulty': None, 'nonce': None, 'quotaByStake': '21000', 'totalQuota': '21000',
+            'publicKey': base64.b64encode(bytes.fromhex(_hash('key', address))).decode(),
+            'signature': base64.b64encode(bytes.fromhex(_hash('sig', address, height) * 2)).decode(),
+            'confirmations': '1', 'firstSnapshotHash': _hash('snapshot', height), 'timestamp': 1_600_000_000 + height,
+            'receiveBlockHeight': None, 'receiveBlockHash': None,
+        }
+
+    def _account_block(self, address: str, height: int) -> dict:
+        account = self._account(address)
+        block = account['blocks'].get(height)
+
+        if block is None:
+            # Generated history: receive blocks of the account tokens
+            block = self._block(address, 4, height, amount=str(10 ** 18), from_address=f"vite_{_hash(height)[:50]}")
+
+        return block
+
+    def _balance_info(self, address: str, count: int) -> dict:
+        balances = {token['tokenId']: {'tokenInfo': token, 'balance': str(10 ** 21)} for token in self.tokens}
+        return {'address': address, 'blockCount': str(count), 'balanceInfoMap': balances}
+
+    def subscribe(self, callback) -> None:
+        """:param callback: function(address, block) called for every new unreceived block"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def credit(self, address: str, count: int = 1) -> None:
+        """Add new unreceived blocks to the account, i.e. to benchmark receiving repeatedly"""
+        with self._lock:
+            account = self._account(address)
+            blocks = [self._generated_send(address) for _ in range(count)]
+            account['unreceived'] += blocks
+            self.snapshot_height += 1
+            subscribers = list(self._subscribers)
+
+        for block in blocks:
+            for callback in subscribers:
+                callback(address, block)
+
+    def apply(self, block: dict) -> None:
+        """Apply signed block sent with ledger_sendRawTransaction"""
+        with self._lock:
+            account = self._account(block['address'])
+            height = int(block['height'])
+
+            if height != account['height'] + 1:
+                raise ValueError(f"verify prevHash failed, height {height} != {account['height'] + 1}")
+
+            token = next((token for token in self.tokens if token['tokenId'] == block.get('tokenId')), self.tokens[0])
+            stored = self._block(block['address'], int(block['blockType']), height, block.get('toAddress'),
+                                 str(block.get('amount') or '0'), token, block.get('hash'), block.get('previousHash'),
+                                 send_block_hash=block.get('sendBlockHash'))
+            account['height'] = height
+            account['blocks'][height] = stored
+            self._by_hash[stored['hash']] = stored
+            self.snapshot_height += 1
+            recipient = None
+
+            if stored['blockType'] == 2:
+                recipient = stored['toAddress']
+                self._account(recipient)['unreceived'].append(stored)
+            else:
+                account['unreceived'] = [unreceived for unreceived in account['unreceived']
+                                         if unreceived['hash'] != stored['sendBlockHash']]
+
+            subscribers = list(self._subscribers) if recipient else []
+
+        for callback in subscribers:
+            callback(recipient, stored)
+
+    def call(self, method: str, params: list):
+        """Result of JSON-RPC call, raises KeyError for unknown method"""
+        with self._lock:
+            match method:
+                case 'ledger_getAccountInfoByAddress':
+                    return self._balance_info(params[0], self._account(params[0])['height'])
+                case 'ledger_getUnreceivedBlocksInfoByAddress':
+                    return self._balance_info(params[0], len(self._account(params[0])['unreceived']))
+                case 'ledger_getUnreceivedBlocksByAddress':
+                    address, page_index, page_size = params[0], int(params[1]), int(params[2])
+                    return self._account(address)['unreceived'][page_index * page_size:(page_index + 1) * page_size]
+                case 'ledger_getAccountBlocksByAddress':
+                    # Pages from the newest block
+                    address, page_index, page_size = params[0], int(params[1]), int(params[2])
+                    top = self._account(address)['height'] - page_index * page_size
+                    return [self._account_block(address, height)
+                            for height in range(top, max(top - page_size, 0), -1)]
+                case 'ledger_getLatestAccountBlock':
+                    height = self._account(params[0])['height']
+                    return self._account_block(params[0], height) if height else None
+                case 'ledger_getAccountBlockByHash':
+                    return self._by_hash.get(params[0])
+                case 'ledger_getPoWDifficulty':
+                    return {'requiredQuota': '21000', 'difficulty': self.pow_difficulty, 'qc': '0',
+                            'isCongestion': False}
+                case 'util_getPoWNonce':
+                    return base64.b64encode(bytes(8)).decode()
+                case 'ledger_getSnapshotChainHeight':
+                    return str(self.snapshot_height)
+                case 'ledger_sendRawTransaction':
+                    self.apply(params[0])
+                    return None
+                case 'contract_getTokenInfoList':
+                    page_index, page_size = int(params[0]), int(params[1])
+                    return {'totalCount': len(self.tokens),
+                            'tokenInfoList': self.tokens[page_index * page_size:(page_index + 1) * page_size]}
+
+        raise KeyError(method)
+
+
+class MockNode:
+    """
+    JSON-RPC server of MockLedger: POST requests over HTTP and websocket connections
+    (GET with Upgrade header) on the same port. Every request waits latency +- jitter ms,
+    error_rate of requests fails with JSON-RPC error.
+    """
+
+    def __init__(self, ledger: MockLedger = None, host: str = '127.0.0.1', port: int = 0, latency: float = 0,
+                 jitter: float = 0, error_rate: float = 0, seed: int = None):
+        """
+        :param ledger: MockLedger, default is MockLedger()
+        :param host: str
+        :param port: int, 0 for random free port
+        :param latency: float, ms of every request (JSON-RPC batch counts as one request)
+        :param jitter: float, ms, latency is random between latency - jitter and latency + jitter
+        :param error_rate: float, 0-1, probability of failed request
+        :param seed: int, seed of latency and errors
+        """
+        self.ledger = ledger or MockLedger()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests: int = 0
+        self.errors: int = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def http_url(self) -> str:
+        return f"http://{self.server.server_address[0]}:{self.server.server_address[1]}/"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.server.server_address[0]}:{self.server.server_address[1]}/"
+
+    @property
+    def env(self) -> dict:
+        """Env variables pointing NodeJS scripts to this node"""
+        return {'VITE_HTTP_NODE': self.http_url, 'VITE_WS_NODE': self.ws_url}
+
+    def start(self) -> 'MockNode':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)) / 1000
+
+    def handle(self, payload: dict | list) -> dict | list:
+        """JSON-RPC response of single or batch request (without latency)"""
+        with self._lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+            self.errors += failed
+
+        if isinstance(payload, list):
+            return [self._response(request, failed) for request in payload]
+        return self._response(payload, failed)
+
+    def _response(self, request: dict, failed: bool) -> dict:
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+
+        if failed:
+            return {**response, 'error': {'code': -32000, 'message': 'mock node error'}}
+
+        try:
+            return {**response, 'result': self.ledger.call(request['method'], request.get('params') or [])}
+        except KeyError:
+            return {**response, 'error': {'code': -32601, 'message': f"the method {request['method']} does not exist"}}
+        except ValueError as e:
+            return {**response, 'error': {'code': -35002, 'message': str(e)}}
+
+    def _handler(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, keep-alive clients would wait for delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                time.sleep(node._delay())
+                body = json.dumps(node.handle(payload)).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.headers.get('Upgrade', '').lower() != 'websocket':
+                    self.send_error(404)
+                    return
+
+                accept = base64.b64encode(hashlib.sha1((self.headers['Sec-WebSocket-Key'] + WS_GUID).encode()).digest())
+                self.send_response(101)
+                self.send_header('Upgrade', 'websocket')
+                self.send_header('Connection', 'Upgrade')
+                self.send_header('Sec-WebSocket-Accept', accept.decode())
+                self.end_headers()
+                self.wfile.flush()
+
+                _WebSocket(node, self.rfile, self.wfile).serve()
+                self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class _WebSocket:
+    # Server side of one websocket connection: JSON-RPC requests in text frames, every
+    # request is answered in its own thread (after latency), subscriptions get events
+
+    def __init__(self, node: MockNode, rfile, wfile):
+        self.node = node
+        self.rfile = rfile
+        self.wfile = wfile
+        self.subscriptions: dict[str, str] = dict()
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def serve(self) -> None:
+        self.node.ledger.subscribe(self._notify)
+
+        try:
+            while not self.closed:
+                opcode, payload = self._read_frame()
+
+                if opcode == 8:
+                    self._send(8, payload[:2])
+                    break
+                elif opcode == 9:
+                    self._send(10, payload)
+                elif opcode in (1, 2):
+                    threading.Thread(target=self._answer, args=(json.loads(payload),), daemon=True).start()
+        except (ConnectionError, OSError, ValueError, struct.error):
+            pass
+        finally:
+            self.closed = True
+            self.node.ledger.unsubscribe(self._notify)
+
+    def _answer(self, payload: dict | list) -> None:
+        time.sleep(self.node._delay())
+        requests = payload if isinstance(payload, list) else [payload]
+        responses = list()
+
+        for request in requests:
+            match request.get('method'):
+                case 'subscribe_subscribe':
+                    subscription = f"0x{_hash('subscription', id(self), len(self.subscriptions))[:32]}"
+                    event, *args = request.get('params') or [None]
+                    self.subscriptions[subscription] = args[0] if args else None
+                    responses.append({'jsonrpc': '2.0', 'id': request.get('id'), 'result': subscription})
+                case 'subscribe_unsubscribe':
+                    result = self.subscriptions.pop((request.get('params') or [None])[0], None) is not None
+                    responses.append({'jsonrpc': '2.0', 'id': request.get('id'), 'result': result})
+                case _:
+                    responses.append(self.node.handle(request))
+
+        self._send_json(responses if isinstance(payload, list) else responses[0])
+
+    def _notify(self, address: str, block: dict) -> None:
+        for subscription, subscribed in list(self.subscriptions.items()):
+            if subscribed in (address, None):
+                result = [{'hash': block['hash'], 'height': block['height'], 'received': False, 'removed': False}]
+                self._send_json({'jsonrpc': '2.0', 'method': 'subscribe_subscription',
+                                 'params': {'subscription': subscription, 'result': result}})
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self.rfile.read(size)
+
+        if len(data) < size:
+            raise ConnectionError('websocket closed')
+        return data
+
+    def _read_frame(self) -> tuple[int, bytes]:
+        # Client frames are always masked, fragmented messages are joined
+        message, first_opcode = b'', None
+
+        while True:
+            head, length = self._read_exact(2)
+            opcode = head & 0x0f
+            length &= 0x7f
+
+            if length == 126:
+                length = struct.unpack('>H', self._read_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack('>Q', self._read_exact(8))[0]
+
+            mask = self._read_exact(4)
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(self._read_exact(length)))
+
+            # Control frames can come between fragments
+            if opcode >= 8:
+                return opcode, payload
+
+            first_opcode = first_opcode or opcode
+            message += payload
+
+            if head & 0x80:
+                return first_opcode, message
+
+    def _send_json(self, message: dict | list) -> None:
+        self._send(1, json.dumps(message).encode())
+
+    def _send(self, opcode: int, payload: bytes) -> None:
+        length = len(payload)
+
+        if length < 126:
+            header = struct.pack('>BB', 0x80 | opcode, length)
+        elif length < 2 ** 16:
+            header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, 127, length)
+
+        with self._lock:
+            if self.closed and opcode != 8:
+                return
+            try:
+                self.wfile.write(header + payload)
+                self.wfile.flush()
+            except (OSError, ValueError):
+                # Connection reset or socket file already closed by the server
+                self.closed = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock VITE node (JSON-RPC over HTTP and websocket)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=23456)
+    parser.add_argument('--latency', type=float, default=0, help='ms of every request')
+    parser.add_argument('--jitter', type=float, default=0, help='ms, +- random latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='0-1, share of failed requests')
+    parser.add_argument('--blocks', type=int, default=100, help='initial height of every account')
+    parser.add_argument('--tokens', type=int, default=1, help='token balances of every account')
+    parser.add_argument('--pending', type=int, default=0, help='initial unreceived blocks of every account')
+    parser.add_argument('--data-size', type=int, default=0, help='bytes of data field of every block')
+    parser.add_argument('--pow-difficulty', default=None, help='PoW difficulty required for every block')
+    args = parser.parse_args()
+
+    ledger = MockLedger(args.blocks, args.tokens, args.pending, args.data_size, args.pow_difficulty)
+    node = MockNode(ledger, args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(' '.join(f'{name}={value}' for name, value in node.env.items()), flush=True)
+
+    try:
+        node.server.serve_forever()
+    except KeyboardInterrupt:
+        node.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -16,148 +16,512 @@ Author: blacktyg3r.com | BTLabs.tech
 import subprocess
 import threading
 import inspect
+import queue
+import json
 import time
 import os
 
-from .logger_ import get_logger
-
-
-DEFAULT_LOGGER = get_logger()
-SCRIPT_PATH = os.path.join(os.getcwd(), "vitejs/api_handler.js")
+from typing import Iterator, TextIO
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+from .tools import node_command, node_env, split_args, error_response, wallet_address, FRAME_SEPARATOR, PAYLOAD_FD_ENV
+from .tools import Response, landed_send
+from .tools import default_logger, SCRIPT_PATH, PAYLOAD_PIPE, BALANCE_BATCH_SIZE, CURSOR_PAGE_SIZE, HISTORY_PAGE_SIZE
+from .tools import RECEIVE_BATCH_SIZE, SEND_BATCH_TIMEOUT, SEND_CONFIRM_TIMEOUT, SEND_LANDED_WAIT, SEND_LANDED_POLL
+from .scheduler import WalletScheduler
+from .tokens import TokenRegistry, TransactionFilter
+from .cursor import CursorStore
+from .cache import LedgerCache
+from .keyring import Keyring
+from .worker import NodeWorker, WORKER_SCRIPT
+from .pow import PowSolver, POW_REQUIRED, POW_ATTEMPTS
+from .retry import Retrier, RetryPolicy
+from .metrics import Metrics, Profiler, call_phases
+from .logs import NodeLogForwarder, queue_logging
+from .models import Transaction
+from .rpc import ViteRPC
+from .export import export_transactions, RecordSink, CSV_FIELDS
+from .wallets import batch_sizes
+from .errors import error_code, raise_for_error
+from .async_adapter import AsyncViteJsAdapter
 
 
 class ViteJsAdapter:
     """
     Execute @vitejs functions via python class. Possible operations:
     - Create new VITE wallet | create_wallet()
+    - Create many wallets at once | create_wallets()
     - Get wallet transactions | transactions()
     - Receive pending transactions | update()
+    - Receive pending transactions of many wallets at once | receive_many()
     - Get wallet balance | get_balance()
+    - Get many wallets balances in one call | get_balances()
+    - Send many transactions from one account | send_batch()
+    - Derive wallet addresses from mnemonics | derive_addresses()
+    - Stream whole wallet history | iter_transactions(), export_transactions()
+
+    PoW for sending without quota is solved by the VITE node (pow_mode='remote')
+    or locally on all cores (pow_mode='local', see src/pow.py).
 
     Possible statuses: running, finished, failed
+
+    Concurrency: one adapter can be shared by many threads. Every call returns
+    its own Response (dict with .status), self.response and self.status are
+    the last result of the calling thread, so the listener thread and foreground
+    calls don't overwrite each other. Shared parts (keyring, cache, worker,
+    retry and metrics counters) are locked. map_balances() and map_transactions()
+    fan calls out over a bounded thread pool (threads), every call runs its own
+    NodeJS process (or shares the worker process).
+
+    By default every call runs new NodeJS process, with worker=True
+    one long-lived NodeJS process (vitejs/worker.js) serves all calls
+    and keeps the VITE node connection open between them. With rpc=True
+    balance reads by address skip NodeJS, they are plain JSON-RPC calls
+    made by src/rpc.py over keep-alive connections.
+
+    Every call is timed by phases (spawn, connect, rpc, serialize, parse),
+    see src/metrics.py, prometheus_metrics() and profile().
     """
 
-    def __init__(self, logger: object = None, nodejs_logs: bool = True, debug: bool = True, try_counter: int = 3, script_path: str = None):
+    def __init__(self, logger: object = None, nodejs_logs: bool = True, debug: bool = True, try_counter: int = 3,
+                 script_path: str = None, worker: bool = False, cache: LedgerCache | bool = None,
+                 pow_mode: str = 'remote', pow_processes: int = None, nodes: list[str] | str = None,
+                 hedge: bool = False, retry: RetryPolicy = None, metrics: Metrics | bool = True, threads: int = None,
+                 async_logs: bool = False, log_forwarder: NodeLogForwarder = None, rpc: ViteRPC | bool = False):
         """
         :param nodejs_logs: bool, forward logs from nodejs script
         :param debug: bool,  display debug logs
-        :param try_counter: int, how many try before failing
+        :param try_counter: int, how many re-tries of failed call (per call), used when retry is not set
         :param script_path: str, path to the api_handler.js script, default is "./vitejs/api_handler.js"
+        :param worker: bool, run calls through long-lived NodeJS worker process
+        :param cache: LedgerCache | bool, cache balances and transactions pages (True for default LedgerCache),
+                      entries of the address are invalidated by send_transaction() and get_updates(address=...)
+        :param pow_mode: str, 'remote' (util_getPoWNonce on VITE node) or 'local' (solved by src/pow.py)
+        :param pow_processes: int, number of processes solving local PoW, default is number of cores
+        :param nodes: list[str] | str, VITE node urls or path to JSON config file, calls are routed
+                      to the fastest healthy node (see vitejs/pool.js), default is single node from env
+        :param hedge: bool, with many nodes send slow reads to the second node too
+        :param retry: RetryPolicy, re-tries, backoff and deadline of calls (timeouts and connection errors)
+        :param metrics: Metrics | bool, latency histograms and counters of calls and listener (True for default Metrics),
+                        share one Metrics object to aggregate many adapters
+        :param threads: int, max number of calls running at once in map_balances() / map_transactions(),
+                        default is ThreadPoolExecutor default
+        :param async_logs: bool, logger handlers are served from a queue by background thread (see queue_logging()),
+                           so logging never blocks calls on console or file I/O
+        :param log_forwarder: NodeLogForwarder, dedup, sampling and rate limit of forwarded nodejs logs,
+                              default is NodeLogForwarder(logger)
+        :param rpc: ViteRPC | bool, serve balance reads by address straight from the VITE node over keep-alive
+                    HTTP connections, without NodeJS process (True for ViteRPC of the same nodes), default False runs
+                    all calls in NodeJS (with node pool routing, breaker and hedging of vitejs/pool.js)
         """
         self.listener_is_running: bool = False
         self.listener_thread: threading.Thread | None = None
+        self.listener_process: subprocess.Popen | None = None
+        self.listener_scheduler: WalletScheduler | None = None
+        self.listener_cursor: CursorStore | None = None
         self.nodejs_logs = nodejs_logs
         self.try_counter = try_counter
-        self.response: dict = dict()
-        self.last_log: str = ''
-        self.logger = logger if logger else DEFAULT_LOGGER
-        self.status = 'running'
+        self.logger = logger if logger else default_logger()
+        self.log_forwarder = log_forwarder or NodeLogForwarder(self.logger, enabled=nodejs_logs)
         self.script = script_path if script_path else SCRIPT_PATH
         self.debug = debug
+        self.worker: NodeWorker | None = None
+        self.keyring = Keyring()
+        self.cache: LedgerCache | None = LedgerCache() if cache is True else cache or None
+        self.pow_mode = pow_mode
+        self.pow_processes = pow_processes
+        self.pow_solver = PowSolver(pow_processes)
+        self.node_env = node_env(nodes, hedge)
+        self.rpc: ViteRPC | None = ViteRPC(nodes) if rpc is True else rpc or None
+
+        # Token list is read over JSON-RPC also when reads go through NodeJS (no idle connections are kept)
+        self.token_registry = TokenRegistry((self.rpc or ViteRPC(nodes, max_connections=0)).tokens)
+        self.retrier = Retrier(retry or RetryPolicy(retries=try_counter), self.logger)
+        self.metrics: Metrics | None = Metrics() if metrics is True else metrics or None
+        self.profiler = Profiler(self.logger)
+        self.threads = threads
+        self._executor: ThreadPoolExecutor | None = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        if async_logs:
+            queue_logging(self.logger)
+
+        if worker:
+            worker_script = os.path.join(os.path.dirname(self.script), WORKER_SCRIPT)
+            self.worker = NodeWorker(worker_script, self.logger, nodejs_logs=nodejs_logs, env=self.node_env,
+                                     log_forwarder=self.log_forwarder)
+
+    @property
+    def response(self) -> Response:
+        """Result of the last call made by the current thread"""
+        return getattr(self._local, 'response', None) or Response(status='running')
+
+    @property
+    def status(self) -> str:
+        """Status of the last call made by the current thread: running, finished, failed"""
+        return self.response.status
+
+    def _default_error_response(self, msg: str = None, code: str = 'unknown') -> Response:
+        response = Response(error_response(msg, code))
 
-    def _default_error_response(self, msg: str = None):
-        func_name = inspect.stack()[1].function
-        if msg is None:
-            msg = f"Unknown vitejs error"
+        if self.debug:
+            self.logger.error(f"{inspect.currentframe().f_back.f_code.co_name} | {response.status} | {response['msg']}")
 
-        self.status = 'failed'
+        return response
 
-        if self.debug:
-            self.logger.error(f"{func_name} | {self.status} | {msg}")
+    def _result(self, response: dict) -> Response:
+        # Final result of the public call, failed one is logged, kept as self.response of the calling thread
+        response = response if isinstance(response, Response) else Response(response)
 
-        return {'error': 1, 'msg': msg, 'data': None}
+        if self.debug and response.status == 'failed':
+            self.logger.error(f"{inspect.currentframe().f_back.f_code.co_name} | {response.status} | {response['msg']}")
 
-    def _run_command(self, command: list) -> dict:
+        self._local.response = response
+        return response
+
+    def _stream_command(self, command: list, on_start=None, timings: dict = None, stdin: str = None) -> Iterator[dict]:
         """
-        Run NodeJS scripts with subprocess.Popen(), parse stdout
-        and return dictionary with script payload.
+        Run NodeJS script with subprocess.Popen() and yield JSON frames from its payload channel.
+        Payload is sent on a dedicated pipe (VITE_PAYLOAD_FD), stdout carries only logs.
+        Where the pipe can't be passed (Windows) frames come on stdout prefixed with FRAME_SEPARATOR.
         :param command: Full NodeJS command as list
-        :return: dict
+        :param on_start: function called with started subprocess.Popen, i.e. to kill it from another thread
+        :param timings: dict, {'spawn': seconds, 'parse': seconds} to add time of starting the process
+                        and parsing the frames to
+        :param stdin: str, arguments too long for the command line (see split_args())
+        :return: Iterator of dicts
         """
-        logs_list = list()
+        timings = timings if timings is not None else dict.fromkeys(('spawn', 'parse'), 0.0)
+        stdin_ = subprocess.PIPE if stdin is not None else None
+        started = time.perf_counter()
 
-        # Run the command as subprocess and read output
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        if not PAYLOAD_PIPE:
+            env = {**os.environ, **self.node_env, PAYLOAD_FD_ENV: '1'}
+            process = subprocess.Popen(command, stdin=stdin_, stdout=subprocess.PIPE, text=True, env=env)
+            timings['spawn'] += time.perf_counter() - started
+            self._write_stdin(process, stdin)
 
-        # While process is running collect and filter logs
-        while True:
-            output = process.stdout.readline()
+            if on_start:
+                on_start(process)
 
-            if output == '' and process.poll() is not None:
-                # Process finished
-                break
+            try:
+                for line in process.stdout:
+                    if line.startswith(FRAME_SEPARATOR):
+                        yield self._parse_frame(line[1:], timings)
+                    else:
+                        self.log_forwarder.forward(line)
+            finally:
+                self._finish_process(process)
+            return
 
-            if output.strip().startswith('>>'):
-                # Filter logs from NodeJS to self.logger
-                line = output.strip().replace('>>', 'node.js >>')
+        read_fd, write_fd = os.pipe()
+        env = {**os.environ, **self.node_env, PAYLOAD_FD_ENV: str(write_fd)}
+        stdout = subprocess.PIPE if self.nodejs_logs else subprocess.DEVNULL
 
-                if self.nodejs_logs and self.last_log != line:
-                    self.logger.info(line)
+        try:
+            process = subprocess.Popen(command, stdin=stdin_, stdout=stdout, text=True, env=env, pass_fds=(write_fd,))
+        except Exception:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        timings['spawn'] += time.perf_counter() - started
+        self._write_stdin(process, stdin)
 
-                self.last_log = line
+        if on_start:
+            on_start(process)
 
-            elif output and not output.startswith((' >>', '>>')):
-                # Append parts of dictionary for return
-                logs_list.append(output)
+        if self.nodejs_logs:
+            threading.Thread(target=self._forward_logs, args=(process.stdout,), daemon=True).start()
 
-        # If process finished
-        if not process.poll():
+        try:
+            with os.fdopen(read_fd, 'rb') as payload:
+                for line in payload:
+                    if line.strip():
+                        yield self._parse_frame(line, timings)
+        finally:
+            self._finish_process(process)
+
+    @staticmethod
+    def _write_stdin(process: subprocess.Popen, stdin: str | None) -> None:
+        # Written in background, so the script's output is read meanwhile
+        def write() -> None:
             try:
-                # Serialize stdout output and return dict
-                logs_list = [line.replace('null', 'None') for line in logs_list]
-                logs_list = [line.replace('true', 'True') for line in logs_list]
-                logs_list = [line.replace('false', 'False') for line in logs_list]
-                logs_json = ''.join([line.replace('\n', '') for line in logs_list])
-                logs_dict = eval(logs_json)
-                return logs_dict
+                with process.stdin:
+                    process.stdin.write(stdin)
+            except (BrokenPipeError, OSError):
+                pass
+
+        if stdin is not None:
+            threading.Thread(target=write, daemon=True).start()
+
+    @staticmethod
+    def _parse_frame(line: str | bytes, timings: dict) -> dict:
+        started = time.perf_counter()
+        frame = json.loads(line)
+        timings['parse'] += time.perf_counter() - started
+        return frame
+
+    @staticmethod
+    def _finish_process(process: subprocess.Popen) -> None:
+        # Kill the script when caller stopped reading frames early
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+    def _forward_logs(self, stream) -> None:
+        # Filter logs from NodeJS to self.logger, see NodeLogForwarder
+        for line in stream:
+            self.log_forwarder.forward(line)
+
+    def _run_command(self, command: list, timeout: int | float = None, timings: dict = None, on_event=None,
+                     stdin: str = None) -> dict:
+        """
+        Run NodeJS script and return dictionary with script payload (last frame).
+        :param command: Full NodeJS command as list
+        :param timeout: int | float, seconds to wait, after that the script is killed
+        :param timings: dict, see _stream_command()
+        :param on_event: function(frame), called with event frames streamed before the payload
+        :param stdin: str, arguments too long for the command line (see split_args())
+        :return: dict
+        """
+        response = None
+        timers = []
+        timed_out = threading.Event()
 
-            except Exception as e:
-                return {'error': 1, 'msg': e, 'data': None}
+        def kill(process: subprocess.Popen) -> None:
+            timed_out.set()
+            process.kill()
+
+        def on_start(process: subprocess.Popen) -> None:
+            if timeout:
+                timers.append(threading.Timer(timeout, kill, args=(process,)))
+                timers[0].start()
+
+        try:
+            for frame in self._stream_command(command, on_start, timings, stdin):
+                if 'event' not in frame:
+                    response = frame
+                elif on_event:
+                    self._emit(on_event, frame)
+        except Exception as e:
+            return error_response(str(e), code='process')
+        finally:
+            for timer in timers:
+                timer.cancel()
+
+        if timed_out.is_set():
+            return error_response(f"{command[2]} timeout", code='timeout')
+
+        if response is None:
+            return error_response("no response from node.js script", code='process')
 
-    def _balance(self, address: str = None, mnemonics: str = None, address_id: int | str = None, **kwargs) -> dict:
+        return response
+
+    def _emit(self, on_event, frame: dict) -> None:
+        # Failing event callback must not break the call
+        try:
+            on_event(frame)
+        except Exception as e:
+            self.logger.error(f"event callback: {e}")
+
+    def _command(self, name: str, **args) -> list:
+        """
+        Build full NodeJS command for the api_handler.js script,
+        i.e. _command('balance', a=address) -> ['node', script, 'balance', '-a', address]
+        """
+        return node_command(self.script, name, **args)
+
+    def _execute(self, name: str, timeout: int | float = None, on_event=None, **args) -> dict:
+        """
+        Run api_handler.js command either in the worker process or in the new NodeJS process
+        and return dictionary with script payload. Reads by address are served by self.rpc (if enabled).
+        :param name: str, command name
+        :param timeout: int | float, seconds to wait (default for worker is its timeout, no limit for the script)
+        :param on_event: function(frame), event frames of streaming commands (update, receive_batch)
+        :param args: command arguments without dashes, i.e. a=address
+        :return: dict
+        """
+        timings = dict.fromkeys(('spawn', 'parse'), 0.0)
+        started = time.perf_counter()
+
+        with self.profiler.profile(name):
+            if self.rpc and self.rpc.supports(name, args):
+                response = self.rpc.execute(name, args, timeout)
+            elif self.worker:
+                response = self.worker.request(name, args, timeout, on_event)
+            else:
+                args, stdin = split_args(args)
+                response = self._run_command(self._command(name, **args), timeout, timings, on_event, stdin)
+
+        return self._observe(name, response, timings, time.perf_counter() - started)
+
+    def _observe(self, name: str, response: dict, timings: dict, total: float) -> dict:
+        # Move phase timings of the call from the response to self.metrics, see call_phases()
+        phases = call_phases(response, timings, total)
+
+        if self.metrics:
+            self.metrics.observe_call(name, phases, response)
+
+        return response
+
+    def _cached(self, key: tuple, loader) -> dict:
+        # Read-through self.cache (if enabled), key is (kind, address, *params)
+        if self.cache:
+            return self.cache.get_or_load(key, loader)
+        return loader()
+
+    def _invalidate(self, *addresses: str | None) -> None:
+        # Remove cached balances and transactions of the addresses
+        if self.cache:
+            for address in addresses:
+                if address:
+                    self.cache.invalidate(address)
+
+    def close(self) -> None:
+        """
+        Stop the NodeJS worker process (if running), the thread pool of map_*() calls, local PoW solver processes
+        and idle RPC connections
+        """
+        if self.worker:
+            self.worker.stop()
+
+        self.pow_solver.close()
+
+        if self.rpc:
+            self.rpc.close()
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Shared bounded thread pool of map_*() calls and prefetching, created on first use
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='vite_adapter')
+            return self._executor
+
+    def _map(self, call, items: list) -> list[Response]:
+        # Run call(item) for every item in the shared thread pool, results in the order of items
+        return list(self._pool().map(call, items))
+
+    def _balance(self, address: str = None, mnemonics: str = None, address_id: int | str = None, cached: bool = True,
+                 timeout: int | float = None, **kwargs) -> dict:
         if address_id is None:
             address_id = 0
         try:
             if address:
-                command = ['node', self.script, 'balance', '-a', address]
-                return self._run_command(command)
+                if not cached:
+                    return self._execute('balance', timeout, a=address)
+                return self._cached(('balance', address), lambda: self._execute('balance', timeout, a=address))
 
             if mnemonics:
-                address_id = str(address_id)
-                command = ['node', self.script, 'balance', '-a', '0', '-m', mnemonics, '-i', address_id]
-                return self._run_command(command)
+                # Address already derived from the mnemonics can be used directly (cache, batch)
+                address = self.keyring.get(mnemonics, address_id)
+
+                if address:
+                    return self._balance(address, cached=cached, timeout=timeout)
+
+                return self._execute('balance', timeout, a=0, m=mnemonics, i=address_id)
+
+            return self._default_error_response("address or mnemonics is required", 'invalid')
         except Exception as e:
             return self._default_error_response(str(e))
 
-    def _get_last_tx_id(self, address: str = None, mnemonics: str = None, **kwargs) -> int:
-        balance = self._balance(address, mnemonics)
+    def _get_last_tx_id(self, address: str = None, mnemonics: str = None, address_id: int | str = 0, **kwargs) -> int | None:
+        # Height of the account chain (number of account blocks), None when it can't be fetched
+        balance = self._balance(address, mnemonics, address_id, cached=False)
 
         if not balance['error']:
             try:
-                return balance['data']['balance']['blockCount']
+                return int((balance['data']['balance'] or {}).get('blockCount') or 0)
             except Exception as e:
                 self.logger.warning(f"_get_last_tx_id() error: {e}")
-        return 0
-
-    def _update_status(self) -> None:
-        fail_msg = "too many fail attempts"
-
-        if self.try_counter < 1:
-            self.response = self._default_error_response(fail_msg)
-        elif self.response['error']:
-            self.response = self._default_error_response(self.response['msg'])
-        else:
-            self.status = 'finished'
+        return None
 
     def create_wallet(self):
         """
         Create new VITE wallet
         :return: dict with raw mnemonic string and wallet address
         """
-        command = ['node', self.script, 'create']
-        self.response = self._run_command(command)
+        return self._result(self._execute('create'))
+
+    def create_wallets(self, count: int, addresses: int = 1, file: str | TextIO = None, processes: int = None,
+                       verify: bool = True) -> dict:
+        """
+        Create many VITE wallets in few NodeJS processes running at once (at least MIN_CREATE_BATCH
+        wallets each, see src/wallets.py) instead of one process per wallet, wallets are streamed
+        from the processes as they are created.
+        :param count: int, number of wallets
+        :param addresses: int, number of addresses derived for every wallet (address_id 0, 1, ...)
+        :param file: str | file object, write wallets as NDJSON lines instead of keeping them in memory
+        :param processes: int, max number of NodeJS processes, default is number of cores
+        :param verify: bool, cross-check addresses by deriving them once more from the mnemonics alone
+        :return: dict, data is list of {mnemonics, address, addresses: [{address_id, address}]}
+                 or number of wallets written to the file
+        """
+        frames = queue.Queue(maxsize=1000)
+        batches = batch_sizes(count, processes or os.cpu_count() or 1)
+        stopped = threading.Event()
+
+        def create(size: int) -> None:
+            # Forward wallet frames of one process, its final response marks the end of the batch
+            response = None
+            command = self._command('create', n=size, k=addresses, v=int(verify))
+
+            try:
+                for frame in self._stream_command(command):
+                    if stopped.is_set():
+                        break  # the process is killed by _stream_command()
 
-        return self.response
+                    if frame.get('event') == 'wallet':
+                        frames.put(frame)
+                    else:
+                        response = frame
+            except Exception as e:
+                response = error_response(str(e), code='process')
+
+            frames.put(response or error_response("no response from node.js script", code='process'))
+
+        for size in batches:
+            threading.Thread(target=create, args=(size,), daemon=True).start()
+
+        failed, finished = list(), 0
+
+        with RecordSink(file, 'ndjson', private=True) as sink:
+            try:
+                while finished < len(batches):
+                    frame = frames.get()
+
+                    if frame.get('event') == 'wallet':
+                        del frame['event']
+                        sink.write(frame)
+                        continue
+
+                    finished += 1
+
+                    if frame['error']:
+                        failed.append(frame)
+            except BaseException:
+                # Writing failed, stop the processes and drain frames, so no thread is left blocked on the full queue
+                stopped.set()
+
+                while finished < len(batches):
+                    if frames.get().get('event') != 'wallet':
+                        finished += 1
+                raise
+
+        if failed:
+            msg = f"{sink.count} of {count} wallets created: {failed[0]['msg']}"
+            return self._result(error_response(msg, error_code(failed[0])))
+
+        return self._result({'error': 0, 'msg': 'create success', 'data': sink.data})
 
     def get_balance(self, address: str = None, mnemonics: str = None, address_id: int | str = None, **kwargs) -> dict:
         """
@@ -166,20 +530,80 @@ class ViteJsAdapter:
         :param mnemonics:, str, wallet mnemonic seed phrase
         :param address_id: int | str, wallet address derivation path, default 0
         """
-        self.response = self._balance(address, mnemonics, address_id)
+        response = self.retrier.call(
+            'balance', lambda timeout: self._balance(address, mnemonics, address_id, timeout=timeout))
+
+        return self._result(response)
+
+    def derive_addresses(self, mnemonics: str, address_ids: range | list[int] = range(1)) -> dict:
+        """
+        Derive wallet addresses (HD sub-accounts) from mnemonics, every address is derived once
+        and kept in self.keyring.
+        :param mnemonics: str, wallet mnemonic seed phrase
+        :param address_ids: range | list of int, address derivation paths, i.e. range(0, 100)
+        :return: dict, data is list of {address_id: int, address: str}
+        """
+        addresses = {int(address_id): self.keyring.get(mnemonics, address_id) for address_id in address_ids}
+        missing = [address_id for address_id, address in addresses.items() if not address]
+
+        if missing:
+            response = self._execute('derive', m=mnemonics, i=missing)
+
+            if response['error']:
+                return self._result(response)
+
+            for derived in response['data']:
+                self.keyring.set(mnemonics, derived['address_id'], derived['address'])
+                addresses[int(derived['address_id'])] = derived['address']
 
-        while self.response['error'] and self.try_counter:
-            self.try_counter -= 1
+        addresses = [{'address_id': address_id, 'address': address} for address_id, address in addresses.items()]
+        return self._result({'error': 0, 'msg': 'derive success', 'data': addresses})
 
-            if 'timeout' in self.response['msg'].lower():
-                self.logger.warning(f"{self.response['msg']} re-try balance ({self.try_counter} left)")
-                self._balance(address, mnemonics, address_id)
+    def get_address(self, mnemonics: str, address_id: int | str = 0) -> str | None:
+        """
+        Get wallet address derived from mnemonics (from self.keyring if already derived)
+        :param mnemonics: str, wallet mnemonic seed phrase
+        :param address_id: int | str, wallet address derivation path, default 0
+        :return: str address or None on error
+        """
+        response = self.derive_addresses(mnemonics, [address_id])
+        return None if response['error'] else response['data'][0]['address']
+
+    def get_balances(self, wallets: list[str | dict], batch_size: int = BALANCE_BATCH_SIZE, cached: bool = True) -> dict:
+        """
+        Get balances of many wallets from the VITE network in one call,
+        every batch_size addresses are sent as a single JSON-RPC batch request.
+        :param wallets: list of addresses or wallet dictionaries {address: str, ...}
+        :param batch_size: int, max number of addresses in one request
+        :param cached: bool, use balances from the cache (if enabled), fetched balances are cached anyway
+        :return: dict, data is {address: get_balance() response}, failed addresses get error response
+        """
+        addresses = list(dict.fromkeys(wallet_address(wallet) for wallet in wallets))
+        balances = dict()
+
+        if self.cache and cached:
+            for address in addresses:
+                response = self.cache.get(('balance', address))
+
+                if response is not None:
+                    balances[address] = response
+
+            addresses = [address for address in addresses if address not in balances]
+
+        for i in range(0, len(addresses), batch_size):
+            batch = addresses[i:i + batch_size]
+            response = self.retrier.call('balances', lambda timeout: self._execute('balance', timeout, b=1, a=batch))
+
+            if response['error']:
+                balances.update({address: error_response(response['msg'], error_code(response)) for address in batch})
             else:
-                return self.response
+                balances.update(response['data'])
 
-        self._update_status()
+                if self.cache:
+                    for address, balance_ in response['data'].items():
+                        self.cache.set(('balance', address), balance_)
 
-        return self.response
+        return self._result({'error': 0, 'msg': 'balances success', 'data': balances})
 
     def get_transactions(self, address: str, page_index: int | str = 0, page_size: int | str = 20, **kwargs) -> dict:
         """
@@ -188,189 +612,611 @@ class ViteJsAdapter:
         :param page_index: str | int, default 0
         :param page_size: str | int, default 20
         """
-        page_index = str(page_index)
-        page_size = str(page_size)
+        args = dict(a=address, i=str(page_index), s=str(page_size))
+        key = ('transactions', address, args['i'], args['s'])
 
-        command = ['node', self.script, 'transactions', '-a', address, '-i', page_index, '-s', page_size]
         try:
-            self.response = self._run_command(command)
+            response = self.retrier.call(
+                'transactions', lambda timeout: self._cached(key, lambda: self._execute('transactions', timeout, **args)))
+        except Exception as e:
+            response = error_response(str(e))
+
+        return self._result(response)
+
+    def transaction_filter(self, tokens: list[str] = None, min_amount: int | float | str = None,
+                           max_amount: int | float | str = None, senders: list[str] = None,
+                           block_types: tuple[int, ...] | None = (4,)) -> TransactionFilter:
+        """
+        Compile TransactionFilter backed by self.token_registry (token list loaded from the node once),
+        for run_transaction_listener() or get_transactions() data, i.e. filter_.filter(response['data'])
+        :param tokens: list of str, token symbols (exact match) or tokenIds, None or ['__all__'] for all of them
+        :param min_amount: int | float | str, min amount in token units
+        :param max_amount: int | float | str, max amount in token units
+        :param senders: list of str, only transactions from these addresses
+        :param block_types: tuple of int, default is (4,) - received transactions, None for all of them
+        """
+        return TransactionFilter(tokens, self.token_registry, min_amount, max_amount, senders, block_types)
 
-            while self.response['error'] and self.try_counter:
-                self.try_counter -= 1
+    def map_balances(self, wallets: list[str | dict]) -> list[Response]:
+        """
+        Get balance of every wallet with get_balance() calls running at once in the thread pool
+        (max self.threads), i.e. wallets given by mnemonics. For many addresses get_balances() is cheaper.
+        :param wallets: list of addresses or wallet dictionaries {address: str, mnemonics: str, address_id: int}
+        :return: list of get_balance() results in the order of wallets
+        """
+        def balance(wallet: str | dict) -> Response:
+            if isinstance(wallet, dict):
+                return self.get_balance(wallet.get('address'), wallet.get('mnemonics'), wallet.get('address_id'))
+            return self.get_balance(address=wallet)
 
-                if 'timeout' in self.response['msg'].lower():
-                    self.logger.warning(f"{self.response['msg']} re-try {command[2]} ({self.try_counter} left)")
-                    self._run_command(command)
-                else:
-                    return self.response
+        return self._map(balance, wallets)
 
-            self._update_status()
-            return self.response
+    def map_transactions(self, requests: list[str | dict], page_index: int | str = 0,
+                         page_size: int | str = 20) -> list[Response]:
+        """
+        Get transactions of many wallets with get_transactions() calls running at once
+        in the thread pool (max self.threads).
+        :param requests: list of addresses or get_transactions() kwargs {address: str, page_index, page_size}
+        :param page_index: str | int, default page index of requests without one
+        :param page_size: str | int, default page size of requests without one
+        :return: list of get_transactions() results in the order of requests
+        """
+        def transactions(request: str | dict) -> Response:
+            request = request if isinstance(request, dict) else {'address': request}
+            return self.get_transactions(**{'page_index': page_index, 'page_size': page_size, **request})
 
-        except Exception as e:
-            self._default_error_response(str(e))
+        return self._map(transactions, requests)
 
-    def send_transaction(self, to_address: str, mnemonics: str, token_id: str, amount: str | float, address_id: int | str = 0, **kwargs) -> dict:
+    def iter_transactions(self, address: str, page_size: int = HISTORY_PAGE_SIZE, since_height: int = None,
+                          prefetch: bool = True, typed: bool = False) -> Iterator[dict | Transaction]:
+        """
+        Iterate over wallet transactions one by one, from the newest to the oldest one. Pages are not cached,
+        next page is fetched in background while the current one is consumed, so memory use doesn't grow
+        with the history (at most two pages). Transactions shifted to the next page by new blocks are skipped.
+        :param address: str, wallet address
+        :param page_size: int, transactions fetched with one call
+        :param since_height: int, only transactions above this account height, default is whole history
+        :param prefetch: bool, fetch next page while current one is consumed
+        :param typed: bool, yield compact Transaction records (src/models.py) instead of dicts
+        :return: Iterator of transactions, raises ViteError (src/errors.py) when a page can't be fetched
+        """
+        since_height = since_height or 0
+
+        def fetch(page_index: int) -> list[dict]:
+            args = dict(a=address, i=str(page_index), s=str(page_size))
+            response = self.retrier.call('transactions', lambda timeout: self._execute('transactions', timeout, **args))
+            return raise_for_error(response)['data'] or []
+
+        page_index, last_height = 0, None
+        next_page = self._pool().submit(fetch, 0) if prefetch else None
+
+        try:
+            while True:
+                page = next_page.result() if prefetch else fetch(page_index)
+                page_index += 1
+                done = len(page) < page_size or any(self._block_height(block) <= since_height for block in page)
+
+                if prefetch and not done:
+                    next_page = self._pool().submit(fetch, page_index)
+
+                for block in page:
+                    height = self._block_height(block)
+
+                    if height > since_height and (last_height is None or height < last_height):
+                        last_height = height
+                        yield Transaction.from_dict(block, self.token_registry) if typed else block
+
+                if done:
+                    return
+        finally:
+            # Consumer stopped early, don't wait for the page nobody reads
+            if prefetch and not next_page.done():
+                next_page.cancel()
+
+    def export_transactions(self, address: str, file, format: str = None, page_size: int = HISTORY_PAGE_SIZE,
+                            since_height: int = None, fields: tuple[str, ...] = CSV_FIELDS) -> int:
         """
-        Send transaction on the VITE blockchain
+        Stream wallet history from iter_transactions() to NDJSON or CSV file (see src/export.py)
+        :param address: str, wallet address
+        :param file: str | file object
+        :param format: str, 'ndjson' | 'csv', default is by the file extension
+        :param page_size: int, transactions fetched with one call
+        :param since_height: int, only transactions above this account height
+        :param fields: tuple of str, CSV columns
+        :return: int, number of exported transactions, raises ViteError when a page can't be fetched
+        """
+        with closing(self.iter_transactions(address, page_size, since_height)) as transactions:
+            return export_transactions(transactions, file, format, fields)
+
+    def _send(self, args: dict, pow_mode: str, timeout: int | float = None) -> dict:
+        """
+        Run send command, in local PoW mode solve the nonce and send again with it
+        :param args: dict, send command args
+        :param pow_mode: str, 'remote' | 'local'
+        :param timeout: int | float, seconds for the send including local PoW
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        response = self._execute('send', timeout, p=pow_mode, **args)
+
+        for _ in range(POW_ATTEMPTS):
+            if response['msg'] != POW_REQUIRED:
+                break
+
+            pow_data = response['data']
+            self.logger.info(f"solving PoW locally, difficulty {pow_data['difficulty']}..")
+            nonce = self.pow_solver.solve(pow_data['difficulty'], pow_data['hash'], timeout=self._remaining(deadline))
+
+            if nonce is None:
+                return error_response("PoW nonce not solved before the deadline", 'timeout')
+
+            response = self._execute('send', self._remaining(deadline), p=pow_mode, n=nonce,
+                                     f=str(pow_data['difficulty']), r=pow_data['previousHash'], **args)
+        return response
+
+    @staticmethod
+    def _remaining(deadline: float | None) -> float | None:
+        # Seconds left to the deadline, None without deadline
+        return max(deadline - time.monotonic(), 0.001) if deadline is not None else None
+
+    def send_transaction(self, to_address: str, mnemonics: str, token_id: str, amount: str | float, address_id: int | str = 0,
+                         pow_mode: str = None, **kwargs) -> dict:
+        """
+        Send transaction on the VITE blockchain. Failed send (timeout, connection error) is re-tried
+        only when it didn't land on the chain, see _send_landed().
         :param to_address: str, wallet address
         :param address_id; int, wallet address derivation path, default 0
         :param mnemonics:, str, wallet mnemonic seed phrase
         :param token_id: str, unique token id to send
         :param amount: int | str, amount of the token to send
+        :param pow_mode: str, 'remote' | 'local', default is self.pow_mode
         """
-        # Get sender's last transaction ID, later will be used to confirm that transaction was sent successfully.
-        last_tx_id = self._get_last_tx_id(mnemonics)
+        pow_mode = pow_mode or self.pow_mode
 
-        address_id = str(address_id)
-        amount = str(amount)
-        command = ['node', self.script, 'send', '-m', mnemonics, '-i', address_id, '-d', to_address, '-t', token_id, '-a', amount]
+        # Sender's account height, failed send is re-tried only when it didn't land above it
+        last_tx_id = self._get_last_tx_id(kwargs.get('address'), mnemonics, address_id)
 
-        try:
-            self.response = self._run_command(command)
-
-            while self.response['error'] and self.try_counter:
-                if 'timeout' in self.response['msg'].lower():
-                    self.try_counter -= 1
-                    time.sleep(1)
-                    current_tx_id = self._get_last_tx_id(mnemonics)
-
-                    while not current_tx_id:
-                        self.logger.warning(f"problem with getting balance, re-try...")
-                        current_tx_id = self._get_last_tx_id(mnemonics)
-
-                    if current_tx_id == last_tx_id:
-                        self.logger.warning(f"{self.response['msg']}, re-try send ({self.try_counter} left)..")
-                        time.sleep(1)
-                        self.response = self._run_command(command)
-                    else:
-                        if self.debug:
-                            self.logger.info(f"New TX last ID [{current_tx_id}], finishing process..")
-                        break
-                else:
-                    break
+        args = dict(m=mnemonics, i=str(address_id), d=to_address, t=token_id, a=str(amount))
 
-            self._update_status()
-            return self.response
+        try:
+            response = self.retrier.call(
+                'send', lambda timeout: self._send(args, pow_mode, timeout),
+                verify=lambda response_: self._send_landed(
+                    response_, last_tx_id, to_address, args['a'], mnemonics, address_id, **kwargs))
 
+            # Balances and transactions of both wallets changed
+            self._invalidate(to_address, kwargs.get('address'), (response.get('data') or {}).get('address'))
         except Exception as e:
-            self._default_error_response(str(e))
+            response = error_response(str(e))
+
+        return self._result(response)
+
+    def _send_landed(self, response: dict, last_tx_id: int | None, to_address: str, amount: str, mnemonics: str,
+                     address_id: int | str, **kwargs) -> dict | None:
+        """
+        Check if failed send took effect anyway (i.e. timeout after broadcast) before it's re-tried:
+        look for the send block above the old account height, by hash or height of the failed response
+        or by to_address and amount (see landed_send()).
+        :return: final response when the block is found or it can't be checked, None when safe to re-try
+        """
+        address = kwargs.get('address') or self.get_address(mnemonics, address_id)
+        current_tx_id = self._get_last_tx_id(address) if address else None
+        deadline = time.monotonic() + SEND_LANDED_WAIT
+
+        # Block broadcast just before the failure may not be on the account chain yet
+        while current_tx_id is not None and current_tx_id == last_tx_id and time.monotonic() < deadline:
+            time.sleep(SEND_LANDED_POLL)
+            current_tx_id = self._get_last_tx_id(address)
 
-    def get_updates(self, mnemonics: str, address_id: str | int = 0, **kwargs) -> dict:
+        if last_tx_id is None or current_tx_id is None:
+            self.logger.warning(f"{response['msg']}, can't check sender's account, send is not re-tried")
+            return response
+
+        if current_tx_id == last_tx_id:
+            return None
+
+        # Account chain grew (send or receive blocks), pages of the account could be cached before
+        self._invalidate(address)
+        blocks = self._blocks_above(address, last_tx_id)
+
+        if blocks is None:
+            self.logger.warning(f"{response['msg']}, can't check sender's account, send is not re-tried")
+            return response
+
+        for block in blocks:
+            if landed_send(block, to_address, amount, response):
+                if self.debug:
+                    self.logger.info(f"New TX last ID [{current_tx_id}], finishing process..")
+                return {'error': 0, 'msg': 'transaction success', 'data': block}
+
+        return None
+
+    def send_batch(self, transfers: list[dict], mnemonics: str, address_id: int | str = 0, timeout: int | float = None,
+                   **kwargs) -> dict:
+        """
+        Send many transactions from one account in one call. Blocks are chained locally
+        (height, previousHash), quota is checked once per batch, next block is signed while the previous one
+        is being sent and sent blocks are polled by hash until confirmed (up to SEND_CONFIRM_TIMEOUT seconds).
+        When one transfer fails the next ones are not sent. Batch is not re-tried.
+        Result of every transfer is streamed as soon as it is known, so batch interrupted by timeout
+        still returns results of transfers sent so far, the other ones have error 'unknown'
+        (in worker mode they may still be sent, don't re-send them blindly).
+        :param transfers: list of dictionaries {to_address: str, token_id: str, amount: int | str}
+        :param mnemonics:, str, sender's wallet mnemonic seed phrase
+        :param address_id; int, wallet address derivation path, default 0
+        :param timeout: int | float, seconds to wait for the whole batch,
+                        default is SEND_BATCH_TIMEOUT per transfer and SEND_CONFIRM_TIMEOUT
+        :return: dict, data is list of {error, msg, data: {hash, height, confirmed, ...}} for every transfer
+        """
+        transfers = [{**transfer, 'amount': str(transfer['amount'])} for transfer in transfers]
+        results: list[dict | None] = [None] * len(transfers)
+
+        def on_transfer(frame: dict) -> None:
+            results[frame['index']] = {key: value for key, value in frame.items() if key not in ('event', 'index')}
+
+        timeout = timeout or SEND_BATCH_TIMEOUT * max(1, len(transfers)) + SEND_CONFIRM_TIMEOUT
+        response = self._execute('send_batch', timeout, on_event=on_transfer, m=mnemonics, i=str(address_id),
+                                 j=json.dumps(transfers))
+
+        if response['error'] and any(results):
+            # Batch interrupted (i.e. timeout), results of transfers known so far
+            sent = sum(1 for result in results if result and not result['error'])
+            unknown = error_response("result unknown, batch interrupted", response.get('code', 'unknown'))
+            response = {**response, 'msg': f"{response['msg']} ({sent} / {len(transfers)} transactions sent)",
+                        'data': [result or unknown for result in results]}
+
+        # Balances and transactions of all wallets changed
+        sender = kwargs.get('address') or self.keyring.get(mnemonics, address_id)
+        self._invalidate(sender, *[transfer['to_address'] for transfer in transfers])
+
+        return self._result(response)
+
+    def get_updates(self, mnemonics: str, address_id: str | int = 0, on_block=None, **kwargs) -> dict:
         """
         Update wallet balance by receiving pending transactions
         :param mnemonics:, str, wallet mnemonic seed phrase
         :param address_id; int, wallet address derivation path, default 0
+        :param on_block: function(block), called with {address, hash, height, sendBlockHash} of every
+                         receive block as soon as the node accepts it (before the call returns)
         """
-        address_id = str(address_id)
-        command = ['node', self.script, 'update', '-m', mnemonics, '-i', address_id]
+        args = dict(m=mnemonics, i=str(address_id))
 
         try:
-            while self.response['error'] and self.try_counter:
-                self.response = self._run_command(command)
-                self.try_counter -= 1
-
-                if 'timeout' in self.response['msg'].lower():
-                    self.logger.info(f"{self.response['msg']}, re-try {command[2]} ({self.try_counter} left)")
-                    self._run_command(command)
-                elif 'no pending' in self.response['msg'].lower():
-                    self.response = {'error': 0, 'msg': "No pending transactions", 'data': None}
-                    break
-                else:
-                    break
-
-            self._update_status()
-            return self.response
-
+            # Receiving is safe to re-try, already received blocks are skipped. Receiving many pending blocks
+            # can take long, attempts are not bounded by the policy deadline
+            response = self.retrier.call(
+                'update', lambda timeout: self._execute('update', timeout, on_event=on_block, **args),
+                policy=self.retrier.policy.without_deadline())
+
+            # Balance of the wallet changed, address of mnemonics is returned by the script (or known by the keyring)
+            address = kwargs.get('address') or (response.get('data') or {}).get('address') \
+                or self.keyring.get(mnemonics, address_id)
+            self._invalidate(address)
+
+            if error_code(response) == 'no_pending':
+                response = {'error': 0, 'msg': "No pending transactions", 'data': None}
         except Exception as e:
-            self._default_error_response(str(e))
+            response = error_response(str(e))
 
-    def _transaction_listener(self, *args) -> None:
-        wallets, tokens, interval, callback = args
-        first_run = True
+        return self._result(response)
 
-        try:
-            while self.listener_is_running:
-                if not first_run:
-                    time.sleep(interval)
+    def receive_many(self, wallets: list[dict], concurrency: int = None, on_block=None, timeout: int | float = None,
+                     batch_size: int = RECEIVE_BATCH_SIZE) -> dict:
+        """
+        Receive pending transactions of many wallets at once. Every wallet is drained by its own loop
+        in NodeJS without fixed polling interval, loops run concurrently and number of receive blocks
+        sent at once is bounded per VITE node (see receiveAccounts() in vitejs/vite-wallet-api.js).
+        Every batch_size wallets are one NodeJS call, batches run in the shared thread pool
+        (in worker mode all of them share the per node bound).
+        :param wallets: list of dictionaries {mnemonics: str, address_id(optional): str | int, address(optional): str}
+        :param concurrency: int, max receive blocks sent at once per node, default is 8 (VITE_RECEIVE_CONCURRENCY)
+        :param on_block: function(block), called with {address, hash, height, sendBlockHash} of every
+                         receive block as soon as the node accepts it (from the thread reading the call)
+        :param timeout: int | float, seconds to wait for every batch (default for worker is its timeout)
+        :param batch_size: int, max number of wallets in one NodeJS call
+        :return: dict, data is {address: get_updates() response}, wallets of failed batch get its error
+                 (when their address is known)
+        """
+        batches = [wallets[i:i + batch_size] for i in range(0, len(wallets), batch_size)]
 
-                first_run = False
+        def receive(batch: list[dict]) -> dict:
+            accounts = [{'mnemonics': wallet['mnemonics'], 'address_id': int(wallet.get('address_id') or 0)}
+                        for wallet in batch]
+            args = dict(j=json.dumps(accounts), c=concurrency) if concurrency else dict(j=json.dumps(accounts))
+            return self._execute('receive_batch', timeout, on_event=on_block, **args)
 
-                for i, wallet in enumerate(wallets):
-                    if self.debug:
-                        wallet_ = wallet.get('address', i)
-                        self.logger.debug(f"Processing wallet({wallet_})..")
+        updates = dict()
 
-                    balance_ = self.get_balance(**wallet)
+        for batch, response in zip(batches, self._map(receive, batches)):
+            if response['error']:
+                for wallet in batch:
+                    address = wallet.get('address') or self.keyring.get(wallet['mnemonics'], wallet.get('address_id') or 0)
 
-                    if balance_['error']:
-                        if self.debug:
-                            self.logger.warning(f'error: {balance_["msg"]}')
-                        continue
+                    if address:
+                        updates[address] = error_response(response['msg'], error_code(response))
+                continue
 
-                    pending = int(balance_['data']['unreceived']['blockCount'])
-                    self.logger.info(f"tx_listener: {pending} new transactions")
+            for address, update_ in response['data'].items():
+                if error_code(update_) == 'no_pending':
+                    update_ = {'error': 0, 'msg': "No pending transactions", 'data': None}
+                updates[address] = update_
 
-                    if not pending:
-                        continue
+        self._invalidate(*updates)
+        return self._result({'error': 0, 'msg': 'receive success', 'data': updates})
 
-                    update_ = self.get_updates(**wallet)
+    def _process_wallet(self, wallet: dict, balance_: dict, filter_: TransactionFilter, callback, update_: dict = None) -> int | None:
+        """
+        Receive pending transactions of the wallet and return number of them, None on error,
+        update_ is the result of receiving the wallet already (i.e. by receive_many())
+        """
+        if self.debug:
+            self.logger.debug(f"Processing wallet({wallet['address']})..")
 
-                    if update_['error']:
-                        if self.debug:
-                            self.logger.warning(f'error: {update_["msg"]}')
-                        continue
+        if balance_['error']:
+            if self.debug:
+                self.logger.warning(f'error: {balance_["msg"]}')
+            return None
 
-                    transactions_ = self.get_transactions(address=wallet['address'], page_size=pending + 1)
+        pending = int(balance_['data']['unreceived']['blockCount'])
+        self.logger.info(f"tx_listener: {pending} new transactions")
 
-                    if transactions_['error']:
-                        if self.debug:
-                            self.logger.warning(f'error: {transactions_["msg"]}')
-                        continue
+        cursor = self.listener_cursor.get(wallet['address']) if self.listener_cursor else None
+        height = int(balance_['data']['balance']['blockCount'] or 0) if balance_['data']['balance'] else 0
 
-                    transactions = list()
+        # With cursor also blocks received but not delivered yet (i.e. before restart) have to be processed
+        if not pending and (cursor is None or height <= cursor[0]):
+            return 0
 
-                    for transaction in transactions_['data']:
-                        # Get only 'received' transactions (blockType == 4)
-                        if transaction['blockType'] != 4:
-                            continue
+        if pending:
+            update_ = update_ or self.get_updates(**wallet)
 
-                        # Filter transactions by token symbols
-                        if '__all__' in tokens:
-                            transactions.append(transaction)
-                        else:
-                            for token in tokens:
-                                if token.lower() in transaction['tokenInfo']['tokenSymbol'].lower():
-                                    transactions.append(transaction)
-                    if callback:
-                        callback(transactions)
+            if update_['error']:
+                if self.debug:
+                    self.logger.warning(f'error: {update_["msg"]}')
+                return None
 
-        except Exception as e:
-            self._default_error_response(str(e))
+        if cursor:
+            blocks = self._blocks_above(wallet['address'], cursor[0])
+        else:
+            transactions_ = self.get_transactions(address=wallet['address'], page_size=pending + 1)
+            blocks = None if transactions_['error'] else transactions_['data'] or []
+
+        if blocks is None:
+            return None
+
+        if self.listener_cursor:
+            if not blocks:
+                return 0
+
+            # Cursor is moved only when callback acknowledged the transactions
+            blocks = sorted(blocks, key=self._block_height)
+            transactions = filter_.filter(blocks)
+            last = blocks[-1]
+            acknowledged = self.listener_cursor.deliver(
+                wallet['address'], transactions, callback, height=self._block_height(last), hash_=last['hash'])
+            return len(transactions) if acknowledged else None
+
+        transactions = filter_.filter(blocks)
+
+        if callback:
+            callback(transactions)
+
+        return pending
 
-    def run_transaction_listener(self, tokens: list[str], wallets: list[dict[str, str, str | int]] = None,
-                                 interval: int = 10, callback=None) -> None:
+    def _needs_processing(self, wallet: dict, balance_: dict) -> bool:
+        """
+        Wallet has unreceived blocks or (with cursor store) blocks above the last delivered one,
+        i.e. blocks received before restart but not delivered yet
+        """
+        if int(balance_['data']['unreceived']['blockCount']):
+            return True
+
+        if not self.listener_cursor or not balance_['data']['balance']:
+            return False
+
+        cursor = self.listener_cursor.get(wallet['address'])
+        return cursor is not None and int(balance_['data']['balance']['blockCount'] or 0) > cursor[0]
+
+    @staticmethod
+    def _block_height(block: dict) -> int:
+        return int(block['height'])
+
+    def _blocks_above(self, address: str, height: int, page_size: int = CURSOR_PAGE_SIZE) -> list[dict] | None:
+        """Get all account blocks above the height (sorted by height), None on error"""
+        blocks = list()
+        page_index = 0
+
+        while True:
+            transactions_ = self.get_transactions(address=address, page_index=page_index, page_size=page_size)
+
+            if transactions_['error']:
+                if self.debug:
+                    self.logger.warning(f'error: {transactions_["msg"]}')
+                return None
+
+            # Pages are sorted from the newest blocks, stop at the first page reaching the height
+            page = transactions_['data'] or []
+            new = [block for block in page if self._block_height(block) > height]
+            blocks += new
+
+            if len(new) < len(page) or len(page) < page_size:
+                return sorted(blocks, key=self._block_height)
+
+            page_index += 1
+
+    def _poll_wallets(self, wallets: list[dict], filter_: TransactionFilter, callback) -> None:
+        # Balances of all wallets in one call, wallets with pending transactions are received at once
+        started = time.monotonic()
+        balances = self.get_balances(wallets, cached=False)['data']
+        pending = [wallet for wallet in wallets if not balances[wallet['address']]['error']
+                   and int(balances[wallet['address']]['data']['unreceived']['blockCount'])]
+        updates = self.receive_many(pending)['data'] if pending else dict()
+
+        for wallet in wallets:
+            self._process_wallet(wallet, balances[wallet['address']], filter_, callback, updates.get(wallet['address']))
+
+        if self.metrics:
+            self.metrics.observe_pass(time.monotonic() - started)
+
+    def _push_listener(self, *args) -> None:
+        wallets, filter_, interval, callback = args
+        wallets_ = {wallet['address']: wallet for wallet in wallets}
+        command = self._command('subscribe', a=list(wallets_))
+
+        while self.listener_is_running:
+            try:
+                for frame in self._stream_command(command, on_start=self._set_listener_process):
+                    if not self.listener_is_running:
+                        break
+
+                    match frame.get('event'):
+                        case 'connected':
+                            # Catch up with transactions that came while there was no subscription
+                            self._poll_wallets(wallets, filter_, callback)
+                        case 'unreceived':
+                            wallet = wallets_[frame['address']]
+                            balance_ = self.get_balances([wallet], cached=False)['data'][wallet['address']]
+                            self._process_wallet(wallet, balance_, filter_, callback)
+                        case _:
+                            if frame.get('error') and self.debug:
+                                self.logger.warning(f"tx_listener: {frame['msg']}")
+
+            except Exception as e:
+                self._default_error_response(str(e))
+
+            if self.listener_is_running:
+                self.logger.warning(f"tx_listener: subscription lost, reconnecting in {interval}s..")
+                time.sleep(interval)
+
+    def _set_listener_process(self, process: subprocess.Popen) -> None:
+        self.listener_process = process
+
+    def run_transaction_listener(self, tokens: list[str] | TransactionFilter, wallets: list[dict[str, str, str | int]] = None,
+                                 interval: int = 10, callback=None, mode: str = 'poll', workers: int = 4,
+                                 cursor_store: CursorStore | str = None) -> None:
         """
         Run background thread that will monitor given Vite wallets, update (receive)
         the new transactions and return them to the callback functions.
-        :param tokens: list of str, if tokens = ['__all__'] it will check for all of them
+        :param tokens: list of str | TransactionFilter, token symbols (exact match) or tokenIds, if tokens = ['__all__']
+                       it will check for all of them, see transaction_filter() for amount and sender predicates
         :param wallets: list of dictionaries {address: str, mnemonics: str, address_id(optional): str | int}
-        :param interval: int, refresh time interval in seconds
+        :param interval: int, refresh time interval in seconds ('push' mode: delay before reconnecting)
         :param callback: callback function to return list of new received transactions
+        :param mode: str, 'poll' - check wallets with WalletScheduler, every wallet has own adaptive interval,
+                          'push' - process wallet only when VITE node sends new unreceived block event,
+                          all wallets are checked only after (re)connecting to the node
+        :param workers: int, 'poll' mode: max number of wallets processed at once
+        :param cursor_store: CursorStore | str, store (or SQLite file path) of last delivered block per address,
+                             with cursor only new blocks are fetched and every block is delivered at least once,
+                             also across restarts (callback returning False is not acknowledged)
         """
-        args = (wallets, tokens, interval, callback)
-        self.listener_thread = threading.Thread(target=self._transaction_listener, args=args)
+        wallets = wallets or []
+        filter_ = tokens if isinstance(tokens, TransactionFilter) else self.transaction_filter(tokens)
         self.listener_is_running = True
-        self.listener_thread.daemon = True
-        self.listener_thread.start()
+
+        if isinstance(cursor_store, str):
+            cursor_store = CursorStore(cursor_store)
+        self.listener_cursor = cursor_store
+
+        if mode == 'push':
+            args = (wallets, filter_, interval, callback)
+            self.listener_thread = threading.Thread(target=self._push_listener, args=args)
+            self.listener_thread.daemon = True
+            self.listener_thread.start()
+        else:
+            self.listener_scheduler = WalletScheduler(
+                check=lambda wallets_: self.get_balances(wallets_, cached=False)['data'],
+                process=lambda wallet, balance_: self._process_wallet(wallet, balance_, filter_, callback),
+                interval=interval, workers=workers, logger=self.logger, metrics=self.metrics,
+                needs_processing=self._needs_processing)
+
+            for wallet in wallets:
+                self.listener_scheduler.add_wallet(wallet)
+
+            self.listener_scheduler.start()
 
         if self.debug:
-            self.logger.debug(f"Transaction listener started")
+            self.logger.debug(f"Transaction listener started ({mode})")
+
+    def add_listener_wallet(self, wallet: dict[str, str, str | int]) -> None:
+        """
+        Add wallet to the running 'poll' mode transaction listener
+        :param wallet: dictionary {address: str, mnemonics: str, address_id(optional): str | int}
+        """
+        if self.listener_scheduler:
+            self.listener_scheduler.add_wallet(wallet)
+
+    def remove_listener_wallet(self, address: str) -> None:
+        """
+        Remove wallet from the running 'poll' mode transaction listener
+        :param address: str, wallet address
+        """
+        if self.listener_scheduler:
+            self.listener_scheduler.remove_wallet(address)
+
+    def node_stats(self) -> dict:
+        """
+        Latency (EWMA and p95 ms), circuit breaker state and counters of the VITE nodes pool,
+        measured by the process serving the call (long-lived one in worker mode)
+        """
+        return self._execute('nodes')
+
+    def retry_stats(self) -> dict:
+        """Calls, attempts, re-tries, failures and time spent re-trying per operation, see RetryMetrics"""
+        return self.retrier.metrics.stats()
+
+    def metrics_stats(self) -> dict:
+        """Calls by result and latency summary per operation and phase, listener passes, see Metrics.stats()"""
+        return self.metrics.stats() if self.metrics else dict()
 
-    def stop_transaction_listener(self):
-        """Stop the running transaction listener thread"""
+    def prometheus_metrics(self) -> str:
+        """Call latency histograms, results, re-tries and listener metrics in Prometheus text format"""
+        metrics = self.metrics or Metrics()
+        return metrics.prometheus(retries=self.retrier.metrics.stats())
+
+    def serve_metrics(self, port: int, host: str = ''):
+        """
+        Serve prometheus_metrics() on http://host:port/metrics in background thread
+        :return: server, call shutdown() to stop it
+        """
+        return (self.metrics or Metrics()).serve(port, self.prometheus_metrics, host)
+
+    def profile(self, operation: str, calls: int = 1, path: str = None) -> None:
+        """
+        Profile next calls of the operation with cProfile (python side: spawning, waiting, parsing),
+        top functions are logged or stats are saved to the path, see Profiler.arm()
+        :param operation: str, command name, i.e. 'balance', 'transactions', 'send', 'update'
+        :param calls: int, number of next calls to profile
+        :param path: str, pstats file path, '{n}' is replaced by call number
+        """
+        self.profiler.arm(operation, calls, path)
+
+    def log_stats(self) -> dict:
+        """Forwarded, duplicate, sampled out and rate limited nodejs log lines, see NodeLogForwarder"""
+        return self.log_forwarder.stats()
+
+    def listener_stats(self) -> dict:
+        """Counters of the running 'poll' mode transaction listener, see WalletScheduler.stats()"""
+        return self.listener_scheduler.stats() if self.listener_scheduler else dict()
+
+    def stop_transaction_listener(self, wait: bool = False):
+        """
+        Stop the running transaction listener thread
+        :param wait: bool, wait until wallets being processed are finished (their callbacks are still called)
+        """
         if self.listener_is_running:
             if self.debug:
                 self.logger.debug(f"Stopping transaction listener..")
             self.listener_is_running = False
-            self.listener_thread = None
+            thread, self.listener_thread = self.listener_thread, None
+
+            if self.listener_scheduler:
+                self.listener_scheduler.stop(wait=wait)
+            self.listener_scheduler = None
+
+            # Close the subscription of 'push' mode listener
+            if self.listener_process and self.listener_process.poll() is None:
+                self.listener_process.kill()
+            self.listener_process = None
+
+            if wait and thread:
+                thread.join()
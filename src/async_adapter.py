@@ -0,0 +1,761 @@
+import asyncio
+import inspect
+import json
+import time
+import os
+
+from contextlib import aclosing
+from typing import AsyncIterator, TextIO
+
+from .tools import node_command, node_env, split_args, error_response, wallet_address, FRAME_SEPARATOR, PAYLOAD_FD_ENV
+from .tools import default_logger, SCRIPT_PATH, PAYLOAD_PIPE, BALANCE_BATCH_SIZE, HISTORY_PAGE_SIZE, RECEIVE_BATCH_SIZE
+from .tools import SEND_LANDED_WAIT, SEND_LANDED_POLL, landed_send
+from .pow import PowSolver, POW_REQUIRED, POW_ATTEMPTS
+from .retry import Retrier, RetryPolicy
+from .metrics import Metrics, Profiler, call_phases
+from .logs import NodeLogForwarder, queue_logging
+from .tokens import TokenRegistry, TransactionFilter
+from .models import Transaction
+from .rpc import ViteRPC
+from .export import aexport_transactions, RecordSink, CSV_FIELDS
+from .wallets import batch_sizes
+from .errors import error_code, raise_for_error
+
+
+# Max size of single payload frame (one line) read from the NodeJS script
+FRAME_LIMIT = 2 ** 26
+
+
+class AsyncViteJsAdapter:
+    """
+    Execute @vitejs functions via asyncio, sibling of ViteJsAdapter. Possible operations:
+    - Create new VITE wallet | create_wallet()
+    - Get wallet balance | get_balance()
+    - Get wallet transactions | get_transactions()
+    - Send transaction | send_transaction()
+    - Receive pending transactions | get_updates()
+    - Monitor wallets for new transactions | run_transaction_listener()
+
+    Every call runs NodeJS process without blocking the event loop, number
+    of processes running at once is limited by max_concurrency. Every call
+    accepts timeout, timed out or cancelled call kills its NodeJS process.
+
+    Every call is timed by phases (spawn, connect, rpc, serialize, parse),
+    see src/metrics.py, prometheus_metrics() and profile().
+    """
+
+    def __init__(self, logger: object = None, nodejs_logs: bool = True, debug: bool = True, try_counter: int = 3,
+                 script_path: str = None, max_concurrency: int = 100, timeout: int | float = 60,
+                 pow_mode: str = 'remote', pow_processes: int = None, nodes: list[str] | str = None,
+                 hedge: bool = False, retry: RetryPolicy = None, metrics: Metrics | bool = True,
+                 async_logs: bool = False, log_forwarder: NodeLogForwarder = None, rpc: ViteRPC | bool = False):
+        """
+        :param nodejs_logs: bool, forward logs from nodejs script
+        :param debug: bool,  display debug logs
+        :param try_counter: int, how many re-tries of failed call (per call), used when retry is not set
+        :param script_path: str, path to the api_handler.js script, default is "./vitejs/api_handler.js"
+        :param max_concurrency: int, max number of NodeJS processes running at once
+        :param timeout: int | float, default timeout of single attempt in seconds
+        :param pow_mode: str, 'remote' (util_getPoWNonce on VITE node) or 'local' (solved by src/pow.py)
+        :param pow_processes: int, number of processes solving local PoW, default is number of cores
+        :param nodes: list[str] | str, VITE node urls or path to JSON config file, calls are routed
+                      to the fastest healthy node (see vitejs/pool.js), default is single node from env
+        :param hedge: bool, with many nodes send slow reads to the second node too
+        :param retry: RetryPolicy, re-tries, backoff and deadline of calls (timeouts and connection errors)
+        :param metrics: Metrics | bool, latency histograms and counters of calls and listener (True for default Metrics),
+                        share one Metrics object to aggregate many adapters
+        :param async_logs: bool, logger handlers are served from a queue by background thread (see queue_logging()),
+                           so logging never blocks the event loop on console or file I/O
+        :param log_forwarder: NodeLogForwarder, dedup, sampling and rate limit of forwarded nodejs logs,
+                              default is NodeLogForwarder(logger)
+        :param rpc: ViteRPC | bool, serve balance reads by address straight from the VITE node over keep-alive
+                    HTTP connections (in a thread), without NodeJS process, default False runs all calls in NodeJS
+        """
+        self.listener_task: asyncio.Task | None = None
+        self.nodejs_logs = nodejs_logs
+        self.try_counter = try_counter
+        self.logger = logger if logger else default_logger()
+        self.log_forwarder = log_forwarder or NodeLogForwarder(self.logger, enabled=nodejs_logs)
+        self.script = script_path if script_path else SCRIPT_PATH
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = timeout
+        self.debug = debug
+        self.pow_mode = pow_mode
+        self.pow_processes = pow_processes
+        self.pow_solver = PowSolver(pow_processes)
+        self.node_env = node_env(nodes, hedge)
+        self.rpc: ViteRPC | None = ViteRPC(nodes, timeout) if rpc is True else rpc or None
+
+        # Token list is read over JSON-RPC also when reads go through NodeJS (no idle connections are kept)
+        self.token_registry = TokenRegistry((self.rpc or ViteRPC(nodes, timeout, max_connections=0)).tokens)
+        self.retrier = Retrier(retry or RetryPolicy(retries=try_counter), self.logger)
+        self.metrics: Metrics | None = Metrics() if metrics is True else metrics or None
+        self.profiler = Profiler(self.logger)
+
+        if async_logs:
+            queue_logging(self.logger)
+
+    def _error_response(self, msg: str = None, code: str = 'unknown') -> dict:
+        func_name = inspect.currentframe().f_back.f_code.co_name
+        response = error_response(msg, code)
+
+        if self.debug:
+            self.logger.error(f"{func_name} | failed | {response['msg']}")
+
+        return response
+
+    async def _stream_command(self, command: list, timings: dict = None, stdin: str = None) -> AsyncIterator[dict]:
+        """
+        Run NodeJS script as asyncio subprocess and yield JSON frames from its payload channel.
+        :param command: Full NodeJS command as list
+        :param timings: dict, {'spawn': seconds, 'parse': seconds} to add time of starting the process
+                        and parsing the frames to
+        :param stdin: str, arguments too long for the command line (see split_args())
+        :return: AsyncIterator of dicts
+        """
+        loop = asyncio.get_running_loop()
+        timings = timings if timings is not None else dict.fromkeys(('spawn', 'parse'), 0.0)
+        stdin_ = asyncio.subprocess.PIPE if stdin is not None else None
+        started = time.perf_counter()
+
+        if not PAYLOAD_PIPE:
+            env = {**os.environ, **self.node_env, PAYLOAD_FD_ENV: '1'}
+            process = await asyncio.create_subprocess_exec(
+                *command, stdin=stdin_, stdout=asyncio.subprocess.PIPE, env=env, limit=FRAME_LIMIT)
+            timings['spawn'] += time.perf_counter() - started
+            stdin_task = self._write_stdin(process, stdin)
+
+            finished = False
+            try:
+                async for line in process.stdout:
+                    line = line.decode()
+
+                    if line.startswith(FRAME_SEPARATOR):
+                        yield self._parse_frame(line[1:], timings)
+                    else:
+                        self.log_forwarder.forward(line)
+                finished = True
+            finally:
+                await self._finish_process(process, kill=not finished)
+
+                if stdin_task:
+                    stdin_task.cancel()
+            return
+
+        read_fd, write_fd = os.pipe()
+        env = {**os.environ, **self.node_env, PAYLOAD_FD_ENV: str(write_fd)}
+        stdout = asyncio.subprocess.PIPE if self.nodejs_logs else asyncio.subprocess.DEVNULL
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command, stdin=stdin_, stdout=stdout, env=env, pass_fds=(write_fd,))
+        except Exception:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        timings['spawn'] += time.perf_counter() - started
+        stdin_task = self._write_stdin(process, stdin)
+        logs_task = asyncio.create_task(self._forward_logs(process.stdout)) if self.nodejs_logs else None
+        payload = asyncio.StreamReader(limit=FRAME_LIMIT)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(payload), os.fdopen(read_fd, 'rb'))
+
+        finished = False
+        try:
+            async for line in payload:
+                if line.strip():
+                    yield self._parse_frame(line, timings)
+            finished = True
+        finally:
+            transport.close()
+            await self._finish_process(process, kill=not finished)
+
+            for task in (stdin_task, logs_task):
+                if task:
+                    task.cancel()
+
+    @staticmethod
+    def _parse_frame(line: str | bytes, timings: dict) -> dict:
+        started = time.perf_counter()
+        frame = json.loads(line)
+        timings['parse'] += time.perf_counter() - started
+        return frame
+
+    @staticmethod
+    async def _finish_process(process: asyncio.subprocess.Process, kill: bool) -> None:
+        # Kill the script when call was cancelled or caller stopped reading frames early,
+        # otherwise only wait for it (killing just exited process races with the child watcher)
+        if kill and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        await process.wait()
+
+    async def _forward_logs(self, stream: asyncio.StreamReader) -> None:
+        # Filter logs from NodeJS to self.logger, see NodeLogForwarder
+        async for line in stream:
+            self.log_forwarder.forward(line.decode())
+
+    @staticmethod
+    def _write_stdin(process: asyncio.subprocess.Process, stdin: str | None) -> asyncio.Task | None:
+        # Written in background task, so the script's output is read meanwhile
+        async def write() -> None:
+            try:
+                process.stdin.write(stdin.encode())
+                await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        return asyncio.create_task(write()) if stdin is not None else None
+
+    async def _read_response(self, command: list, timings: dict = None, on_event=None, stdin: str = None) -> dict:
+        response = None
+
+        # Close the stream (and kill the process) right away when call is cancelled
+        async with aclosing(self._stream_command(command, timings, stdin)) as frames:
+            async for frame in frames:
+                if 'event' not in frame:
+                    response = frame
+                elif on_event:
+                    await self._emit(on_event, frame)
+
+        if response is None:
+            return error_response("no response from node.js script", code='process')
+
+        return response
+
+    async def _emit(self, on_event, frame: dict) -> None:
+        # Event callback can be a coroutine function, failing one must not break the call
+        try:
+            result = on_event(frame)
+
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            self.logger.error(f"event callback: {e}")
+
+    async def _run_command(self, command: list, timeout: int | float = None, timings: dict = None,
+                           on_event=None, stdin: str = None) -> dict:
+        """
+        Run NodeJS script and return dictionary with script payload (last frame).
+        :param command: Full NodeJS command as list
+        :param timeout: int | float, seconds to wait, default is self.timeout
+        :param timings: dict, see _stream_command()
+        :param on_event: function(frame) or coroutine function, event frames streamed before the payload
+        :param stdin: str, arguments too long for the command line (see split_args())
+        :return: dict
+        """
+        async with self.semaphore:
+            try:
+                return await asyncio.wait_for(
+                    self._read_response(command, timings, on_event, stdin), timeout or self.timeout)
+            except asyncio.TimeoutError:
+                return error_response(f"{command[2]} timeout", code='timeout')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return error_response(str(e), code='process')
+
+    async def _execute(self, name: str, timeout: int | float = None, on_event=None, **args) -> dict:
+        timings = dict.fromkeys(('spawn', 'parse'), 0.0)
+        started = time.perf_counter()
+
+        # Profile covers the event loop thread, so also other tasks running meanwhile
+        with self.profiler.profile(name):
+            if self.rpc and self.rpc.supports(name, args):
+                # Blocking HTTP call in the default thread pool, bounded by max_concurrency as NodeJS calls
+                async with self.semaphore:
+                    response = await asyncio.to_thread(self.rpc.execute, name, args, timeout)
+            else:
+                args, stdin = split_args(args)
+                response = await self._run_command(
+                    node_command(self.script, name, **args), timeout, timings, on_event, stdin)
+
+        # Move phase timings of the call from the response to self.metrics, see call_phases()
+        phases = call_phases(response, timings, time.perf_counter() - started)
+
+        if self.metrics:
+            self.metrics.observe_call(name, phases, response)
+
+        return response
+
+    async def _execute_with_retry(self, name: str, timeout: int | float = None, on_event=None,
+                                  policy: RetryPolicy = None, **args) -> dict:
+        # Re-try command by the policy (default self.retrier policy), timeout of every attempt is bounded by its deadline
+        timeout = timeout or self.timeout
+        response = await self.retrier.acall(
+            name, lambda left: self._execute(name, min(timeout, left) if left is not None else timeout, on_event, **args),
+            policy=policy)
+
+        if response['error'] and error_code(response) != 'no_pending':
+            return self._error_response(response['msg'], error_code(response))
+
+        return response
+
+    async def create_wallet(self, timeout: int | float = None) -> dict:
+        """
+        Create new VITE wallet
+        :param timeout: int | float, seconds to wait, default is self.timeout
+        :return: dict with raw mnemonic string and wallet address
+        """
+        return await self._execute('create', timeout)
+
+    async def create_wallets(self, count: int, addresses: int = 1, file: str | TextIO = None, processes: int = None,
+                             verify: bool = True) -> dict:
+        """
+        Create many VITE wallets in few NodeJS processes running at once (see ViteJsAdapter.create_wallets())
+        :param count: int, number of wallets
+        :param addresses: int, number of addresses derived for every wallet (address_id 0, 1, ...)
+        :param file: str | file object, write wallets as NDJSON lines instead of keeping them in memory
+        :param processes: int, max number of NodeJS processes, default is number of cores
+        :param verify: bool, cross-check addresses by deriving them once more from the mnemonics alone
+        :return: dict, data is list of {mnemonics, address, addresses: [{address_id, address}]}
+                 or number of wallets written to the file
+        """
+        batches = batch_sizes(count, processes or os.cpu_count() or 1)
+
+        with RecordSink(file, 'ndjson', private=True) as sink:
+            async def create(size: int) -> dict:
+                response = None
+                command = node_command(self.script, 'create', n=size, k=addresses, v=int(verify))
+
+                async with self.semaphore:
+                    try:
+                        async with aclosing(self._stream_command(command)) as frames:
+                            async for frame in frames:
+                                if frame.get('event') == 'wallet':
+                                    del frame['event']
+                                    sink.write(frame)
+                                else:
+                                    response = frame
+                    except Exception as e:
+                        response = error_response(str(e), code='process')
+
+                return response or error_response("no response from node.js script", code='process')
+
+            failed = [response for response in await asyncio.gather(*map(create, batches)) if response['error']]
+
+        if failed:
+            msg = f"{sink.count} of {count} wallets created: {failed[0]['msg']}"
+            return self._error_response(msg, error_code(failed[0]))
+
+        return {'error': 0, 'msg': 'create success', 'data': sink.data}
+
+    async def derive_addresses(self, mnemonics: str, address_ids: range | list[int] = range(1),
+                               timeout: int | float = None) -> dict:
+        """
+        Derive wallet addresses (HD sub-accounts) from mnemonics in one NodeJS call
+        :param mnemonics: str, wallet mnemonic seed phrase
+        :param address_ids: range | list of int, address derivation paths, i.e. range(0, 100)
+        :param timeout: int | float, seconds to wait, default is self.timeout
+        :return: dict, data is list of {address_id: int, address: str}
+        """
+        return await self._execute_with_retry('derive', timeout, m=mnemonics, i=[int(i) for i in address_ids])
+
+    async def get_balance(self, address: str = None, mnemonics: str = None, address_id: int | str = None,
+                          timeout: int | float = None, **kwargs) -> dict:
+        """
+        Get wallet balance from the VITE network, to get the balance mnemonics AND/OR address is required.
+        :param address: str, wallet address
+        :param mnemonics:, str, wallet mnemonic seed phrase
+        :param address_id: int | str, wallet address derivation path, default 0
+        :param timeout: int | float, seconds to wait, default is self.timeout
+        """
+        if address:
+            return await self._execute_with_retry('balance', timeout, a=address)
+
+        if mnemonics:
+            return await self._execute_with_retry('balance', timeout, a=0, m=mnemonics, i=address_id or 0)
+
+        return self._error_response("address or mnemonics is required", 'invalid')
+
+    async def get_balances(self, wallets: list[str | dict], batch_size: int = BALANCE_BATCH_SIZE,
+                           timeout: int | float = None) -> dict:
+        """
+        Get balances of many wallets from the VITE network, every batch_size addresses are
+        sent as a single JSON-RPC batch request, batches run concurrently (limited by max_concurrency).
+        :param wallets: list of addresses or wallet dictionaries {address: str, ...}
+        :param batch_size: int, max number of addresses in one request
+        :param timeout: int | float, seconds to wait for each batch, default is self.timeout
+        :return: dict, data is {address: get_balance() response}, failed addresses get error response
+        """
+        addresses = list(dict.fromkeys(wallet_address(wallet) for wallet in wallets))
+        batches = [addresses[i:i + batch_size] for i in range(0, len(addresses), batch_size)]
+        responses = await asyncio.gather(*[self._execute_with_retry('balance', timeout, b=1, a=batch) for batch in batches])
+        balances = dict()
+
+        for batch, response in zip(batches, responses):
+            if response['error']:
+                balances.update({address: error_response(response['msg'], error_code(response)) for address in batch})
+            else:
+                balances.update(response['data'])
+
+        return {'error': 0, 'msg': 'balances success', 'data': balances}
+
+    async def get_transactions(self, address: str, page_index: int | str = 0, page_size: int | str = 20,
+                               timeout: int | float = None, **kwargs) -> dict:
+        """
+        Get wallet transactions from the VITE network
+        :param address: str, wallet address
+        :param page_index: str | int, default 0
+        :param page_size: str | int, default 20
+        :param timeout: int | float, seconds to wait, default is self.timeout
+        """
+        return await self._execute_with_retry('transactions', timeout, a=address, i=page_index, s=page_size)
+
+    async def transaction_filter(self, tokens: list[str] = None, min_amount: int | float | str = None,
+                                 max_amount: int | float | str = None, senders: list[str] = None,
+                                 block_types: tuple[int, ...] | None = (4,)) -> TransactionFilter:
+        """
+        Compile TransactionFilter backed by self.token_registry (see ViteJsAdapter.transaction_filter()),
+        token list is loaded from the node in a thread, so the event loop isn't blocked
+        """
+        return await asyncio.to_thread(
+            TransactionFilter, tokens, self.token_registry, min_amount, max_amount, senders, block_types)
+
+    async def iter_transactions(self, address: str, page_size: int = HISTORY_PAGE_SIZE, since_height: int = None,
+                                prefetch: bool = True, typed: bool = False) -> AsyncIterator[dict | Transaction]:
+        """
+        Iterate over wallet transactions one by one, from the newest to the oldest one,
+        next page is fetched in background task while the current one is consumed (see ViteJsAdapter)
+        :param address: str, wallet address
+        :param page_size: int, transactions fetched with one call
+        :param since_height: int, only transactions above this account height, default is whole history
+        :param prefetch: bool, fetch next page while current one is consumed
+        :param typed: bool, yield compact Transaction records (src/models.py) instead of dicts
+        :return: AsyncIterator of transactions, raises ViteError (src/errors.py) when a page can't be fetched
+        """
+        since_height = since_height or 0
+
+        async def fetch(page_index: int) -> list[dict]:
+            response = await self._execute_with_retry('transactions', a=address, i=str(page_index), s=str(page_size))
+            return raise_for_error(response)['data'] or []
+
+        page_index, last_height = 0, None
+        next_page = asyncio.create_task(fetch(0)) if prefetch else None
+
+        try:
+            while True:
+                page = await next_page if prefetch else await fetch(page_index)
+                page_index += 1
+                done = len(page) < page_size or any(int(block['height']) <= since_height for block in page)
+
+                if prefetch and not done:
+                    next_page = asyncio.create_task(fetch(page_index))
+
+                for block in page:
+                    height = int(block['height'])
+
+                    if height > since_height and (last_height is None or height < last_height):
+                        last_height = height
+                        yield Transaction.from_dict(block, self.token_registry) if typed else block
+
+                if done:
+                    return
+        finally:
+            # Consumer stopped early, don't leave the page fetch running
+            if prefetch and not next_page.done():
+                next_page.cancel()
+
+    async def export_transactions(self, address: str, file, format: str = None, page_size: int = HISTORY_PAGE_SIZE,
+                                  since_height: int = None, fields: tuple[str, ...] = CSV_FIELDS) -> int:
+        """
+        Stream wallet history from iter_transactions() to NDJSON or CSV file (see src/export.py)
+        :return: int, number of exported transactions, raises ViteError when a page can't be fetched
+        """
+        async with aclosing(self.iter_transactions(address, page_size, since_height)) as transactions:
+            return await aexport_transactions(transactions, file, format, fields)
+
+    async def _send(self, args: dict, timeout: int | float) -> dict:
+        deadline = time.monotonic() + timeout if timeout else None
+        response = await self._execute('send', timeout, **args)
+
+        # Local PoW, solve the nonce in the process pool without blocking the event loop
+        for _ in range(POW_ATTEMPTS):
+            if response['msg'] != POW_REQUIRED:
+                break
+
+            pow_data = response['data']
+            remaining = max(deadline - time.monotonic(), 0.001) if deadline is not None else None
+
+            try:
+                nonce = await asyncio.to_thread(self.pow_solver.solve, pow_data['difficulty'], pow_data['hash'], remaining)
+            except asyncio.CancelledError:
+                # Processes stop searching, thread waiting for the nonce returns
+                self.pow_solver.cancel()
+                raise
+
+            if nonce is None:
+                return error_response("PoW nonce not solved before the deadline", 'timeout')
+
+            remaining = max(deadline - time.monotonic(), 0.001) if deadline is not None else None
+            response = await self._execute('send', remaining, n=nonce, f=str(pow_data['difficulty']),
+                                           r=pow_data['previousHash'], **args)
+        return response
+
+    async def _account_height(self, mnemonics: str, address_id: int | str) -> tuple[str | None, int | None]:
+        # Address and height of the account chain, (None, None) when it can't be fetched
+        response = await self._execute('balance', None, a=0, m=mnemonics, i=address_id)
+
+        if response['error']:
+            return None, None
+
+        balance = response['data']['balance'] or {}
+        return balance.get('address'), int(balance.get('blockCount') or 0)
+
+    async def _send_landed(self, response: dict, last_height: int | None, to_address: str, amount: str,
+                           mnemonics: str, address_id: int | str) -> dict | None:
+        """
+        Check if failed send took effect anyway (i.e. timeout after broadcast) before it's re-tried:
+        look for the send block above the old account height, by hash or height of the failed response
+        or by to_address and amount (see landed_send()).
+        :return: final response when the block is found or it can't be checked, None when safe to re-try
+        """
+        address, height = await self._account_height(mnemonics, address_id)
+        deadline = time.monotonic() + SEND_LANDED_WAIT
+
+        # Block broadcast just before the failure may not be on the account chain yet
+        while height is not None and height == last_height and time.monotonic() < deadline:
+            await asyncio.sleep(SEND_LANDED_POLL)
+            address, height = await self._account_height(mnemonics, address_id)
+
+        if last_height is None or height is None:
+            self.logger.warning(f"{response['msg']}, can't check sender's account, send is not re-tried")
+            return response
+
+        if height == last_height:
+            return None
+
+        # Newest blocks first, one page covers all blocks above the old height
+        transactions = await self._execute('transactions', None, a=address, i=0, s=height - last_height)
+
+        if transactions['error']:
+            self.logger.warning(f"{response['msg']}, can't check sender's account, send is not re-tried")
+            return response
+
+        for block in transactions['data'] or []:
+            if int(block['height']) > last_height and landed_send(block, to_address, amount, response):
+                return {'error': 0, 'msg': 'transaction success', 'data': block}
+
+        return None
+
+    async def send_transaction(self, to_address: str, mnemonics: str, token_id: str, amount: str | float,
+                               address_id: int | str = 0, timeout: int | float = None, pow_mode: str = None,
+                               **kwargs) -> dict:
+        """
+        Send transaction on the VITE blockchain. Failed send (timeout, connection error) is re-tried
+        only when it didn't land on the chain, see _send_landed().
+        :param to_address: str, wallet address
+        :param address_id; int, wallet address derivation path, default 0
+        :param mnemonics:, str, wallet mnemonic seed phrase
+        :param token_id: str, unique token id to send
+        :param amount: int | str, amount of the token to send
+        :param timeout: int | float, seconds to wait for single attempt, default is self.timeout
+        :param pow_mode: str, 'remote' | 'local', default is self.pow_mode
+        """
+        args = dict(m=mnemonics, i=address_id, d=to_address, t=token_id, a=str(amount), p=pow_mode or self.pow_mode)
+        _, last_height = await self._account_height(mnemonics, address_id)
+
+        timeout = timeout or self.timeout
+        response = await self.retrier.acall(
+            'send', lambda left: self._send(args, min(timeout, left) if left is not None else timeout),
+            verify=lambda response_: self._send_landed(response_, last_height, to_address, args['a'], mnemonics, address_id))
+
+        if response['error']:
+            return self._error_response(response['msg'], error_code(response))
+
+        return response
+
+    async def get_updates(self, mnemonics: str, address_id: str | int = 0, timeout: int | float = None,
+                          on_block=None, **kwargs) -> dict:
+        """
+        Update wallet balance by receiving pending transactions
+        :param mnemonics:, str, wallet mnemonic seed phrase
+        :param address_id; int, wallet address derivation path, default 0
+        :param timeout: int | float, seconds to wait, default is self.timeout
+        :param on_block: function(block) or coroutine function, called with {address, hash, height, sendBlockHash}
+                         of every receive block as soon as the node accepts it
+        """
+        # Receiving many pending blocks can take long, attempts are not bounded by the policy deadline
+        response = await self._execute_with_retry('update', timeout, on_block, self.retrier.policy.without_deadline(),
+                                                  m=mnemonics, i=address_id)
+
+        if error_code(response) == 'no_pending':
+            return {'error': 0, 'msg': "No pending transactions", 'data': None}
+
+        return response
+
+    async def receive_many(self, wallets: list[dict], concurrency: int = None, on_block=None,
+                           timeout: int | float = None, batch_size: int = RECEIVE_BATCH_SIZE) -> dict:
+        """
+        Receive pending transactions of many wallets at once, batches of batch_size wallets
+        run concurrently (see ViteJsAdapter.receive_many())
+        :param wallets: list of dictionaries {mnemonics: str, address_id(optional): str | int, address(optional): str}
+        :param concurrency: int, max receive blocks sent at once per node, default is 8 (VITE_RECEIVE_CONCURRENCY)
+        :param on_block: function(block) or coroutine function, called with {address, hash, height, sendBlockHash}
+                         of every receive block as soon as the node accepts it
+        :param timeout: int | float, seconds to wait for every batch, default is self.timeout
+        :param batch_size: int, max number of wallets in one NodeJS call
+        :return: dict, data is {address: get_updates() response}, wallets of failed batch get its error
+                 (when their address is given)
+        """
+        batches = [wallets[i:i + batch_size] for i in range(0, len(wallets), batch_size)]
+
+        async def receive(batch: list[dict]) -> dict:
+            accounts = [{'mnemonics': wallet['mnemonics'], 'address_id': int(wallet.get('address_id') or 0)}
+                        for wallet in batch]
+            args = dict(j=json.dumps(accounts), c=concurrency) if concurrency else dict(j=json.dumps(accounts))
+            return await self._execute('receive_batch', timeout, on_block, **args)
+
+        updates = dict()
+
+        for batch, response in zip(batches, await asyncio.gather(*map(receive, batches))):
+            if response['error']:
+                updates.update({wallet['address']: error_response(response['msg'], error_code(response))
+                                for wallet in batch if wallet.get('address')})
+                continue
+
+            for address, update_ in response['data'].items():
+                if error_code(update_) == 'no_pending':
+                    update_ = {'error': 0, 'msg': "No pending transactions", 'data': None}
+                updates[address] = update_
+
+        return {'error': 0, 'msg': 'receive success', 'data': updates}
+
+    async def _process_wallet(self, wallet: dict, balance_: dict, filter_: TransactionFilter, callback, update_: dict = None) -> None:
+        if balance_['error']:
+            return
+
+        pending = int(balance_['data']['unreceived']['blockCount'])
+
+        if not pending:
+            return
+
+        self.logger.info(f"tx_listener: {pending} new transactions")
+        update_ = update_ or await self.get_updates(**wallet)
+
+        if update_['error']:
+            return
+
+        transactions_ = await self.get_transactions(address=wallet['address'], page_size=pending + 1)
+
+        if transactions_['error']:
+            return
+
+        transactions = filter_.filter(transactions_['data'])
+
+        if callback:
+            result = callback(transactions)
+
+            if inspect.isawaitable(result):
+                await result
+
+    async def _transaction_listener(self, wallets: list[dict], tokens: list[str] | TransactionFilter,
+                                    interval: int | float, callback) -> None:
+        filter_ = tokens if isinstance(tokens, TransactionFilter) else await self.transaction_filter(tokens)
+
+        while True:
+            # Balances of all wallets in one call, wallets with pending transactions are received at once
+            started = time.monotonic()
+
+            try:
+                balances = (await self.get_balances(wallets))['data']
+                pending = [wallet for wallet in wallets if not balances[wallet['address']]['error']
+                           and int(balances[wallet['address']]['data']['unreceived']['blockCount'])]
+                updates = (await self.receive_many(pending))['data'] if pending else dict()
+                results = await asyncio.gather(
+                    *[self._process_wallet(wallet, balances[wallet['address']], filter_, callback, updates.get(wallet['address']))
+                      for wallet in wallets], return_exceptions=True)
+
+                for result in results:
+                    if isinstance(result, Exception):
+                        self._error_response(str(result))
+
+            except Exception as e:
+                # Failed pass is logged, the next one runs after interval as usual
+                self.logger.error(f"tx_listener: {e}")
+
+            if self.metrics:
+                self.metrics.observe_pass(time.monotonic() - started)
+
+            await asyncio.sleep(interval)
+
+    def retry_stats(self) -> dict:
+        """Calls, attempts, re-tries, failures and time spent re-trying per operation, see RetryMetrics"""
+        return self.retrier.metrics.stats()
+
+    def metrics_stats(self) -> dict:
+        """Calls by result and latency summary per operation and phase, listener passes, see Metrics.stats()"""
+        return self.metrics.stats() if self.metrics else dict()
+
+    def prometheus_metrics(self) -> str:
+        """Call latency histograms, results, re-tries and listener metrics in Prometheus text format"""
+        metrics = self.metrics or Metrics()
+        return metrics.prometheus(retries=self.retrier.metrics.stats())
+
+    def serve_metrics(self, port: int, host: str = ''):
+        """
+        Serve prometheus_metrics() on http://host:port/metrics in background thread
+        :return: server, call shutdown() to stop it
+        """
+        return (self.metrics or Metrics()).serve(port, self.prometheus_metrics, host)
+
+    def profile(self, operation: str, calls: int = 1, path: str = None) -> None:
+        """
+        Profile next calls of the operation with cProfile (the event loop thread while the call runs),
+        top functions are logged or stats are saved to the path, see Profiler.arm()
+        :param operation: str, command name, i.e. 'balance', 'transactions', 'send', 'update'
+        :param calls: int, number of next calls to profile
+        :param path: str, pstats file path, '{n}' is replaced by call number
+        """
+        self.profiler.arm(operation, calls, path)
+
+    def log_stats(self) -> dict:
+        """Forwarded, duplicate, sampled out and rate limited nodejs log lines, see NodeLogForwarder"""
+        return self.log_forwarder.stats()
+
+    def run_transaction_listener(self, tokens: list[str] | TransactionFilter, wallets: list[dict[str, str, str | int]] = None,
+                                 interval: int = 10, callback=None) -> asyncio.Task:
+        """
+        Run background task that will monitor given Vite wallets, update (receive)
+        the new transactions and return them to the callback functions.
+        Wallets are processed concurrently (limited by max_concurrency).
+        :param tokens: list of str | TransactionFilter, token symbols (exact match) or tokenIds, if tokens = ['__all__']
+                       it will check for all of them, see transaction_filter() for amount and sender predicates
+        :param wallets: list of dictionaries {address: str, mnemonics: str, address_id(optional): str | int}
+        :param interval: int, refresh time interval in seconds
+        :param callback: callback function or coroutine function to return list of new received transactions
+        :return: asyncio.Task
+        """
+        self.listener_task = asyncio.create_task(self._transaction_listener(wallets or [], tokens, interval, callback))
+
+        if self.debug:
+            self.logger.debug(f"Transaction listener started")
+
+        return self.listener_task
+
+    async def stop_transaction_listener(self) -> None:
+        """Cancel the running transaction listener task"""
+        if self.listener_task:
+            if self.debug:
+                self.logger.debug(f"Stopping transaction listener..")
+
+            self.listener_task.cancel()
+
+            try:
+                await self.listener_task
+            except asyncio.CancelledError:
+                pass
+
+            self.listener_task = None
+
+    def close(self) -> None:
+        """Terminate local PoW solver processes and close idle RPC connections"""
+        self.pow_solver.close()
+
+        if self.rpc:
+            self.rpc.close()
@@ -0,0 +1,166 @@
+import threading
+import json
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class LedgerCache:
+    """
+    Read-through cache for balances and transaction pages.
+
+    Entries expire after ttl seconds, least recently used entries are evicted
+    when max_entries or max_bytes (estimated JSON size) is exceeded.
+    Concurrent misses of the same key wait for one call (single-flight).
+    All entries of the address can be invalidated, i.e. after sending or
+    receiving transactions. Cached responses are shared, treat them as read-only.
+    """
+
+    def __init__(self, ttl: float = 5, max_entries: int = 10_000, max_bytes: int = 64 * 1024 ** 2):
+        """
+        :param ttl: float, seconds the entry is valid
+        :param max_entries: int, max number of cached entries
+        :param max_bytes: int, memory budget, estimated from JSON size of cached responses
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size: int = 0
+
+        self._entries: OrderedDict[tuple, tuple[float, int, dict]] = OrderedDict()
+        self._addresses: dict[str, set[tuple]] = dict()
+        self._generations: dict[str, int] = dict()
+        self._loading: dict[tuple, Future] = dict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'invalidations': 0, 'coalesced': 0}
+
+    def get(self, key: tuple) -> dict | None:
+        """
+        Get not expired entry
+        :param key: tuple, (kind, address, *params)
+        :return: cached response or None
+        """
+        with self._lock:
+            return self._get(key)
+
+    def get_or_load(self, key: tuple, loader) -> dict:
+        """
+        Get cached response or call loader() once for all concurrent callers,
+        only successful responses (error == 0) are cached.
+        :param key: tuple, (kind, address, *params)
+        :param loader: function() -> response dict
+        :return: dict
+        """
+        with self._lock:
+            response = self._get(key)
+
+            if response is not None:
+                return response
+
+            future = self._loading.get(key)
+            owner = future is None
+
+            if owner:
+                future = self._loading[key] = Future()
+                generation = self._generations.get(key[1], 0)
+            else:
+                self._stats['coalesced'] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            response = loader()
+            self.set(key, response, generation)
+            future.set_result(response)
+            return response
+
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def set(self, key: tuple, response: dict, generation: int = None) -> None:
+        """
+        Cache successful response
+        :param key: tuple, (kind, address, *params)
+        :param response: dict
+        :param generation: int, skip response loaded before the address was invalidated
+        """
+        if not response or response['error']:
+            return
+
+        size = len(json.dumps(response, separators=(',', ':')))
+
+        with self._lock:
+            if size > self.max_bytes:
+                return
+
+            if generation is not None and generation != self._generations.get(key[1], 0):
+                return
+
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, response)
+            self._addresses.setdefault(key[1], set()).add(key)
+            self.size += size
+
+            # Evict least recently used entries
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def invalidate(self, address: str) -> None:
+        """Remove all entries of the address"""
+        with self._lock:
+            keys = self._addresses.pop(address, set())
+            self._generations[address] = self._generations.get(address, 0) + 1
+
+            for key in keys:
+                self._remove(key)
+
+            self._stats['invalidations'] += len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._addresses.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        """Counters: hits, misses, evictions, expired, invalidations, coalesced (waited for other call)"""
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'bytes': self.size}
+
+    def _get(self, key: tuple) -> dict | None:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self._stats['misses'] += 1
+            return None
+
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self._stats['expired'] += 1
+            self._stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats['hits'] += 1
+        return entry[2]
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+
+        if entry:
+            self.size -= entry[1]
+            keys = self._addresses.get(key[1])
+
+            if keys:
+                keys.discard(key)
+
+                if not keys:
+                    del self._addresses[key[1]]
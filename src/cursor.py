@@ -0,0 +1,91 @@
+import threading
+import sqlite3
+import time
+
+
+class CursorStore:
+    """
+    Durable per-address cursor (last delivered block height and hash) in SQLite.
+
+    Used by the transaction listener to fetch only blocks above the cursor and
+    to deliver every received block, also across restarts. Deliveries of one address
+    are serialized, the callback runs outside of the store lock and SQLite transaction
+    and the cursor is moved after the callback acknowledged the blocks. Delivery is
+    at-least-once: blocks acknowledged right before a crash are delivered again
+    after restart, so the callback should be idempotent (i.e. keyed by block hash).
+    """
+
+    def __init__(self, path: str = 'vite_cursors.sqlite3'):
+        """
+        :param path: str, SQLite database file path, ':memory:' for tests
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._address_locks: dict[str, threading.Lock] = dict()
+
+        with self._lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS cursors ("
+                "address TEXT PRIMARY KEY, height INTEGER NOT NULL, hash TEXT, updated REAL NOT NULL)")
+
+    def get(self, address: str) -> tuple[int, str] | None:
+        """
+        :param address: str, wallet address
+        :return: (height, hash) of the last delivered block or None
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT height, hash FROM cursors WHERE address = ?", (address,)).fetchone()
+
+        return tuple(row) if row else None
+
+    def deliver(self, address: str, blocks: list[dict], callback=None, height: int = None, hash_: str = None) -> bool:
+        """
+        Call back with blocks above the cursor, then move the cursor.
+        Blocks already delivered by concurrent call for the same address are skipped.
+        Cursor is not moved when callback raises exception or returns False.
+        :param address: str, wallet address
+        :param blocks: list of blocks to deliver (sorted by height)
+        :param callback: function(blocks) -> bool | None
+        :param height: int, new cursor height, default is height of the last block
+        :param hash_: str, new cursor hash, default is hash of the last block
+        :return: bool, True if blocks were acknowledged and cursor moved
+        """
+        if height is None:
+            if not blocks:
+                return True
+            height, hash_ = int(blocks[-1]['height']), blocks[-1]['hash']
+
+        with self._address_lock(address):
+            cursor = self.get(address)
+
+            if cursor is not None:
+                blocks = [block for block in blocks if int(block['height']) > cursor[0]]
+
+            if callback and blocks and callback(blocks) is False:
+                return False
+
+            with self._lock:
+                # Cursor never moves back
+                self.connection.execute(
+                    "INSERT INTO cursors (address, height, hash, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(address) DO UPDATE SET height = excluded.height, hash = excluded.hash, "
+                    "updated = excluded.updated WHERE excluded.height >= cursors.height",
+                    (address, height, hash_, time.time()))
+
+            return True
+
+    def _address_lock(self, address: str) -> threading.Lock:
+        with self._lock:
+            return self._address_locks.setdefault(address, threading.Lock())
+
+    def reset(self, address: str) -> None:
+        """Remove cursor of the address, next time it will start from the latest blocks"""
+        with self._lock:
+            self.connection.execute("DELETE FROM cursors WHERE address = ?", (address,))
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,85 @@
+class ViteError(Exception):
+    """
+    Failed call, class is chosen by the 'code' of the error response:
+    NodeJS scripts set it (see vitejs/tools.js), python side sets it for
+    timeouts and crashed scripts. Only retryable errors are re-tried.
+    """
+    code = 'unknown'
+    retryable = False
+
+    def __init__(self, msg: str = None, response: dict = None):
+        super().__init__(msg)
+        self.response = response
+
+
+class NodeTimeout(ViteError):
+    """VITE node or NodeJS script didn't answer in time, call may have taken effect"""
+    code = 'timeout'
+    retryable = True
+
+
+class NodeConnectionError(ViteError):
+    """Connection to VITE node failed"""
+    code = 'connection'
+    retryable = True
+
+
+class ProcessError(ViteError):
+    """NodeJS script (or worker) crashed or returned nothing"""
+    code = 'process'
+    retryable = True
+
+
+class NodeRPCError(ViteError):
+    """VITE node rejected the call, i.e. invalid params or not enough balance"""
+    code = 'node'
+
+
+class PowRequired(ViteError):
+    """Send needs PoW nonce solved by the caller (local PoW mode)"""
+    code = 'pow_required'
+
+
+class NoPending(ViteError):
+    """No pending transactions to receive"""
+    code = 'no_pending'
+
+
+class InvalidRequest(ViteError):
+    """Invalid command or arguments"""
+    code = 'invalid'
+
+
+ERROR_CLASSES = {error.code: error for error in (
+    ViteError, NodeTimeout, NodeConnectionError, ProcessError, NodeRPCError, PowRequired, NoPending, InvalidRequest)}
+
+# Errors re-tried by default RetryPolicy
+RETRYABLE_ERRORS = tuple(error for error in ERROR_CLASSES.values() if error.retryable)
+
+
+def error_code(response: dict) -> str | None:
+    """Code of the error response, None for success"""
+    if not response['error']:
+        return None
+
+    if response.get('code') in ERROR_CLASSES:
+        return response['code']
+
+    # Response without code, i.e. from older script
+    return 'timeout' if 'timeout' in str(response.get('msg')).lower() else 'unknown'
+
+
+def error_from_response(response: dict) -> ViteError | None:
+    """Typed error of the response, None for success"""
+    code = error_code(response)
+    return ERROR_CLASSES[code](response.get('msg'), response) if code else None
+
+
+def raise_for_error(response: dict) -> dict:
+    """Raise typed error of the error response, return successful response as it is"""
+    error = error_from_response(response)
+
+    if error:
+        raise error
+
+    return response
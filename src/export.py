@@ -0,0 +1,117 @@
+import json
+import csv
+import os
+
+from typing import Iterable, AsyncIterable, TextIO
+
+
+# Columns of CSV export, nested fields are joined with dots
+CSV_FIELDS = ('height', 'hash', 'blockType', 'fromAddress', 'toAddress', 'tokenId', 'tokenInfo.tokenSymbol',
+              'tokenInfo.decimals', 'amount', 'fee', 'timestamp', 'confirmations', 'sendBlockHash')
+
+
+def _field(transaction: dict, field: str):
+    value = transaction
+
+    for key in field.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+
+    return value
+
+
+class RecordSink:
+    """
+    Write records (transactions, created wallets) one by one to NDJSON (one JSON object per line)
+    or CSV file, nothing but the current record is kept in memory. Without file records are kept in a list.
+    """
+
+    def __init__(self, file: str | TextIO = None, format: str = None, fields: tuple[str, ...] = CSV_FIELDS,
+                 private: bool = False):
+        """
+        :param file: str | file object | None, path is opened for writing (and closed by close()), None keeps records
+        :param format: str, 'ndjson' | 'csv', default is by the file extension ('.csv'), otherwise 'ndjson'
+        :param fields: tuple of str, CSV columns, nested fields with dots, i.e. 'tokenInfo.tokenSymbol'
+        :param private: bool, file opened from path is readable only by its owner (i.e. wallets with mnemonics),
+                        also when it existed before
+        """
+        if format is None:
+            format = 'csv' if isinstance(file, str) and os.path.splitext(file)[1].lower() == '.csv' else 'ndjson'
+
+        if format not in ('ndjson', 'csv'):
+            raise ValueError(f"unknown export format {format}")
+
+        self.format = format
+        self.fields = fields
+        self.count: int = 0
+        self.records: list[dict] | None = list() if file is None else None
+        self._owned = isinstance(file, str)
+        self._file = self._open(file, private) if self._owned else file
+        self._writer = None
+
+        if format == 'csv' and self._file is not None:
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(fields)
+
+    @staticmethod
+    def _open(path: str, private: bool) -> TextIO:
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600 if private else 0o666)
+
+        # Mode of os.open() applies only to new files, existing file keeps its permissions
+        if private and hasattr(os, 'fchmod'):
+            os.fchmod(descriptor, 0o600)
+
+        return open(descriptor, 'w', newline='', encoding='utf-8')
+
+    def write(self, record: dict) -> None:
+        if self._file is None:
+            self.records.append(record)
+        elif self._writer:
+            self._writer.writerow([_field(record, field) for field in self.fields])
+        else:
+            self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+        self.count += 1
+
+    @property
+    def data(self) -> list[dict] | int:
+        """Kept records or number of records written to the file"""
+        return self.records if self._file is None else self.count
+
+    def close(self) -> None:
+        if self._owned:
+            self._file.close()
+        elif self._file is not None:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def export_transactions(transactions: Iterable[dict], file: str | TextIO, format: str = None,
+                        fields: tuple[str, ...] = CSV_FIELDS) -> int:
+    """
+    Stream transactions (i.e. from iter_transactions()) to the NDJSON or CSV file, see RecordSink
+    :return: int, number of exported transactions
+    """
+    with RecordSink(file, format, fields) as sink:
+        for transaction in transactions:
+            sink.write(transaction)
+
+    return sink.count
+
+
+async def aexport_transactions(transactions: AsyncIterable[dict], file: str | TextIO, format: str = None,
+                               fields: tuple[str, ...] = CSV_FIELDS) -> int:
+    """
+    Stream transactions of async iterator (i.e. AsyncViteJsAdapter.iter_transactions()) to the file,
+    see RecordSink
+    :return: int, number of exported transactions
+    """
+    with RecordSink(file, format, fields) as sink:
+        async for transaction in transactions:
+            sink.write(transaction)
+
+    return sink.count
@@ -0,0 +1,60 @@
+import threading
+import hashlib
+
+from collections import OrderedDict
+
+
+class Keyring:
+    """
+    Bounded LRU cache of addresses derived from mnemonics.
+
+    Keyed by hash of the mnemonics, so mnemonics are not kept as keys. Every
+    (mnemonics, address_id) is derived by NodeJS once, after that Python side
+    resolves the address without running the script (i.e. balance by mnemonics).
+    Private keys stay in the NodeJS keyring (vitejs/keyring.js).
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        """
+        :param max_entries: int, max number of cached addresses
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[bytes, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(mnemonics: str, address_id: int | str) -> tuple[bytes, int]:
+        return hashlib.sha256(mnemonics.encode()).digest(), int(address_id)
+
+    def get(self, mnemonics: str, address_id: int | str = 0) -> str | None:
+        """
+        :param mnemonics: str, wallet mnemonic seed phrase
+        :param address_id: int | str, wallet address derivation path
+        :return: cached address or None
+        """
+        key = self._key(mnemonics, address_id)
+
+        with self._lock:
+            address = self._entries.get(key)
+
+            if address:
+                self._entries.move_to_end(key)
+
+            return address
+
+    def set(self, mnemonics: str, address_id: int | str, address: str) -> None:
+        key = self._key(mnemonics, address_id)
+
+        with self._lock:
+            self._entries[key] = address
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
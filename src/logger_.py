@@ -49,14 +49,15 @@ class LogFormatter(logging.Formatter):
 
 # Setup logging
 def setup_logging(console_log_output, console_log_level, console_log_color, logfile_file, logfile_log_level,
-                  logfile_log_color, log_line_template, log_to_file: bool = False):
+                  logfile_log_color, log_line_template, log_to_file: bool = False, name: str = None):
     # Create logger
-    # For simplicity, we use the root logger, i.e. call 'logging.getLogger()'
-    # without name argument. This way we can simply use module methods
-    # for logging throughout the script. An alternative would be exporting
-    # the logger, i.e. 'global logger; logger = logging.getLogger("<name>")'
-    logger = logging.getLogger()
-    # logger.propagate = False
+    # Named logger is used by the library, so the root logger (and logging
+    # of the application) is left as it is. Records don't propagate to the
+    # root logger to avoid printing them twice.
+    logger = logging.getLogger(name)
+
+    if name:
+        logger.propagate = False
 
     # Set global log level to 'debug' (required for handler levels to work)
     logger.setLevel(logging.DEBUG)
@@ -109,8 +110,9 @@ def setup_logging(console_log_output, console_log_level, console_log_color, logf
     return logger
 
 
-def get_logger():
+def get_logger(name: str = 'vite_wallet_adapter'):
     script_name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
     return setup_logging(console_log_output="stdout", console_log_level="debug", console_log_color=True,
                          logfile_file=script_name + ".log", logfile_log_level="debug", logfile_log_color=False,
-                         log_line_template="%(color_on)s[%(asctime)s] [%(levelname)-8s] %(message)s%(color_off)s")
\ No newline at end of file
+                         log_line_template="%(color_on)s[%(asctime)s] [%(levelname)-8s] %(message)s%(color_off)s",
+                         name=name)
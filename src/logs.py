@@ -0,0 +1,153 @@
+import logging.handlers
+import threading
+import logging
+import atexit
+import random
+import queue
+import time
+
+from collections import OrderedDict
+
+
+_lock = threading.Lock()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler which never blocks the caller, records coming when the queue is full are dropped"""
+
+    def __init__(self, queue_: queue.Queue):
+        super().__init__(queue_)
+        self.dropped: int = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def queue_logging(logger: logging.Logger, max_size: int = 10_000) -> logging.handlers.QueueListener:
+    """
+    Move handlers of the logger (or of its parents when it has none) behind a bounded queue served
+    by background thread, so logging call only enqueues the record and never waits for console or
+    file I/O. Logger stops propagating to its parents, records are dropped when the queue is full.
+    Queue is flushed at exit, calling it again returns the running listener.
+    :param logger: logging.Logger
+    :param max_size: int, max number of records waiting in the queue
+    :return: QueueListener, stop() flushes the queue
+    """
+    with _lock:
+        listener = getattr(logger, 'queue_listener', None)
+
+        if listener:
+            return listener
+
+        # Handlers which would get the record without the queue
+        handlers, current = list(), logger
+
+        while current and not handlers:
+            handlers = list(current.handlers)
+            current = current.parent if current.propagate else None
+
+        queue_ = queue.Queue(max_size)
+        listener = logging.handlers.QueueListener(queue_, *handlers, respect_handler_level=True)
+
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+        logger.addHandler(DroppingQueueHandler(queue_))
+        logger.propagate = False
+        logger.queue_listener = listener
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class NodeLogForwarder:
+    """
+    Forward log lines of NodeJS scripts ('>> ...') to the logger without flooding it:
+    - dedup: line forwarded within dedup_ttl seconds is skipped (LRU of last dedup_size lines,
+      shared by all NodeJS processes of the adapter)
+    - sampling: only `sample` share of lines is forwarded
+    - rate limit: at most `rate` lines per second (bursts up to `burst`), number of lines
+      suppressed meanwhile is logged with the next forwarded line
+    Safe to call from many log reading threads.
+    """
+
+    def __init__(self, logger: object, enabled: bool = True, rate: float = 20, burst: int = 50, sample: float = 1.0,
+                 dedup_size: int = 1024, dedup_ttl: float = 60):
+        """
+        :param logger: object, logger for forwarded lines
+        :param enabled: bool, forward anything at all
+        :param rate: float, max forwarded lines per second
+        :param burst: int, max lines forwarded at once after quiet period
+        :param sample: float, 0-1, share of lines forwarded
+        :param dedup_size: int, number of last distinct lines remembered
+        :param dedup_ttl: float, seconds, the same line is forwarded again after that
+        """
+        self.logger = logger
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.sample = sample
+        self.dedup_size = dedup_size
+        self.dedup_ttl = dedup_ttl
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self._tokens: float = burst
+        self._refilled: float = time.monotonic()
+        self._suppressed: int = 0
+        self._counters = {'forwarded': 0, 'duplicates': 0, 'sampled_out': 0, 'rate_limited': 0}
+        self._lock = threading.Lock()
+
+    def forward(self, line: str, prefixed_only: bool = True) -> None:
+        """
+        :param line: str, raw line from NodeJS process
+        :param prefixed_only: bool, forward only lines starting with '>>' (other ones are script noise)
+        """
+        line = line.strip()
+
+        if not self.enabled or not line or (prefixed_only and not line.startswith('>>')):
+            return
+
+        line = line.replace('>>', 'node.js >>', 1) if line.startswith('>>') else f"node.js >> {line}"
+        now = time.monotonic()
+
+        with self._lock:
+            seen = self._seen.get(line)
+
+            if seen is not None and now - seen < self.dedup_ttl:
+                self._counters['duplicates'] += 1
+                return
+
+            self._seen[line] = now
+            self._seen.move_to_end(line)
+
+            while len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+
+            if self.sample < 1 and random.random() >= self.sample:
+                self._counters['sampled_out'] += 1
+                return
+
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+
+            if self._tokens < 1:
+                self._counters['rate_limited'] += 1
+                self._suppressed += 1
+                return
+
+            self._tokens -= 1
+            self._counters['forwarded'] += 1
+            suppressed, self._suppressed = self._suppressed, 0
+
+        if suppressed:
+            self.logger.info(f"node.js >> {suppressed} log lines suppressed (rate limit)")
+
+        self.logger.info(line)
+
+    def stats(self) -> dict:
+        """Counters of lines: forwarded, duplicates, sampled_out, rate_limited"""
+        with self._lock:
+            return dict(self._counters)
@@ -0,0 +1,300 @@
+import threading
+import cProfile
+import pstats
+import bisect
+import time
+import io
+
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# Upper bounds (seconds) of latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Phases of single call:
+# - spawn: starting NodeJS process until command runs (0 in worker mode)
+# - connect: connecting to VITE node (websocket opened by the call)
+# - rpc: waiting for VITE node responses
+# - serialize: JSON serialization of the response in NodeJS
+# - parse: JSON parsing of the response in python
+# - total: whole call measured by python
+PHASES = ('spawn', 'connect', 'rpc', 'serialize', 'parse', 'total')
+
+
+def call_phases(response: dict, timings: dict, total: float) -> dict[str, float]:
+    """
+    Phases of the call in seconds, NodeJS side phases (ms) are popped from response 'timings'
+    :param response: dict, command response
+    :param timings: dict, python side phases in seconds, {'spawn': float, 'parse': float}
+    :param total: float, seconds of the whole call
+    """
+    node = response.pop('timings', None) or dict()
+
+    return {'spawn': timings['spawn'] + node.get('startup', 0) / 1000,
+            **{phase: node[phase] / 1000 for phase in ('connect', 'rpc', 'serialize') if phase in node},
+            'parse': timings['parse'] + node.get('parse', 0) / 1000,
+            'total': total}
+
+
+class Histogram:
+    """Cumulative latency histogram (Prometheus style buckets)"""
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def summary(self) -> dict:
+        return {'count': self.count, 'avg': self.sum / self.count if self.count else 0.0, 'max': self.max}
+
+
+def _labels(**labels) -> str:
+    escaped = {name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for name, value in labels.items()}
+    return ','.join(f'{name}="{value}"' for name, value in escaped.items())
+
+
+class Metrics:
+    """
+    Latency histograms and counters of adapter calls (per operation and phase)
+    and of the transaction listener (pass duration, per-wallet lag).
+
+    Hooks are functions(operation, timings, response) called after every call
+    with phase timings in seconds, i.e. to forward them to statsd or OpenTelemetry.
+    prometheus() renders everything in Prometheus text format, serve() exposes it over HTTP.
+    """
+
+    def __init__(self, buckets: tuple = BUCKETS, wallet_lag: bool = True):
+        """
+        :param buckets: tuple of float, upper bounds (seconds) of histogram buckets
+        :param wallet_lag: bool, keep lag of every listener wallet (one gauge per address)
+        """
+        self.buckets = buckets
+        self.wallet_lag = wallet_lag
+        self._calls: dict[tuple[str, str], Histogram] = dict()
+        self._results: dict[tuple[str, str], int] = dict()
+        self._listener_pass = Histogram(buckets)
+        self._wallet_lags: dict[str, float] = dict()
+        self._hooks: list = list()
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook) -> None:
+        """:param hook: function(operation: str, timings: dict[str, float], response: dict)"""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        self._hooks.remove(hook)
+
+    def observe_call(self, operation: str, timings: dict[str, float], response: dict) -> None:
+        """
+        :param operation: str, command name, i.e. 'balance'
+        :param timings: dict, {phase: seconds}
+        :param response: dict, response of the call
+        """
+        result = response.get('code', 'unknown') if response['error'] else 'ok'
+
+        with self._lock:
+            for phase, seconds in timings.items():
+                histogram = self._calls.get((operation, phase))
+
+                if histogram is None:
+                    histogram = self._calls[(operation, phase)] = Histogram(self.buckets)
+
+                histogram.observe(seconds)
+
+            self._results[(operation, result)] = self._results.get((operation, result), 0) + 1
+
+        for hook in self._hooks:
+            hook(operation, timings, response)
+
+    def observe_pass(self, seconds: float) -> None:
+        """Duration of one transaction listener pass (check and process group of wallets)"""
+        with self._lock:
+            self._listener_pass.observe(seconds)
+
+    def observe_wallet_lag(self, address: str, seconds: float) -> None:
+        """Seconds between the time wallet was due to be checked and its check"""
+        if self.wallet_lag:
+            with self._lock:
+                self._wallet_lags[address] = seconds
+
+    def remove_wallet(self, address: str) -> None:
+        with self._lock:
+            self._wallet_lags.pop(address, None)
+
+    def stats(self) -> dict:
+        """
+        Summary: {operations: {operation: {results: {ok | error code: count}, phases: {phase: {count, avg, max}}}},
+                  listener: {passes: {count, avg, max}, max_wallet_lag}}
+        """
+        with self._lock:
+            operations = dict()
+
+            for (operation, result), count in self._results.items():
+                operations.setdefault(operation, {'results': {}, 'phases': {}})['results'][result] = count
+
+            for (operation, phase), histogram in self._calls.items():
+                operations.setdefault(operation, {'results': {}, 'phases': {}})['phases'][phase] = histogram.summary()
+
+            return {'operations': operations,
+                    'listener': {'passes': self._listener_pass.summary(),
+                                 'max_wallet_lag': max(self._wallet_lags.values(), default=0.0)}}
+
+    def prometheus(self, retries: dict = None) -> str:
+        """
+        Metrics in Prometheus text exposition format
+        :param retries: dict, RetryMetrics.stats() to export with calls
+        """
+        lines = list()
+
+        with self._lock:
+            lines += ['# HELP vite_call_duration_seconds Duration of adapter calls by phase',
+                      '# TYPE vite_call_duration_seconds histogram']
+
+            for (operation, phase), histogram in sorted(self._calls.items()):
+                lines += self._histogram('vite_call_duration_seconds', histogram, operation=operation, phase=phase)
+
+            lines += ['# HELP vite_calls_total Adapter calls by result (ok or error code)',
+                      '# TYPE vite_calls_total counter']
+            lines += [f'vite_calls_total{{{_labels(operation=operation, result=result)}}} {count}'
+                      for (operation, result), count in sorted(self._results.items())]
+
+            lines += ['# HELP vite_listener_pass_seconds Duration of transaction listener passes',
+                      '# TYPE vite_listener_pass_seconds histogram']
+            lines += self._histogram('vite_listener_pass_seconds', self._listener_pass)
+
+            lines += ['# HELP vite_listener_wallet_lag_seconds Delay of the last wallet check after it was due',
+                      '# TYPE vite_listener_wallet_lag_seconds gauge']
+            lines += [f'vite_listener_wallet_lag_seconds{{{_labels(address=address)}}} {lag}'
+                      for address, lag in sorted(self._wallet_lags.items())]
+
+        for name, field, help_ in (('vite_call_attempts_total', 'attempts', 'Attempts of adapter calls'),
+                                   ('vite_call_retries_total', 'retries', 'Re-tries of adapter calls'),
+                                   ('vite_call_retry_seconds_total', 'retry_seconds', 'Time spent re-trying calls')):
+            if retries:
+                lines += [f'# HELP {name} {help_}', f'# TYPE {name} counter']
+                lines += [f'{name}{{{_labels(operation=operation)}}} {counters[field]}'
+                          for operation, counters in sorted(retries.items())]
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram(name: str, histogram: Histogram, **labels) -> list[str]:
+        lines = list()
+        cumulative = 0
+
+        for bound, count in zip((*histogram.buckets, '+Inf'), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}')
+
+        suffix = f'{{{_labels(**labels)}}}' if labels else ''
+        return lines + [f'{name}_sum{suffix} {histogram.sum}', f'{name}_count{suffix} {histogram.count}']
+
+    def serve(self, port: int, render=None, host: str = '') -> ThreadingHTTPServer:
+        """
+        Serve metrics in Prometheus text format on http://host:port/metrics in background thread
+        :param port: int
+        :param render: function() -> str, default is self.prometheus
+        :param host: str, default is all interfaces
+        :return: server, call shutdown() to stop it
+        """
+        render = render or self.prometheus
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class Profiler:
+    """
+    cProfile of selected operation, switched on at runtime:
+    arm('balance') profiles the next 'balance' call in python (the thread running it)
+    and logs top functions or saves stats to the file. Only one call is profiled
+    at a time, calls starting meanwhile run as usual.
+    """
+
+    def __init__(self, logger: object = None):
+        self.logger = logger
+        self._armed: dict[str, dict] = dict()
+        self._active: bool = False
+        self._lock = threading.Lock()
+
+    def arm(self, operation: str, calls: int = 1, path: str = None, sort: str = 'cumulative', limit: int = 30) -> None:
+        """
+        :param operation: str, command name, i.e. 'balance'
+        :param calls: int, number of next calls to profile
+        :param path: str, save stats to the file (pstats format) instead of logging them, '{n}' is replaced by call number
+        :param sort: str, pstats sort key of logged stats
+        :param limit: int, number of logged functions
+        """
+        with self._lock:
+            self._armed[operation] = {'calls': calls, 'path': path, 'sort': sort, 'limit': limit, 'n': 0}
+
+    def disarm(self, operation: str) -> None:
+        with self._lock:
+            self._armed.pop(operation, None)
+
+    @contextmanager
+    def profile(self, operation: str):
+        options = None
+
+        if self._armed:
+            with self._lock:
+                options = None if self._active else self._armed.get(operation)
+
+                if options:
+                    self._active = True
+                    options['calls'] -= 1
+                    options['n'] += 1
+
+                    if options['calls'] < 1:
+                        del self._armed[operation]
+
+        if not options:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+            with self._lock:
+                self._active = False
+
+            self._report(operation, profiler, options, time.perf_counter() - started)
+
+    def _report(self, operation: str, profiler: cProfile.Profile, options: dict, seconds: float) -> None:
+        if options['path']:
+            profiler.dump_stats(options['path'].replace('{n}', str(options['n'])))
+            return
+
+        if self.logger:
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats(options['sort']).print_stats(options['limit'])
+            self.logger.info(f"profile of {operation} ({seconds:.3f}s):\n{stream.getvalue()}")
@@ -0,0 +1,189 @@
+"""
+Opt-in typed records of adapter results: TokenInfo, Transaction and Balance with __slots__,
+built from the dict shape returned by get_transactions() / get_balance() with from_dict().
+TokenInfo instances are shared per tokenId by TokenRegistry.token() (i.e. adapter's token_registry),
+addresses are interned strings and amounts are kept as received and decoded to int
+(or Decimal in token units) on first use.
+"""
+import sys
+
+from decimal import Decimal
+
+
+class TokenInfo:
+    """Token of VITE network, TokenRegistry.token() keeps one shared instance per tokenId"""
+
+    __slots__ = ('token_id', 'symbol', 'name', 'decimals', 'index')
+
+    def __init__(self, token_id: str, symbol: str, name: str = None, decimals: int = 0, index: int = None):
+        self.token_id = token_id
+        self.symbol = symbol
+        self.name = name
+        self.decimals = decimals
+        self.index = index
+
+    @classmethod
+    def from_dict(cls, token_info: dict) -> 'TokenInfo':
+        """
+        New TokenInfo of tokenInfo dict, see TokenRegistry.token() for the shared one
+        :param token_info: dict {tokenId, tokenSymbol, tokenName, decimals, index, ...}
+        """
+        index = token_info.get('index')
+        return cls(sys.intern(token_info['tokenId']), token_info.get('tokenSymbol'), token_info.get('tokenName'),
+                   int(token_info.get('decimals') or 0), int(index) if index is not None else None)
+
+    @property
+    def is_known(self) -> bool:
+        """Token info was seen, not only tokenId (i.e. balance entry without tokenInfo)"""
+        return self.symbol is not None
+
+    def scale(self, amount: int) -> Decimal:
+        """Raw amount in token units, i.e. 10**18 -> Decimal('1') for VITE"""
+        return Decimal(amount).scaleb(-self.decimals)
+
+    def __repr__(self) -> str:
+        return f"TokenInfo({self.symbol}, {self.token_id})"
+
+
+class Transaction:
+    """
+    Account block of get_transactions() / iter_transactions(), only the fields below are kept.
+    amount and fee are decoded to int on first access, value is amount in token units.
+    """
+
+    __slots__ = ('hash', 'height', 'block_type', 'address', 'from_address', 'to_address', 'send_block_hash', 'token',
+                 'timestamp', 'confirmations', 'data', '_amount', '_fee')
+
+    @classmethod
+    def from_dict(cls, transaction: dict, registry=None) -> 'Transaction':
+        """
+        :param transaction: dict, account block as returned by the node
+        :param registry: TokenRegistry, token infos are shared per tokenId, None builds own TokenInfo
+        """
+        self = cls.__new__(cls)
+        self.hash = transaction['hash']
+        self.height = int(transaction['height'])
+        self.block_type = transaction['blockType']
+        self.address = _intern(transaction.get('address'))
+        self.from_address = _intern(transaction.get('fromAddress'))
+        self.to_address = _intern(transaction.get('toAddress'))
+        self.send_block_hash = transaction.get('sendBlockHash')
+        self.token = _token(transaction.get('tokenInfo') or {'tokenId': transaction['tokenId']}, registry)
+        self.timestamp = transaction.get('timestamp')
+        self.confirmations = transaction.get('confirmations')
+        self.data = transaction.get('data')
+        self._amount = transaction.get('amount') or 0
+        self._fee = transaction.get('fee') or 0
+        return self
+
+    @property
+    def amount(self) -> int:
+        """Raw amount, i.e. 10**18 for 1 VITE"""
+        if not isinstance(self._amount, int):
+            self._amount = int(self._amount)
+        return self._amount
+
+    @property
+    def fee(self) -> int:
+        if not isinstance(self._fee, int):
+            self._fee = int(self._fee)
+        return self._fee
+
+    @property
+    def value(self) -> Decimal:
+        """Amount in token units"""
+        return self.token.scale(self.amount)
+
+    @property
+    def token_id(self) -> str:
+        return self.token.token_id
+
+    def __repr__(self) -> str:
+        return f"Transaction({self.height}, {self.block_type}, {self.token.symbol}, {self._amount})"
+
+
+class Balance:
+    """
+    Balance of get_balance() data {balance, unreceived} (or data of get_balances() entry),
+    amounts per tokenId are decoded to int on first access.
+    """
+
+    __slots__ = ('address', 'block_count', 'unreceived_count', '_balances', '_unreceived', '_tokens')
+
+    @classmethod
+    def from_dict(cls, data: dict, registry=None) -> 'Balance':
+        """
+        :param data: dict {balance: account info | None, unreceived: unreceived info | None}
+        :param registry: TokenRegistry, token infos are shared per tokenId, None builds own TokenInfo
+        """
+        self = cls.__new__(cls)
+        balance, unreceived = data.get('balance') or {}, data.get('unreceived') or {}
+        self.address = _intern(balance.get('address') or unreceived.get('address'))
+        self.block_count = int(balance.get('blockCount') or 0)
+        self.unreceived_count = int(unreceived.get('blockCount') or 0)
+        self._tokens: dict[str, TokenInfo] = dict()
+        self._balances = self._amounts(balance, registry)
+        self._unreceived = self._amounts(unreceived, registry)
+        return self
+
+    def _amounts(self, info: dict, registry) -> dict[str, str | int]:
+        # {tokenId: raw amount} of balanceInfoMap, token infos are kept in self._tokens
+        amounts = dict()
+
+        for token_id, entry in (info.get('balanceInfoMap') or {}).items():
+            token = self._tokens.get(token_id)
+
+            if token is None or (not token.is_known and entry.get('tokenInfo')):
+                token = self._tokens[token_id] = _token(entry.get('tokenInfo') or {'tokenId': token_id}, registry)
+
+            amounts[token.token_id] = entry.get('balance') or 0
+
+        return amounts
+
+    @property
+    def tokens(self) -> list[TokenInfo]:
+        """Tokens with balance or unreceived amount"""
+        return list(self._tokens.values())
+
+    def _token_id(self, token: str) -> str:
+        if token.startswith('tti_'):
+            return token
+
+        for token_id, token_info in self._tokens.items():
+            if (token_info.symbol or '').upper() == token.upper():
+                return token_id
+
+        return token
+
+    def amount(self, token: str = 'VITE', unreceived: bool = False) -> int:
+        """
+        Raw amount of the token, 0 when the account has none
+        :param token: str, token symbol (exact match) or tokenId
+        :param unreceived: bool, amount of unreceived blocks instead of balance
+        """
+        amounts = self._unreceived if unreceived else self._balances
+        token_id = self._token_id(token)
+        amount = amounts.get(token_id, 0)
+
+        if not isinstance(amount, int):
+            amount = amounts[token_id] = int(amount)
+
+        return amount
+
+    def value(self, token: str = 'VITE', unreceived: bool = False) -> Decimal:
+        """Amount of the token in token units, see amount()"""
+        token_id = self._token_id(token)
+        token_info = self._tokens.get(token_id)
+        amount = self.amount(token_id, unreceived)
+        return token_info.scale(amount) if token_info else Decimal(amount)
+
+    def __repr__(self) -> str:
+        return f"Balance({self.address}, {len(self._balances)} tokens, {self.unreceived_count} unreceived)"
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value else value
+
+
+def _token(token_info: dict, registry) -> TokenInfo:
+    return registry.token(token_info) if registry is not None else TokenInfo.from_dict(token_info)
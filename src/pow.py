@@ -0,0 +1,230 @@
+"""
+Local Vite PoW nonce solver, replacement for the remote util_getPoWNonce RPC call.
+
+Nonce is valid when 8 bytes blake2b hash of (nonce + data hash) read as
+little-endian integer reaches threshold = 2^64 - 2^64 / difficulty, where data
+hash is blake2b (32 bytes) of block's originalAddress + previousHash.
+Search runs in a persistent pool of processes (one per core, see PowSolver)
+and stops as soon as any process finds the nonce.
+"""
+import multiprocessing
+import itertools
+import threading
+import hashlib
+import base64
+import queue
+import time
+import os
+
+
+# Number of hashes between checks if other process already found the nonce
+CHECK_EVERY = 50_000
+
+# Seconds between checks if solver processes are still alive while waiting for the nonce
+WAIT_SLICE = 1
+
+# Response msg of send command when nonce has to be solved locally
+POW_REQUIRED = 'pow required'
+
+# How many times nonce is solved for one send (previous block can change in meantime)
+POW_ATTEMPTS = 3
+
+
+def difficulty_to_threshold(difficulty: int | str) -> int:
+    return 2 ** 64 - 2 ** 64 // int(difficulty)
+
+
+def nonce_hash(original_address: str, previous_hash: str) -> str:
+    """
+    :param original_address: str, hex of block's originalAddress
+    :param previous_hash: str, hex of block's previousHash
+    :return: str, hex of data hash used for PoW
+    """
+    return hashlib.blake2b(bytes.fromhex(original_address + previous_hash), digest_size=32).hexdigest()
+
+
+def check_nonce(difficulty: int | str, data_hash: str, nonce: str | bytes) -> bool:
+    """
+    :param difficulty: int | str, PoW difficulty
+    :param data_hash: str, hex of data hash, see nonce_hash()
+    :param nonce: str | bytes, base64 string or 8 bytes
+    :return: bool
+    """
+    nonce = base64.b64decode(nonce) if isinstance(nonce, str) else nonce
+    output = hashlib.blake2b(nonce + bytes.fromhex(data_hash), digest_size=8).digest()
+    return int.from_bytes(output, 'little') >= difficulty_to_threshold(difficulty)
+
+
+def _search(threshold: int, data: bytes, start: int, step: int, running) -> bytes | None:
+    # Try nonces start, start + step, start + 2 * step, ... until found or running() is False
+    blake2b = hashlib.blake2b
+    counter = start
+    mask = 2 ** 64 - 1
+
+    while running():
+        for _ in range(CHECK_EVERY):
+            nonce = (counter & mask).to_bytes(8, 'little')
+
+            if int.from_bytes(blake2b(nonce + data, digest_size=8).digest(), 'little') >= threshold:
+                return nonce
+
+            counter += step
+
+    return None
+
+
+def _worker(job, tasks, results) -> None:
+    # Solver process: search nonces of every task while its job is the current one
+    while True:
+        task = tasks.get()
+
+        if task is None:
+            return
+
+        job_id, threshold, data, start, step = task
+        nonce = _search(threshold, data, start, step, lambda: job.value == job_id)
+
+        if nonce:
+            results.put((job_id, nonce))
+
+
+class PowSolver:
+    """
+    Persistent pool of processes solving PoW nonces, started on first solve.
+
+    Processes are started with 'spawn' method (forked copy of a process running threads
+    can deadlock) and kept between solves. Every solve is a job: processes search nonces
+    until one of them finds it, or the job times out or is cancelled, then they wait for
+    the next job. Process running the solver (with spawn method) has to guard its entry
+    point with if __name__ == '__main__'.
+    """
+
+    def __init__(self, processes: int = None):
+        """
+        :param processes: int, number of processes, default is number of cores
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self._context = multiprocessing.get_context('spawn')
+        self._job = self._context.RawValue('Q', 0)
+        self._jobs = itertools.count(1)
+        self._current: int = 0
+        self._tasks = None
+        self._results = None
+        self._workers: list = list()
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        # Start processes, all of them again when any died
+        if self._workers and all(worker.is_alive() for worker in self._workers):
+            return
+
+        self._stop()
+        self._tasks, self._results = self._context.Queue(), self._context.Queue()
+        self._workers = [self._context.Process(target=_worker, args=(self._job, self._tasks, self._results),
+                                               daemon=True) for _ in range(self.processes)]
+
+        for worker in self._workers:
+            worker.start()
+
+    def _stop(self) -> None:
+        for _ in self._workers:
+            self._tasks.put(None)
+
+        for worker in self._workers:
+            worker.join(timeout=1)
+
+            if worker.is_alive():
+                worker.terminate()
+
+        self._workers = list()
+
+    def solve(self, difficulty: int | str, data_hash: str, timeout: float = None) -> str | None:
+        """
+        Find PoW nonce using all processes, solves run one at a time
+        :param difficulty: int | str, PoW difficulty from ledger_getPoWDifficulty
+        :param data_hash: str, hex of data hash, see nonce_hash()
+        :param timeout: float, seconds to search, None to search until found
+        :return: str, base64 nonce (same format as util_getPoWNonce) or None after timeout or cancel()
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._lock:
+            self._start()
+            threshold = difficulty_to_threshold(difficulty)
+            data = bytes.fromhex(data_hash)
+            start = int.from_bytes(os.urandom(8), 'little')
+            self._current = job_id = next(self._jobs)
+            self._job.value = job_id
+
+            for index in range(self.processes):
+                self._tasks.put((job_id, threshold, data, start + index, self.processes))
+
+            try:
+                while deadline is None or time.monotonic() < deadline:
+                    remaining = deadline - time.monotonic() if deadline is not None else WAIT_SLICE
+
+                    try:
+                        finished, nonce = self._results.get(timeout=max(min(remaining, WAIT_SLICE), 0))
+                    except queue.Empty:
+                        if not any(worker.is_alive() for worker in self._workers):
+                            raise RuntimeError(f"PoW solver processes exited "
+                                               f"{[worker.exitcode for worker in self._workers]}")
+                        continue
+
+                    # Results of previous jobs are skipped
+                    if finished == job_id:
+                        return base64.b64encode(nonce).decode() if nonce else None
+
+                return None
+
+            finally:
+                # Stop searching in all processes
+                self._job.value = 0
+                self._current = 0
+
+    def cancel(self) -> None:
+        """Stop running solve, it returns None"""
+        job_id = self._current
+
+        if job_id:
+            self._job.value = 0
+            self._results.put((job_id, None))
+
+    def close(self) -> None:
+        """Stop running solve and terminate processes"""
+        self.cancel()
+
+        with self._lock:
+            self._stop()
+
+
+def solve(difficulty: int | str, data_hash: str, processes: int = None, timeout: float = None) -> str | None:
+    """
+    Find PoW nonce with temporary PowSolver (processes are not kept, see PowSolver)
+    :param difficulty: int | str, PoW difficulty from ledger_getPoWDifficulty
+    :param data_hash: str, hex of data hash, see nonce_hash()
+    :param processes: int, number of processes, default is number of cores
+    :param timeout: float, seconds to search, None to search until found
+    :return: str, base64 nonce (same format as util_getPoWNonce) or None after timeout
+    """
+    solver = PowSolver(processes)
+
+    try:
+        return solver.solve(difficulty, data_hash, timeout)
+    finally:
+        solver.close()
+
+
+def hashrate(duration: float = 2.0) -> float:
+    """Measure hashes per second of single core"""
+    blake2b = hashlib.blake2b
+    data = os.urandom(32)
+    hashes = 0
+    started = time.perf_counter()
+
+    while time.perf_counter() - started < duration:
+        for counter in range(hashes, hashes + CHECK_EVERY):
+            blake2b(counter.to_bytes(8, 'little') + data, digest_size=8).digest()
+        hashes += CHECK_EVERY
+
+    return hashes / (time.perf_counter() - started)
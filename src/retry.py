@@ -0,0 +1,186 @@
+import threading
+import inspect
+import asyncio
+import random
+import time
+
+from .errors import error_from_response, RETRYABLE_ERRORS
+
+
+class RetryPolicy:
+    """
+    When and how long failed calls are re-tried.
+
+    Only errors of retry_on classes are re-tried, at most `retries` times and
+    only while the call fits into `deadline` seconds (counted from the first
+    attempt). Delay before n-th re-try is random between 0 and
+    min(max_delay, base_delay * 2 ** n) (exponential backoff with full jitter).
+    """
+
+    def __init__(self, retries: int = 3, deadline: float | None = 30, base_delay: float = 0.2, max_delay: float = 5,
+                 retry_on: tuple = RETRYABLE_ERRORS):
+        """
+        :param retries: int, max number of re-tries of one call
+        :param deadline: float, seconds for all attempts of one call, None for no deadline
+                         (attempts use the default timeout of the command)
+        :param base_delay: float, seconds, backoff of the first re-try
+        :param max_delay: float, seconds, max backoff
+        :param retry_on: tuple of ViteError classes which are re-tried, default are the retryable ones
+        """
+        self.retries = retries
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+
+    def backoff(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def without_deadline(self) -> 'RetryPolicy':
+        """Same policy without deadline, for long running calls (i.e. receiving)"""
+        return RetryPolicy(self.retries, None, self.base_delay, self.max_delay, self.retry_on)
+
+
+class RetryMetrics:
+    """Counters of calls, attempts and time spent re-trying, per operation"""
+
+    FIELDS = ('calls', 'attempts', 'retries', 'failures', 'deadline_exceeded', 'retry_seconds')
+
+    def __init__(self):
+        self._operations: dict[str, dict] = dict()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, attempts: int, failed: bool, deadline_exceeded: bool, retry_seconds: float) -> None:
+        with self._lock:
+            counters = self._operations.setdefault(name, dict.fromkeys(self.FIELDS, 0))
+            counters['calls'] += 1
+            counters['attempts'] += attempts
+            counters['retries'] += attempts - 1
+            counters['failures'] += failed
+            counters['deadline_exceeded'] += deadline_exceeded
+            counters['retry_seconds'] += retry_seconds
+
+    def stats(self) -> dict:
+        """{operation: {calls, attempts, retries, failures, deadline_exceeded, retry_seconds}}"""
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._operations.items()}
+
+
+class _Call:
+    # Attempts of one call: decides about the next re-try and records metrics
+
+    def __init__(self, retrier, name: str, policy: RetryPolicy):
+        self.retrier = retrier
+        self.name = name
+        self.policy = policy
+        self.started = time.monotonic()
+        self.first_failure = None
+        self.attempts = 0
+        self.deadline_exceeded = False
+
+    def attempt(self) -> float | None:
+        """Start next attempt and return its timeout (seconds left to the deadline, None without deadline)"""
+        self.attempts += 1
+
+        if self.policy.deadline is None:
+            return None
+
+        return max(self.policy.deadline - (time.monotonic() - self.started), 0.001)
+
+    def next_delay(self, response: dict) -> float | None:
+        """Backoff before the next attempt, None when call is finished"""
+        error = error_from_response(response)
+
+        if error is None or not isinstance(error, self.policy.retry_on) or self.attempts > self.policy.retries:
+            return None
+
+        self.first_failure = self.first_failure or time.monotonic()
+        delay = self.policy.backoff(self.attempts - 1)
+
+        if self.policy.deadline is not None and time.monotonic() + delay - self.started >= self.policy.deadline:
+            self.deadline_exceeded = True
+            return None
+
+        return delay
+
+    def log_retry(self, response: dict, delay: float) -> None:
+        if self.retrier.logger:
+            self.retrier.logger.warning(f"{response['msg']}, re-try {self.name} "
+                                        f"({self.policy.retries - self.attempts + 1} left, in {delay:.2f}s)")
+
+    def finish(self, response: dict) -> dict:
+        retry_seconds = time.monotonic() - self.first_failure if self.first_failure else 0
+        self.retrier.metrics.record(self.name, self.attempts, bool(response['error']), self.deadline_exceeded,
+                                    retry_seconds)
+        return response
+
+
+class Retrier:
+    """
+    Run calls with re-tries by RetryPolicy, sync (call) and asyncio (acall) version.
+
+    Call is function(timeout) -> response dict, timeout is seconds left to the
+    deadline (None when policy has no deadline). Calls which are not idempotent (i.e. send) pass verify function:
+    it's called after the backoff delay before every re-try (so the failed attempt
+    had time to land) with the failed response and returns the final response when
+    the failed attempt took effect anyway (or it can't be told), None when it's safe
+    to run the call again.
+    """
+
+    def __init__(self, policy: RetryPolicy = None, logger: object = None, metrics: RetryMetrics = None):
+        self.policy = policy or RetryPolicy()
+        self.logger = logger
+        self.metrics = metrics or RetryMetrics()
+
+    def call(self, name: str, call, verify=None, policy: RetryPolicy = None) -> dict:
+        """
+        :param name: str, operation name used in logs and metrics
+        :param call: function(timeout) -> dict
+        :param verify: function(response) -> dict | None, for not idempotent calls
+        :param policy: RetryPolicy, default is self.policy
+        :return: dict, last response
+        """
+        state = _Call(self, name, policy or self.policy)
+
+        while True:
+            response = call(state.attempt())
+            delay = state.next_delay(response)
+
+            if delay is None:
+                return state.finish(response)
+
+            state.log_retry(response, delay)
+            time.sleep(delay)
+
+            if verify:
+                final = verify(response)
+
+                if final is not None:
+                    return state.finish(final)
+
+    async def acall(self, name: str, call, verify=None, policy: RetryPolicy = None) -> dict:
+        """
+        :param name: str, operation name used in logs and metrics
+        :param call: coroutine function(timeout) -> dict
+        :param verify: (coroutine) function(response) -> dict | None, for not idempotent calls
+        :param policy: RetryPolicy, default is self.policy
+        :return: dict, last response
+        """
+        state = _Call(self, name, policy or self.policy)
+
+        while True:
+            response = await call(state.attempt())
+            delay = state.next_delay(response)
+
+            if delay is None:
+                return state.finish(response)
+
+            state.log_retry(response, delay)
+            await asyncio.sleep(delay)
+
+            if verify:
+                final = verify(response)
+                final = await final if inspect.isawaitable(final) else final
+
+                if final is not None:
+                    return state.finish(final)
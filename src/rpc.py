@@ -0,0 +1,284 @@
+"""
+Read-only JSON-RPC client of VITE nodes (ViteRPC), opt-in with rpc=True of the adapters.
+
+Serves balance reads by address and the token list of TokenRegistry over keep-alive
+HTTP(S) connections, without starting NodeJS. Transactions always go through NodeJS,
+so they keep transactionType decoded by @vitejs.
+"""
+import http.client
+import threading
+import itertools
+import json
+import time
+import os
+
+from urllib.parse import urlsplit
+
+from .tools import error_response
+from .errors import ViteError, NodeTimeout, NodeConnectionError, NodeRPCError
+
+
+# Default VITE node, the same one NodeJS scripts use (see vitejs/provider.js)
+HTTP_NODE = "https://node.vite.net/gvite/"
+
+# api_handler.js commands served by ViteRPC, transactions need @vitejs decoding (transactionType) of NodeJS
+READ_COMMANDS = ('balance',)
+
+HEADERS = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+
+
+def rpc_nodes(nodes: list[str] | str = None) -> list[str]:
+    """
+    HTTP(S) urls of VITE nodes, the same ones NodeJS scripts use (see vitejs/pool.js):
+    nodes argument, VITE_NODES_FILE, VITE_NODES or VITE_HTTP_NODE env variable, websocket nodes are skipped.
+    Node set only with VITE_WS_NODE has no known HTTP url, so there are no nodes and reads go through NodeJS
+    (to that node) instead of the default public node.
+    :param nodes: list of node urls or path to JSON config file {"nodes": [...]}
+    :return: list of str
+    """
+    if not nodes:
+        nodes = os.environ.get('VITE_NODES_FILE') or os.environ.get('VITE_NODES', '').split(',')
+
+    if isinstance(nodes, str):
+        with open(nodes, encoding='utf-8') as file:
+            nodes = json.load(file)['nodes']
+
+    nodes = [url.strip() for url in nodes if url.strip()]
+
+    if not nodes:
+        # Single node of NodeJS scripts (see vitejs/provider.js), they use the websocket one
+        if os.environ.get('VITE_WS_NODE') and not os.environ.get('VITE_HTTP_NODE'):
+            return []
+        nodes = [os.environ.get('VITE_HTTP_NODE') or HTTP_NODE]
+
+    return [url for url in nodes if url.startswith('http')]
+
+
+class ViteRPC:
+    """
+    Read-only JSON-RPC client of VITE nodes, serves balance command without
+    starting NodeJS process. Keeps a pool of keep-alive HTTP(S) connections
+    per node, safe to share across threads.
+
+    Responses have the same shape as api_handler.js ones ({error, msg, data(, code)}
+    with phase timings in ms), failed read is sent once more to the next node.
+    There are no probes, latency routing, breaker or hedging of vitejs/pool.js.
+    """
+
+    def __init__(self, nodes: list[str] | str = None, timeout: int | float = 5, max_connections: int = 8):
+        """
+        :param nodes: list[str] | str, node urls or path to JSON config file, default is the same node(s) as NodeJS
+        :param timeout: int | float, seconds to wait for the node, default of calls without timeout
+        :param max_connections: int, max number of idle keep-alive connections kept per node
+        """
+        self.nodes = rpc_nodes(nodes)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: dict[str, list[http.client.HTTPConnection]] = {url: list() for url in self.nodes}
+        self._current: int = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def supports(self, name: str, args: dict) -> bool:
+        """Command can be served without NodeJS, balance by mnemonics needs key derivation in NodeJS"""
+        return bool(self.nodes) and name in READ_COMMANDS and bool(args.get('a'))
+
+    def execute(self, name: str, args: dict, timeout: int | float = None) -> dict:
+        """
+        Run api_handler.js read command, see supports()
+        :param name: str, 'balance'
+        :param args: dict, command arguments without dashes, i.e. a=address
+        :param timeout: int | float, seconds to wait for every node
+        :return: dict, the same response as the NodeJS command
+        """
+        timings = dict.fromkeys(('connect', 'rpc', 'parse'), 0.0)
+
+        try:
+            if args.get('b'):
+                addresses = [str(address) for address in args['a']]
+                response = {'error': 0, 'msg': 'balances success', 'data': self._balances(addresses, timeout, timings)}
+            else:
+                info, unreceived = self.batch(self._balance_calls(args['a']), timeout, timings)
+                error = info.get('error') or unreceived.get('error')
+
+                if error:
+                    raise NodeRPCError(error.get('message', str(error)))
+
+                data = {'balance': info.get('result'), 'unreceived': unreceived.get('result')}
+                response = {'error': 0, 'msg': 'balance success', 'data': data}
+        except ViteError as e:
+            response = error_response(str(e), e.code)
+
+        response['timings'] = timings
+        return response
+
+    @staticmethod
+    def _balance_calls(address: str) -> list[tuple[str, list]]:
+        # The same calls as ViteAPI.getBalanceInfo()
+        return [('ledger_getAccountInfoByAddress', [address]), ('ledger_getUnreceivedBlocksInfoByAddress', [address])]
+
+    def _balances(self, addresses: list[str], timeout: int | float, timings: dict) -> dict:
+        # {address: balance response} of many addresses from one JSON-RPC batch (see getBalances() in vite-wallet-api.js)
+        results = self.batch([call for address in addresses for call in self._balance_calls(address)], timeout, timings)
+        balances = dict()
+
+        for i, address in enumerate(addresses):
+            info, unreceived = results[2 * i], results[2 * i + 1]
+            error = info.get('error') or unreceived.get('error')
+
+            if error:
+                balances[address] = error_response(error.get('message', str(error)), 'node')
+            else:
+                data = {'balance': info.get('result'), 'unreceived': unreceived.get('result')}
+                balances[address] = {'error': 0, 'msg': 'balance success', 'data': data}
+
+        return balances
+
+    def tokens(self, page_size: int = 500, timeout: int | float = None) -> list[dict]:
+        """
+        Token infos of all VITE tokens, loader of TokenRegistry
+        :param page_size: int, tokens per JSON-RPC call
+        :return: list of {tokenId, tokenSymbol, decimals, ...}, raises ViteError
+        """
+        tokens, page = list(), 0
+
+        while True:
+            result = self.request('contract_getTokenInfoList', [page, page_size], timeout) or {}
+            infos = result.get('tokenInfoList') or []
+            tokens += infos
+
+            if len(infos) < page_size or len(tokens) >= int(result.get('totalCount') or 0):
+                return tokens
+
+            page += 1
+
+    def request(self, method: str, params: list, timeout: int | float = None, timings: dict = None):
+        """
+        Single JSON-RPC call
+        :return: result of the call, raises NodeRPCError when node rejected it
+        """
+        response = self._call({'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params},
+                              timeout, timings)
+
+        if response.get('error'):
+            raise NodeRPCError(response['error'].get('message', str(response['error'])))
+
+        return response.get('result')
+
+    def batch(self, calls: list[tuple[str, list]], timeout: int | float = None, timings: dict = None) -> list[dict]:
+        """
+        Many JSON-RPC calls in one request
+        :param calls: list of (method, params)
+        :return: list of {'result': ...} | {'error': {...}} in the order of calls
+        """
+        ids = [next(self._ids) for _ in calls]
+        payload = [{'jsonrpc': '2.0', 'id': id_, 'method': method, 'params': params}
+                   for id_, (method, params) in zip(ids, calls)]
+        responses = self._call(payload, timeout, timings)
+
+        if not isinstance(responses, list):
+            raise NodeRPCError((responses.get('error') or {}).get('message', 'invalid batch response'))
+
+        by_id = {response.get('id'): response for response in responses}
+        return [by_id.get(id_) or {'error': {'message': 'no response'}} for id_ in ids]
+
+    def _call(self, payload: dict | list, timeout: int | float = None, timings: dict = None):
+        # Send payload to the current node, failed call goes once more to the next node
+        timings = timings if timings is not None else dict.fromkeys(('connect', 'rpc', 'parse'), 0.0)
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        error = None
+
+        if not self.nodes:
+            raise NodeConnectionError("no http(s) VITE node")
+
+        current = self._current
+
+        for index in [(current + i) % len(self.nodes) for i in range(min(2, len(self.nodes)))]:
+            url = self.nodes[index]
+
+            try:
+                raw = self._post(url, body, timeout or self.timeout, timings)
+            except TimeoutError:
+                error = NodeTimeout(f"request timeout {url}")
+                continue
+            except (OSError, http.client.HTTPException) as e:
+                error = NodeConnectionError(f"connection error {url}: {e}")
+                continue
+
+            self._current = index
+            started = time.perf_counter()
+
+            try:
+                return json.loads(raw)
+            except ValueError:
+                raise NodeRPCError(f"invalid JSON-RPC response from {url}")
+            finally:
+                timings['parse'] += (time.perf_counter() - started) * 1000
+
+        raise error
+
+    def _post(self, url: str, body: bytes, timeout: int | float, timings: dict) -> bytes:
+        # POST body on idle keep-alive connection (or new one), connection closed by the node meanwhile is re-opened
+        for attempt in range(2):
+            connection, reused = self._connection(url)
+            connection.timeout = timeout
+
+            try:
+                if connection.sock is None:
+                    started = time.perf_counter()
+                    connection.connect()
+                    timings['connect'] += (time.perf_counter() - started) * 1000
+                else:
+                    connection.sock.settimeout(timeout)
+
+                started = time.perf_counter()
+                connection.request('POST', urlsplit(url).path or '/', body, HEADERS)
+                response = connection.getresponse()
+                raw = response.read()
+                timings['rpc'] += (time.perf_counter() - started) * 1000
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+
+                if reused and not attempt:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(url, connection)
+
+            if response.status >= 400:
+                raise http.client.HTTPException(f"HTTP {response.status} {response.reason}")
+
+            return raw
+
+    def _connection(self, url: str) -> tuple[http.client.HTTPConnection, bool]:
+        # Idle connection of the node (reused=True) or new not yet connected one
+        with self._lock:
+            if self._idle[url]:
+                return self._idle[url].pop(), True
+
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(parts.netloc), False
+
+    def _release(self, url: str, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle[url]) < self.max_connections:
+                self._idle[url].append(connection)
+                return
+
+        connection.close()
+
+    def close(self) -> None:
+        """Close idle connections, next call opens new ones"""
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle = {url: list() for url in self.nodes}
+
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,272 @@
+import threading
+import heapq
+import time
+import itertools
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WalletState:
+    """Scheduling state of single wallet"""
+
+    def __init__(self, wallet: dict, interval: float):
+        self.wallet = wallet
+        self.interval = interval
+        self.due: float = time.monotonic()
+        self.errors: int = 0
+        self.in_flight: bool = False
+        self.removed: bool = False
+
+
+class WalletScheduler:
+    """
+    Schedule wallets checks for the transaction listener.
+
+    Wallets wait in priority queue ordered by the time they are due. Due wallets
+    (and wallets due within coalesce seconds) are taken together, so their
+    balances are checked with one call and only wallets
+    with pending transactions are processed in a bounded thread pool, so one slow
+    wallet doesn't stall the others.
+
+    Every wallet has its own interval: it is shortened when wallet received
+    transactions and extended when nothing happened (between min_interval and
+    max_interval). Failed wallet is retried with exponential backoff.
+    Wallets can be added and removed while scheduler is running.
+    """
+
+    def __init__(self, check, process, interval: float = 10, min_interval: float = None, max_interval: float = None,
+                 max_backoff: float = 300, workers: int = 4, batch_size: int = 1000, coalesce: float = None,
+                 logger: object = None, metrics: object = None, needs_processing=None):
+        """
+        :param check: function(wallets) -> {address: balance response}, checks many wallets at once
+        :param process: function(wallet, balance) -> int | None, number of new transactions or None on error
+        :param needs_processing: function(wallet, balance) -> bool, wallet has to be processed,
+                                 default is wallet with unreceived blocks
+        :param interval: float, initial interval in seconds for every wallet
+        :param min_interval: float, shortest interval of busy wallet, default is interval / 4
+        :param max_interval: float, longest interval of idle wallet, default is interval * 6
+        :param max_backoff: float, longest delay in seconds after errors
+        :param workers: int, max number of wallets processed at once
+        :param batch_size: int, max number of due wallets checked with one call
+        :param coalesce: float, wallets due within this many seconds are checked early with the due ones,
+                         default is min_interval / 2
+        :param logger: object, logger for scheduler errors
+        :param metrics: Metrics, gets pass durations and per-wallet lag (see src/metrics.py)
+        """
+        self.check = check
+        self.process = process
+        self.interval = interval
+        self.min_interval = min_interval if min_interval is not None else interval / 4
+        self.max_interval = max_interval if max_interval is not None else interval * 6
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self.coalesce = coalesce if coalesce is not None else self.min_interval / 2
+        self.logger = logger
+        self.metrics = metrics
+        self.needs_processing = needs_processing or self._has_unreceived
+        self.is_running: bool = False
+
+        self._states: dict[str, WalletState] = dict()
+        self._in_flight: dict[str, WalletState] = dict()
+        self._queue: list[tuple[float, int, str]] = list()
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tx_listener')
+        self._thread: threading.Thread | None = None
+        self._counters = {
+            'checks': 0, 'processed': 0, 'errors': 0,
+            'queue_lag': 0.0, 'max_queue_lag': 0.0,
+            'pass_duration': 0.0, 'max_pass_duration': 0.0
+            }
+
+    def start(self) -> None:
+        """Start scheduler loop in background thread"""
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = False) -> None:
+        """Stop scheduler loop, wallets being processed are finished in background"""
+        with self._condition:
+            self.is_running = False
+            self._condition.notify_all()
+
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def add_wallet(self, wallet: dict) -> None:
+        """Add wallet {address: str, mnemonics: str, address_id(optional): str | int}, it is checked right away"""
+        with self._condition:
+            state = self._states.get(wallet['address']) or self._in_flight.get(wallet['address'])
+
+            # Wallet removed while it is being processed is kept, so the address is never processed twice at once
+            if state:
+                state.wallet = wallet
+                state.removed = False
+                self._states[wallet['address']] = state
+                return
+
+            state = WalletState(wallet, self.interval)
+            self._states[wallet['address']] = state
+            self._push(state)
+            self._condition.notify_all()
+
+    def remove_wallet(self, address: str) -> None:
+        """Remove wallet, if it is being processed right now it is not scheduled again (unless it is added back)"""
+        with self._condition:
+            state = self._states.pop(address, None)
+
+            if state:
+                state.removed = True
+
+        if self.metrics:
+            self.metrics.remove_wallet(address)
+
+    @property
+    def wallets(self) -> list[dict]:
+        with self._condition:
+            return [state.wallet for state in self._states.values()]
+
+    def stats(self) -> dict:
+        """
+        Scheduler counters:
+        - wallets, queued, in_flight: number of wallets
+        - checks, processed, errors: number of balance checks, processed wallets and errors
+        - queue_lag, max_queue_lag: seconds between wallet due time and its check (last and max)
+        - pass_duration, max_pass_duration: seconds to check and process one group of due wallets (last and max)
+        """
+        with self._condition:
+            queued = sum(not state.in_flight for state in self._states.values())
+            return {'wallets': len(self._states), 'queued': queued, 'in_flight': len(self._in_flight), **self._counters}
+
+    def _push(self, state: WalletState) -> None:
+        heapq.heappush(self._queue, (state.due, next(self._seq), state.wallet['address']))
+
+    def _pop_due(self) -> list[WalletState]:
+        # Wait until the earliest wallet is due, then take all due wallets (up to batch_size)
+        with self._condition:
+            now = time.monotonic()
+
+            while self.is_running:
+                now = time.monotonic()
+
+                if self._queue and self._queue[0][0] <= now:
+                    break
+
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._condition.wait(timeout)
+
+            # Woken up by stop()
+            if not self.is_running:
+                return []
+
+            due = list()
+
+            while self._queue and self._queue[0][0] <= now + self.coalesce and len(due) < self.batch_size:
+                due_time, _, address = heapq.heappop(self._queue)
+                state = self._states.get(address)
+
+                # Skip removed wallets and outdated queue entries
+                if not state or state.in_flight or state.due != due_time:
+                    continue
+
+                state.in_flight = True
+                self._in_flight[address] = state
+                due.append(state)
+
+                lag = max(0.0, now - due_time)
+                self._counters['queue_lag'] = lag
+                self._counters['max_queue_lag'] = max(lag, self._counters['max_queue_lag'])
+
+                if self.metrics:
+                    self.metrics.observe_wallet_lag(address, lag)
+
+            return due
+
+    def _run(self) -> None:
+        while self.is_running:
+            due = self._pop_due()
+
+            if not due:
+                continue
+
+            started = time.monotonic()
+
+            try:
+                balances = self.check([state.wallet for state in due])
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"tx_listener scheduler: {e}")
+                balances = dict()
+
+            with self._condition:
+                self._counters['checks'] += 1
+
+            group = {'remaining': len(due), 'started': started}
+
+            for state in due:
+                balance_ = balances.get(state.wallet['address'])
+
+                if balance_ is None or balance_['error']:
+                    self._reschedule(state, None, group)
+                elif not self._needs_processing(state, balance_):
+                    self._reschedule(state, 0, group)
+                else:
+                    try:
+                        self._pool.submit(self._process, state, balance_, group)
+                    except RuntimeError:
+                        # Pool is closed, scheduler is stopping
+                        return
+
+    @staticmethod
+    def _has_unreceived(wallet: dict, balance_: dict) -> bool:
+        return bool(int(balance_['data']['unreceived']['blockCount']))
+
+    def _needs_processing(self, state: WalletState, balance_: dict) -> bool:
+        try:
+            return self.needs_processing(state.wallet, balance_)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"tx_listener scheduler: {e}")
+            return True
+
+    def _process(self, state: WalletState, balance_: dict, group: dict) -> None:
+        try:
+            received = self.process(state.wallet, balance_)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"tx_listener scheduler: {e}")
+            received = None
+
+        self._reschedule(state, received, group)
+
+    def _reschedule(self, state: WalletState, received: int | None, group: dict) -> None:
+        with self._condition:
+            if received is None:
+                # Exponential backoff after errors
+                state.errors += 1
+                self._counters['errors'] += 1
+                delay = min(self.max_backoff, self.interval * 2 ** (state.errors - 1))
+            else:
+                # Busy wallet is checked more often, idle wallet backs off
+                state.errors = 0
+                self._counters['processed'] += 1
+                factor = 0.5 if received else 1.5
+                state.interval = min(self.max_interval, max(self.min_interval, state.interval * factor))
+                delay = state.interval
+
+            state.in_flight = False
+            self._in_flight.pop(state.wallet['address'], None)
+            group['remaining'] -= 1
+
+            if not group['remaining']:
+                duration = time.monotonic() - group['started']
+                self._counters['pass_duration'] = duration
+                self._counters['max_pass_duration'] = max(duration, self._counters['max_pass_duration'])
+
+                if self.metrics:
+                    self.metrics.observe_pass(duration)
+
+            if not state.removed and self.is_running:
+                state.due = time.monotonic() + delay
+                self._push(state)
+                self._condition.notify_all()
@@ -0,0 +1,240 @@
+import threading
+import time
+
+from decimal import Decimal
+
+from .models import TokenInfo
+
+
+# Token list of the listener matching every token
+ALL_TOKENS = '__all__'
+
+
+class TokenRegistry:
+    """
+    Index of VITE tokens: tokenId -> token info (tokenSymbol, decimals, ...)
+    and symbol -> tokenIds. Loaded with loader (i.e. ViteRPC.tokens()) on first
+    lookup, refreshed lazily: lookup of unknown token reloads the registry,
+    at most once per refresh_interval seconds. Token infos seen in transactions
+    can be added on the fly. Also keeps shared TokenInfo records of src/models.py
+    (one per tokenId). Safe to share across threads.
+    """
+
+    def __init__(self, loader=None, refresh_interval: float = 300):
+        """
+        :param loader: function() -> list of token info dicts {tokenId, tokenSymbol, decimals, ...},
+                       None keeps only added tokens
+        :param refresh_interval: float, min seconds between two loads
+        """
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._by_id: dict[str, dict] = dict()
+        self._by_symbol: dict[str, set[str]] = dict()
+        self._loaded: float | None = None
+        self._records: dict[str, TokenInfo] = dict()
+        self._lock = threading.Lock()
+
+    def add(self, token_info: dict) -> None:
+        """Add (or update) token, i.e. from tokenInfo of transaction"""
+        if token_info and token_info.get('tokenId'):
+            with self._lock:
+                self._add(token_info)
+
+    def _add(self, token_info: dict) -> None:
+        token_id = token_info['tokenId']
+        self._by_id[token_id] = token_info
+        self._by_symbol.setdefault(str(token_info.get('tokenSymbol', '')).upper(), set()).add(token_id)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Load tokens with the loader, unless they were loaded less than refresh_interval seconds ago
+        :param force: bool, load regardless of refresh_interval
+        :return: bool, True when tokens were loaded
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            if not self.loader or (not force and self._loaded is not None and now - self._loaded < self.refresh_interval):
+                return False
+
+            self._loaded = now
+
+        try:
+            tokens = self.loader()
+        except Exception:
+            # Node not available, registry keeps known tokens, next refresh is after refresh_interval
+            return False
+
+        with self._lock:
+            for token_info in tokens:
+                self._add(token_info)
+
+        return True
+
+    def token(self, token_info: dict) -> TokenInfo:
+        """
+        Shared TokenInfo record of the tokenInfo dict (i.e. of transaction), without token info
+        (only tokenId) the registry's info is used, the record is completed once the info is seen
+        :param token_info: dict {tokenId, tokenSymbol, tokenName, decimals, index, ...}
+        """
+        token_id = token_info['tokenId']
+
+        with self._lock:
+            token = self._records.get(token_id)
+            completes = bool(token_info.get('tokenSymbol')) or token_id in self._by_id
+
+            if token is not None and (token.is_known or not completes):
+                return token
+
+            known = token_info if token_info.get('tokenSymbol') else self._by_id.get(token_id, token_info)
+            new = TokenInfo.from_dict(known)
+
+            if token is None:
+                token = self._records[token_id] = new
+            elif new.is_known:
+                token.symbol, token.name, token.decimals, token.index = new.symbol, new.name, new.decimals, new.index
+
+            return token
+
+    def get(self, token_id: str) -> dict | None:
+        """Token info of the tokenId, None when it is unknown also after refresh"""
+        with self._lock:
+            token_info = self._by_id.get(token_id)
+
+        if token_info is None and self.refresh():
+            with self._lock:
+                token_info = self._by_id.get(token_id)
+
+        return token_info
+
+    def ids(self, token: str) -> set[str]:
+        """
+        TokenIds of the token symbol (exact match, case-insensitive), tokenId ('tti_...') is returned as it is
+        :return: set of str, empty set when symbol is unknown also after refresh
+        """
+        if token.startswith('tti_'):
+            return {token}
+
+        with self._lock:
+            ids = set(self._by_symbol.get(token.upper(), ()))
+
+        if not ids and self.refresh():
+            with self._lock:
+                ids = set(self._by_symbol.get(token.upper(), ()))
+
+        return ids
+
+    def decimals(self, token_id: str) -> int | None:
+        token_info = self.get(token_id)
+        return int(token_info['decimals']) if token_info and token_info.get('decimals') is not None else None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+class TransactionFilter:
+    """
+    Transaction filter compiled once (i.e. per listener). Token symbols are resolved
+    to tokenIds by TokenRegistry, so matching a transaction is a set lookup of its tokenId
+    instead of comparing symbols with every requested token. Symbols match exactly
+    (case-insensitive), so 'VITE' doesn't match 'VITEX'. Symbol unknown to the registry
+    is resolved by tokenInfo of the first transaction of every new tokenId.
+
+    Amount limits are in token units, they are converted to raw amounts once per tokenId.
+    Filter can be called like a function or used with filter(), i.e. on get_transactions() data.
+    """
+
+    def __init__(self, tokens: list[str] = None, registry: TokenRegistry = None, min_amount: int | float | str = None,
+                 max_amount: int | float | str = None, senders: list[str] = None,
+                 block_types: tuple[int, ...] | None = (4,)):
+        """
+        :param tokens: list of str, token symbols or tokenIds, None or ['__all__'] matches every token
+        :param registry: TokenRegistry, default is empty registry learning tokens from transactions
+        :param min_amount: int | float | str, min amount in token units (i.e. 1.5 VITE), inclusive
+        :param max_amount: int | float | str, max amount in token units, inclusive
+        :param senders: list of str, only transactions from these addresses (fromAddress)
+        :param block_types: tuple of int, only these block types, default is (4,) - received transactions,
+                            None matches every block type
+        """
+        self.registry = registry if registry is not None else TokenRegistry()
+        self.all_tokens = not tokens or ALL_TOKENS in tokens
+        self.token_ids: set[str] = set()
+        self.min_amount = Decimal(str(min_amount)) if min_amount is not None else None
+        self.max_amount = Decimal(str(max_amount)) if max_amount is not None else None
+        self.senders = frozenset(senders) if senders else None
+        self.block_types = frozenset(block_types) if block_types else None
+        self._symbols: set[str] = set()
+        self._others: set[str] = set()
+        self._limits: dict[str, tuple[Decimal | None, Decimal | None]] = dict()
+
+        if not self.all_tokens:
+            for token in tokens:
+                ids = self.registry.ids(token)
+
+                if ids:
+                    self.token_ids |= ids
+                else:
+                    self._symbols.add(token.upper())
+
+    def _token_matches(self, token_id: str, transaction: dict) -> bool:
+        if self.all_tokens or token_id in self.token_ids:
+            return True
+
+        if not self._symbols or token_id in self._others:
+            return False
+
+        # Symbol unknown when compiled, check token info of the transaction (once per tokenId)
+        token_info = transaction.get('tokenInfo') or {}
+        self.registry.add(token_info)
+
+        if str(token_info.get('tokenSymbol', '')).upper() in self._symbols:
+            self.token_ids.add(token_id)
+            return True
+
+        self._others.add(token_id)
+        return False
+
+    def _amount_limits(self, token_id: str, transaction: dict) -> tuple[Decimal | None, Decimal | None]:
+        # Raw amount limits of the token, computed once per tokenId
+        limits = self._limits.get(token_id)
+
+        if limits is None:
+            # Transactions of the node carry token info, registry (and its refresh) is only the fallback
+            decimals = (transaction.get('tokenInfo') or {}).get('decimals')
+
+            if decimals is None:
+                decimals = self.registry.decimals(token_id) or 0
+
+            scale = Decimal(10) ** int(decimals)
+            limits = (self.min_amount * scale if self.min_amount is not None else None,
+                      self.max_amount * scale if self.max_amount is not None else None)
+            self._limits[token_id] = limits
+
+        return limits
+
+    def match(self, transaction: dict) -> bool:
+        if self.block_types is not None and transaction.get('blockType') not in self.block_types:
+            return False
+
+        token_id = transaction.get('tokenId') or (transaction.get('tokenInfo') or {}).get('tokenId')
+
+        if not self._token_matches(token_id, transaction):
+            return False
+
+        if self.senders is not None and transaction.get('fromAddress') not in self.senders:
+            return False
+
+        if self.min_amount is not None or self.max_amount is not None:
+            low, high = self._amount_limits(token_id, transaction)
+            amount = int(transaction.get('amount') or 0)
+
+            if (low is not None and amount < low) or (high is not None and amount > high):
+                return False
+
+        return True
+
+    __call__ = match
+
+    def filter(self, transactions: list[dict]) -> list[dict]:
+        """Matching transactions in the same order"""
+        return [transaction for transaction in transactions if self.match(transaction)]
@@ -0,0 +1,186 @@
+"""
+Helpers shared by ViteJsAdapter and AsyncViteJsAdapter
+"""
+import threading
+import json
+import os
+
+from decimal import Decimal, InvalidOperation
+
+from .tokens import TransactionFilter
+from .logger_ import get_logger
+
+
+SCRIPT_PATH = os.path.join(os.getcwd(), "vitejs/api_handler.js")
+
+# Env variable with file descriptor for payload frames (see vitejs/tools.js)
+PAYLOAD_FD_ENV = 'VITE_PAYLOAD_FD'
+
+# Prefix of payload frames sent on stdout, when dedicated pipe can't be used
+FRAME_SEPARATOR = '\x1e'
+
+# Dedicated pipe for payload frames can't be passed to the child process on Windows
+PAYLOAD_PIPE = os.name != 'nt'
+
+# Max number of addresses in one batched balance call
+BALANCE_BATCH_SIZE = 1000
+
+# Page size used by the transaction listener to fetch blocks above the address cursor
+CURSOR_PAGE_SIZE = 50
+
+# Page size of iter_transactions(), i.e. full history exports
+HISTORY_PAGE_SIZE = 100
+
+# Max number of wallets received by one NodeJS call of receive_many() (command line argument size)
+RECEIVE_BATCH_SIZE = 200
+
+# Longer arguments are passed to the script on stdin, Linux limit of single argument is 128 KiB (MAX_ARG_STRLEN)
+MAX_ARG_SIZE = 64 * 1024
+
+# Seconds to wait for every transfer of send_batch(), sends of the batch are sequential
+SEND_BATCH_TIMEOUT = 10
+
+# Seconds sent blocks of send_batch() are polled by NodeJS until confirmed (VITE_SEND_CONFIRM_TIMEOUT is in ms)
+SEND_CONFIRM_TIMEOUT = int(os.environ.get('VITE_SEND_CONFIRM_TIMEOUT') or 10000) / 1000
+
+# Seconds the sender's account is polled (every SEND_LANDED_POLL) for the block of failed send before it's re-tried,
+# block broadcast just before the timeout may not be on the account chain yet
+SEND_LANDED_WAIT = 1
+SEND_LANDED_POLL = 0.25
+
+
+_default_logger = None
+_default_logger_lock = threading.Lock()
+
+
+def default_logger():
+    """Library logger with colored console output, configured on first use (not at import)"""
+    global _default_logger
+
+    with _default_logger_lock:
+        if _default_logger is None:
+            _default_logger = get_logger()
+
+        return _default_logger
+
+
+def __getattr__(name: str):
+    # DEFAULT_LOGGER used to be created at import, keep it importable
+    if name == 'DEFAULT_LOGGER':
+        return default_logger()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def node_env(nodes: list[str] | str = None, hedge: bool = False) -> dict:
+    """
+    Env variables configuring pool of VITE nodes in NodeJS scripts (see vitejs/pool.js)
+    :param nodes: list of node urls (http(s):// or ws(s)://) or path to JSON config file
+    :param hedge: bool, send slow reads to the second node too
+    :return: dict
+    """
+    if not nodes:
+        return dict()
+
+    env = {'VITE_NODES_FILE': os.path.abspath(nodes)} if isinstance(nodes, str) else {'VITE_NODES': ','.join(nodes)}
+
+    if hedge:
+        env['VITE_HEDGE'] = '1'
+
+    return env
+
+
+def node_command(script: str, name: str, **args) -> list:
+    """
+    Build full NodeJS command for the api_handler.js script,
+    i.e. node_command(script, 'balance', a=address) -> ['node', script, 'balance', '-a', address]
+    """
+    command = ['node', script, name]
+
+    for key, value in args.items():
+        # List is passed as repeated argument, i.e. -a <address> -a <address>
+        for value_ in value if isinstance(value, (list, tuple)) else [value]:
+            command += [f"-{key}" if len(key) == 1 else f"--{key}", str(value_)]
+
+    return command
+
+
+def split_args(args: dict, max_size: int = MAX_ARG_SIZE) -> tuple[dict, str | None]:
+    """
+    Move arguments too long for the command line (i.e. JSON list of send_batch() transfers)
+    to JSON object read by the script from stdin (--stdin, see vitejs/api_handler.js)
+    :return: (command line args, stdin JSON | None)
+    """
+    def size(value) -> int:
+        return sum(map(len, map(str, value))) if isinstance(value, (list, tuple)) else len(str(value))
+
+    long = {key: value for key, value in args.items() if size(value) > max_size}
+
+    if not long:
+        return args, None
+
+    stdin = {key: list(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+             for key, value in long.items()}
+    return {**{key: value for key, value in args.items() if key not in long}, 'stdin': 1}, json.dumps(stdin)
+
+
+def error_response(msg: str = None, code: str = 'unknown') -> dict:
+    """Failed response, code is one of src/errors.py ERROR_CLASSES codes"""
+    if msg is None:
+        msg = f"Unknown vitejs error"
+
+    return {'error': 1, 'msg': msg, 'data': None, 'code': code}
+
+
+class Response(dict):
+    """
+    Result of one adapter call, response dictionary {error, msg, data(, code)}
+    with status of the call: finished or failed
+    """
+
+    def __init__(self, response: dict = None, status: str = None):
+        super().__init__(response or ())
+        self.status: str = status or ('failed' if self.get('error') else 'finished')
+
+
+def filter_received(transactions: list[dict], tokens: list[str]) -> list[dict]:
+    """
+    Get only 'received' transactions (blockType == 4) and filter them by token symbols (exact match).
+    Compiles the filter on every call, listeners use TransactionFilter compiled once.
+    :param transactions: list of transactions from get_transactions()
+    :param tokens: list of str, if tokens = ['__all__'] all of them are returned
+    :return: list of transactions
+    """
+    return TransactionFilter(tokens).filter(transactions)
+
+
+def landed_send(block: dict, to_address: str, amount: str | int, failed: dict = None) -> bool:
+    """
+    Block above the old account height is the send of the failed attempt: the same hash (or height)
+    when the failed response carries it, send block (blockType 2) to to_address with the amount otherwise.
+    Amounts are compared as integers ('1e18' and 1000000000000000000 are the same amount).
+    :param block: dict, account block
+    :param to_address: str, recipient of the send
+    :param amount: str | int, amount of the send
+    :param failed: dict, response of the failed attempt
+    """
+    data = (failed or {}).get('data')
+    data = data if isinstance(data, dict) else {}
+
+    if data.get('hash'):
+        return block['hash'] == data['hash']
+
+    if data.get('height') and int(block['height']) != int(data['height']):
+        return False
+
+    try:
+        same_amount = int(Decimal(str(block['amount']))) == int(Decimal(str(amount)))
+    except (InvalidOperation, ValueError):
+        return False
+
+    return int(block['blockType']) == 2 and block['toAddress'] == to_address and same_amount
+
+
+def wallet_address(wallet: str | dict) -> str:
+    """Get address from wallet dictionary {address: str, ...} or return address string as it is"""
+    return wallet['address'] if isinstance(wallet, dict) else wallet
@@ -0,0 +1,9 @@
+# Min number of wallets created by one NodeJS process in create_wallets(), smaller batches don't pay off the spawn
+MIN_CREATE_BATCH = 50
+
+
+def batch_sizes(count: int, processes: int, min_size: int = MIN_CREATE_BATCH) -> list[int]:
+    """Split count of wallets to (at most) processes nearly equal batches of at least min_size wallets"""
+    parts = max(1, min(processes, count // max(1, min_size)))
+    return [size for size in (count // parts + (i < count % parts) for i in range(parts)) if size]
+
@@ -0,0 +1,178 @@
+import subprocess
+import threading
+import itertools
+import json
+import time
+import os
+
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from .logs import NodeLogForwarder
+from .tools import error_response
+
+
+WORKER_SCRIPT = "worker.js"
+
+
+class NodeWorker:
+    """
+    Long-lived NodeJS process (vitejs/worker.js) serving many @vitejs calls.
+
+    Requests and responses are newline-delimited JSON objects tagged with
+    an id, so many calls can be in flight at once. Streaming commands send
+    event lines with the same id before the response. Crashed process is
+    restarted on the next request.
+    """
+
+    def __init__(self, script_path: str, logger: object, nodejs_logs: bool = True, timeout: int | float = 60,
+                 env: dict = None, log_forwarder: NodeLogForwarder = None):
+        """
+        :param script_path: str, path to the worker.js script
+        :param logger: object, logger for forwarded nodejs logs
+        :param nodejs_logs: bool, forward logs from nodejs worker
+        :param timeout: int | float, seconds to wait for single response
+        :param env: dict, extra env variables of the worker process
+        :param log_forwarder: NodeLogForwarder, dedup and rate limit of forwarded logs,
+                              default is NodeLogForwarder(logger, enabled=nodejs_logs)
+        """
+        self.script = script_path
+        self.logger = logger
+        self.nodejs_logs = nodejs_logs
+        self.timeout = timeout
+        self.env = env or dict()
+        self.log_forwarder = log_forwarder or NodeLogForwarder(logger, enabled=nodejs_logs)
+        self.process: subprocess.Popen | None = None
+        self.restarts: int = -1
+        self._ids = itertools.count(1)
+        self._pending: dict[int, Future] = dict()
+        self._listeners: dict[int, object] = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        """Start the worker process if it is not running already"""
+        with self._lock:
+            if self.is_alive:
+                return
+
+            self.process = subprocess.Popen(
+                ['node', self.script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                env={**os.environ, **self.env})
+            self._pending = dict()
+            self.restarts += 1
+
+            if self.restarts:
+                self.logger.warning(f"node.js worker restarted ({self.restarts})")
+
+            process = self.process
+            threading.Thread(target=self._read_responses, args=(process, self._pending), daemon=True).start()
+            threading.Thread(target=self._read_logs, args=(process,), daemon=True).start()
+
+    def stop(self) -> None:
+        """Close the worker process and fail all pending requests"""
+        with self._lock:
+            process, self.process = self.process, None
+            pending = self._pending
+
+        if process and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        self._fail_pending(pending, "node.js worker stopped")
+
+    def request(self, command: str, args: dict = None, timeout: int | float = None, on_event=None) -> dict:
+        """
+        Send single command to the worker and wait for the response.
+        :param command: str, api_handler.js command name
+        :param args: dict, command arguments without dashes, i.e. {'a': address}
+        :param timeout: int | float, seconds to wait, default is self.timeout
+        :param on_event: function(frame), called from the reading thread with event frames of the command
+        :return: dict
+        """
+        self.start()
+
+        request_id = next(self._ids)
+        future = Future()
+        line = json.dumps({'id': request_id, 'command': command, 'args': args or {}})
+
+        with self._lock:
+            pending = self._pending
+            pending[request_id] = future
+
+            if on_event:
+                self._listeners[request_id] = on_event
+            try:
+                self.process.stdin.write(line + '\n')
+                self.process.stdin.flush()
+            except (OSError, ValueError, AttributeError) as e:
+                pending.pop(request_id, None)
+                self._listeners.pop(request_id, None)
+                return error_response(f"node.js worker unavailable: {e}", code='process')
+
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                pending.pop(request_id, None)
+            return error_response(f"node.js worker timeout ({command})", code='timeout')
+        finally:
+            with self._lock:
+                self._listeners.pop(request_id, None)
+
+    def _read_responses(self, process: subprocess.Popen, pending: dict[int, Future]) -> None:
+        for line in process.stdout:
+            started = time.perf_counter()
+
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+
+            # Parse phase in ms, like the phases measured by the worker (see vitejs/timings.js)
+            if 'timings' in response:
+                response['timings']['parse'] = (time.perf_counter() - started) * 1000
+
+            request_id = response.pop('id', None)
+
+            if 'event' in response:
+                with self._lock:
+                    on_event = self._listeners.get(request_id)
+
+                if on_event:
+                    self._call_listener(on_event, response)
+                continue
+
+            with self._lock:
+                future = pending.pop(request_id, None)
+
+            if future:
+                future.set_result(response)
+
+        # Process died, every call waiting for it has to fail now
+        self._fail_pending(pending, "node.js worker crashed")
+
+    def _call_listener(self, on_event, frame: dict) -> None:
+        # Failing listener must not stop reading responses of other calls
+        try:
+            on_event(frame)
+        except Exception as e:
+            self.logger.error(f"node.js worker event listener: {e}")
+
+    def _read_logs(self, process: subprocess.Popen) -> None:
+        # Whole stderr of the worker is its log, also lines without '>>'
+        for line in process.stderr:
+            self.log_forwarder.forward(line, prefixed_only=False)
+
+    def _fail_pending(self, pending: dict[int, Future], msg: str) -> None:
+        with self._lock:
+            futures = list(pending.values())
+            pending.clear()
+
+        for future in futures:
+            future.set_result(error_response(msg, code='process'))
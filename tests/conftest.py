@@ -0,0 +1,59 @@
+import shutil
+import os
+
+import pytest
+
+from benchmarks.mock_node import MockNode, MockLedger
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.join(ROOT, 'vitejs', 'api_handler.js')
+
+# Any address has account on the mock ledger
+ADDRESS = 'vite_' + 'a' * 50
+
+# Valid BIP39 mnemonics for scripts deriving keys
+MNEMONICS = ' '.join(['abandon'] * 11 + ['about'])
+
+# Tests running NodeJS scripts (marked node) need node and installed packages of vitejs/
+NODE_AVAILABLE = bool(shutil.which('node')) and os.path.isdir(os.path.join(ROOT, 'vitejs', 'node_modules'))
+
+
+def pytest_collection_modifyitems(items):
+    if NODE_AVAILABLE:
+        return
+
+    skip = pytest.mark.skip(reason="needs node and vitejs/node_modules (npm install in vitejs/)")
+
+    for item in items:
+        if item.get_closest_marker('node'):
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def ledger() -> MockLedger:
+    return MockLedger(blocks=30, tokens=2)
+
+
+@pytest.fixture
+def mock_node(ledger) -> MockNode:
+    """Mock VITE node serving the ledger"""
+    node = MockNode(ledger).start()
+    yield node
+    node.stop()
+
+
+@pytest.fixture
+def mock_nodes(ledger):
+    """Start mock VITE nodes sharing the ledger, i.e. mock_nodes(latency=20, error_rate=0.1)"""
+    nodes = list()
+
+    def start(**kwargs) -> MockNode:
+        node = MockNode(ledger, **kwargs).start()
+        nodes.append(node)
+        return node
+
+    yield start
+
+    for node in nodes:
+        node.stop()
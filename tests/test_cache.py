@@ -0,0 +1,128 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import ViteJsAdapter, LedgerCache
+from src.tools import error_response
+from benchmarks.mock_node import MockNode, MockLedger
+from conftest import SCRIPT_PATH, ADDRESS, MNEMONICS
+
+
+KEY = ('balance', ADDRESS)
+RESPONSE = {'error': 0, 'msg': 'success', 'data': {'balance': None, 'unreceived': None}}
+
+
+def test_concurrent_misses_load_once():
+    cache = LedgerCache()
+    calls = list()
+
+    def loader() -> dict:
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return RESPONSE
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda _: cache.get_or_load(KEY, loader), range(8)))
+
+    assert len(calls) == 1
+    assert all(response is RESPONSE for response in responses)
+    assert cache.stats()['coalesced'] == 7
+    assert cache.get(KEY) is RESPONSE
+
+
+def test_failed_load_is_raised_to_all_callers():
+    cache = LedgerCache()
+    calls = list()
+
+    def loader() -> dict:
+        calls.append(1)
+        time.sleep(0.2)
+        raise ConnectionError('node down')
+
+    def get() -> Exception | None:
+        try:
+            cache.get_or_load(KEY, loader)
+        except ConnectionError as e:
+            return e
+
+    with ThreadPoolExecutor(4) as pool:
+        errors = list(pool.map(lambda _: get(), range(4)))
+
+    assert len(calls) == 1
+    assert all(isinstance(error, ConnectionError) for error in errors)
+
+    # Next call loads again
+    assert cache.get_or_load(KEY, lambda: RESPONSE) is RESPONSE
+
+
+def test_response_loaded_before_invalidation_is_not_cached():
+    cache = LedgerCache()
+
+    def loader() -> dict:
+        # i.e. send_transaction() of the wallet finished while its balance was loading
+        cache.invalidate(ADDRESS)
+        return RESPONSE
+
+    assert cache.get_or_load(KEY, loader) is RESPONSE
+    assert cache.get(KEY) is None
+
+
+def test_failed_response_is_not_cached():
+    cache = LedgerCache()
+    cache.get_or_load(KEY, lambda: error_response('timeout', 'timeout'))
+    assert cache.get(KEY) is None
+
+
+def test_expired_and_evicted_entries():
+    cache = LedgerCache(ttl=0.1, max_entries=2)
+
+    for index in range(3):
+        cache.set(('balance', f'address_{index}'), RESPONSE)
+
+    assert cache.get(('balance', 'address_0')) is None
+    assert cache.stats()['evictions'] == 1
+
+    time.sleep(0.15)
+    assert cache.get(('balance', 'address_2')) is None
+    assert cache.stats()['expired'] == 1
+
+
+def test_adapter_reads_through_cache(mock_node):
+    provider = ViteJsAdapter(nodes=[mock_node.http_url], cache=LedgerCache(ttl=60), nodejs_logs=False, rpc=True)
+
+    try:
+        first = provider.get_balance(address=ADDRESS)
+        requests = mock_node.requests
+        assert provider.get_balance(address=ADDRESS) == first
+        assert mock_node.requests == requests
+
+        provider.cache.invalidate(ADDRESS)
+        provider.get_balance(address=ADDRESS)
+        assert mock_node.requests > requests
+    finally:
+        provider.close()
+
+
+@pytest.mark.node
+def test_get_updates_invalidates_wallet_of_mnemonics():
+    node = MockNode(MockLedger(blocks=30, pending=2)).start()
+    provider = ViteJsAdapter(script_path=SCRIPT_PATH, nodes=[node.http_url], cache=LedgerCache(ttl=60),
+                             nodejs_logs=False)
+
+    try:
+        # Address of the mnemonics is not given, it comes from the receive response
+        update_ = provider.get_updates(MNEMONICS, 0)
+        assert not update_['error'], update_['msg']
+        address = update_['data']['address']
+
+        provider.get_balance(address=address)
+        assert provider.cache.stats()['entries'] == 1
+
+        provider.get_updates(MNEMONICS, 0)
+        assert provider.cache.stats()['entries'] == 0
+    finally:
+        provider.close()
+        node.stop()
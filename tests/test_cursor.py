@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from src import ViteJsAdapter
+from src.cursor import CursorStore
+from conftest import SCRIPT_PATH, ADDRESS
+
+
+BLOCKS = [{'height': '1', 'hash': 'a'}, {'height': '2', 'hash': 'b'}]
+
+
+def test_deliver_moves_cursor(tmp_path):
+    path = str(tmp_path / 'cursors.sqlite3')
+    store = CursorStore(path)
+    delivered = list()
+
+    assert store.get(ADDRESS) is None
+    assert store.deliver(ADDRESS, BLOCKS, delivered.extend)
+    assert delivered == BLOCKS
+    assert store.get(ADDRESS) == (2, 'b')
+    store.close()
+
+    # Cursor survives restart
+    store = CursorStore(path)
+    assert store.get(ADDRESS) == (2, 'b')
+
+    store.reset(ADDRESS)
+    assert store.get(ADDRESS) is None
+    store.close()
+
+
+def test_cursor_not_moved_when_callback_fails():
+    store = CursorStore(':memory:')
+    store.deliver(ADDRESS, [], height=1, hash_='x')
+
+    assert not store.deliver(ADDRESS, BLOCKS, lambda blocks: False)
+    assert store.get(ADDRESS) == (1, 'x')
+
+    def callback(blocks):
+        raise RuntimeError('callback failed')
+
+    with pytest.raises(RuntimeError):
+        store.deliver(ADDRESS, BLOCKS, callback)
+
+    assert store.get(ADDRESS) == (1, 'x')
+
+
+def test_callback_runs_outside_of_store_lock():
+    store = CursorStore(':memory:')
+    started, release = threading.Event(), threading.Event()
+
+    def slow(blocks):
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=store.deliver, args=(ADDRESS, BLOCKS, slow))
+    thread.start()
+    assert started.wait(5)
+
+    # Other addresses and reads are not blocked by the running callback
+    other = 'vite_' + 'b' * 50
+    assert store.deliver(other, BLOCKS, lambda blocks: None)
+    assert store.get(other) == (2, 'b')
+    assert store.get(ADDRESS) is None
+
+    release.set()
+    thread.join()
+    assert store.get(ADDRESS) == (2, 'b')
+
+
+def test_concurrent_deliveries_of_address_deliver_blocks_once():
+    store = CursorStore(':memory:')
+    delivered = list()
+
+    def callback(blocks):
+        time.sleep(0.05)
+        delivered.extend(blocks)
+
+    threads = [threading.Thread(target=store.deliver, args=(ADDRESS, BLOCKS, callback)) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert delivered == BLOCKS
+    assert store.get(ADDRESS) == (2, 'b')
+
+    # Cursor doesn't move back
+    assert store.deliver(ADDRESS, BLOCKS[:1], callback)
+    assert store.get(ADDRESS) == (2, 'b')
+    assert delivered == BLOCKS
+
+
+@pytest.mark.node
+def test_listener_delivers_blocks_above_cursor_once(mock_node):
+    # Blocks 26-30 were received before restart, but not delivered, account has nothing unreceived
+    provider = ViteJsAdapter(script_path=SCRIPT_PATH, nodes=[mock_node.http_url], nodejs_logs=False, rpc=True)
+    store = CursorStore(':memory:')
+    store.deliver(ADDRESS, [], height=25, hash_='x')
+    delivered = list()
+
+    provider.run_transaction_listener(provider.transaction_filter(block_types=None),
+                                      [{'address': ADDRESS, 'mnemonics': 'm'}], interval=0.2,
+                                      callback=delivered.extend, cursor_store=store)
+    try:
+        deadline = time.monotonic() + 10
+
+        while store.get(ADDRESS)[0] < 30 and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        # More passes don't deliver the blocks again
+        time.sleep(1)
+    finally:
+        provider.stop_transaction_listener(wait=True)
+        provider.close()
+
+    assert store.get(ADDRESS)[0] == 30
+    assert [int(block['height']) for block in delivered] == [26, 27, 28, 29, 30]
@@ -0,0 +1,72 @@
+"""
+Payload frames of NodeJS scripts: JSON lines on a dedicated pipe (or stdout with record separator),
+values are decoded by json, so memos like "true" / "null" keep their text
+"""
+import shutil
+import sys
+import os
+
+import pytest
+
+import src
+
+from src import ViteJsAdapter
+from conftest import ROOT
+
+
+MEMO = 'true null false None {"a": 1} \x1e'
+
+# Fake script writing frames to VITE_PAYLOAD_FD and logs to stdout
+SCRIPT = f"""
+import json, os
+fd = int(os.environ['VITE_PAYLOAD_FD'])
+prefix = '\\x1e' if fd == 1 else ''
+frames = [{{'event': 'transfer', 'index': 0}}, {{'error': 0, 'msg': 'success', 'data': {{'memo': {MEMO!r}, 'ok': True}}}}]
+print('log line with true, null and {{braces}}', flush=True)
+for frame in frames:
+    os.write(fd, (prefix + json.dumps(frame) + '\\n').encode())
+print('last log line', flush=True)
+"""
+
+# Frame written by writeFrame() of vitejs/tools.js
+NODE_SCRIPT = f"""
+import {{writeFrame}} from '{os.path.join(ROOT, 'vitejs', 'tools.js')}'
+console.log('log line with true and null')
+writeFrame({{error: 0, msg: 'success', data: {{memo: {MEMO!r}, amount: '1000000000000000000', empty: null}}}})
+"""
+
+
+@pytest.fixture
+def provider() -> ViteJsAdapter:
+    provider = ViteJsAdapter(nodejs_logs=False, debug=False, rpc=False)
+    yield provider
+    provider.close()
+
+
+def test_frames_on_payload_pipe(provider):
+    events = list()
+    response = provider._run_command([sys.executable, '-c', SCRIPT], timeout=10, on_event=events.append)
+
+    assert response == {'error': 0, 'msg': 'success', 'data': {'memo': MEMO, 'ok': True}}
+    assert events == [{'event': 'transfer', 'index': 0}]
+
+
+def test_frames_on_stdout(provider, monkeypatch):
+    # Where pipe can't be passed (Windows), frames are told apart from logs by the record separator
+    monkeypatch.setattr(src, 'PAYLOAD_PIPE', False)
+    response = provider._run_command([sys.executable, '-c', SCRIPT], timeout=10)
+    assert response['data']['memo'] == MEMO
+
+
+def test_script_without_payload(provider):
+    response = provider._run_command([sys.executable, '-c', "print('only logs')"], timeout=10)
+    assert response['code'] == 'process'
+
+
+@pytest.mark.skipif(not shutil.which('node'), reason="needs node")
+def test_frame_written_by_node(provider, tmp_path):
+    script = tmp_path / 'frame.mjs'
+    script.write_text(NODE_SCRIPT)
+    response = provider._run_command(['node', str(script)], timeout=10)
+
+    assert response['data'] == {'memo': MEMO, 'amount': '1000000000000000000', 'empty': None}
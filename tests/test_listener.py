@@ -0,0 +1,97 @@
+"""
+'push' mode transaction listener: websocket subscription of the NodeJS script to the mock node
+"""
+import time
+
+import pytest
+
+from src import ViteJsAdapter
+from benchmarks.mock_node import MockNode, MockLedger
+from conftest import SCRIPT_PATH, MNEMONICS
+
+
+pytestmark = pytest.mark.node
+
+
+def wait(condition, timeout: float = 15) -> bool:
+    deadline = time.monotonic() + timeout
+
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    return condition()
+
+
+def subscribed(ledger: MockLedger, address: str) -> bool:
+    """Websocket connection of the mock node has subscription of the address"""
+    return any(address in getattr(callback.__self__, 'subscriptions', {}).values() for callback in ledger._subscribers)
+
+
+@pytest.fixture
+def push_node(monkeypatch):
+    """Mock node the scripts are pointed to by VITE_HTTP_NODE / VITE_WS_NODE"""
+    node = MockNode(MockLedger(blocks=30)).start()
+
+    for key, value in node.env.items():
+        monkeypatch.setenv(key, value)
+
+    yield node
+    node.stop()
+
+
+@pytest.fixture
+def provider(push_node):
+    provider = ViteJsAdapter(script_path=SCRIPT_PATH, nodejs_logs=False, debug=False)
+    yield provider
+    provider.stop_transaction_listener(wait=True)
+    provider.close()
+
+
+def received_sends(delivered: list[dict]) -> set[str]:
+    return {block['sendBlockHash'] for block in delivered if block['blockType'] == 4}
+
+
+def test_new_unreceived_blocks_are_received_and_delivered(push_node, provider):
+    address = provider.get_address(MNEMONICS)
+    delivered = list()
+    provider.run_transaction_listener(provider.transaction_filter(), [{'address': address, 'mnemonics': MNEMONICS}],
+                                      interval=1, callback=delivered.extend, mode='push')
+    assert wait(lambda: subscribed(push_node.ledger, address))
+
+    push_node.ledger.credit(address, 2)
+    sends = {block['hash'] for block in push_node.ledger.call('ledger_getUnreceivedBlocksByAddress', [address, 0, 10])}
+
+    assert len(sends) == 2
+    assert wait(lambda: sends <= received_sends(delivered))
+    assert not push_node.ledger.call('ledger_getUnreceivedBlocksByAddress', [address, 0, 10])
+
+
+def test_blocks_sent_before_subscription_are_received_on_connect(push_node, provider):
+    address = provider.get_address(MNEMONICS)
+    push_node.ledger.credit(address, 3)
+    sends = {block['hash'] for block in push_node.ledger.call('ledger_getUnreceivedBlocksByAddress', [address, 0, 10])}
+    delivered = list()
+
+    provider.run_transaction_listener(provider.transaction_filter(), [{'address': address, 'mnemonics': MNEMONICS}],
+                                      interval=1, callback=delivered.extend, mode='push')
+
+    assert wait(lambda: sends <= received_sends(delivered))
+
+
+def test_listener_reconnects_and_catches_up(push_node, provider):
+    address = provider.get_address(MNEMONICS)
+    delivered = list()
+    provider.run_transaction_listener(provider.transaction_filter(), [{'address': address, 'mnemonics': MNEMONICS}],
+                                      interval=0.5, callback=delivered.extend, mode='push')
+    assert wait(lambda: subscribed(push_node.ledger, address))
+
+    # Node closes the websocket, blocks sent meanwhile are received after re-connecting
+    for callback in list(push_node.ledger._subscribers):
+        callback.__self__._send(8, b'\x03\xe8')
+
+    assert wait(lambda: not subscribed(push_node.ledger, address))
+    push_node.ledger.credit(address, 2)
+    sends = {block['hash'] for block in push_node.ledger.call('ledger_getUnreceivedBlocksByAddress', [address, 0, 10])}
+
+    assert wait(lambda: subscribed(push_node.ledger, address))
+    assert wait(lambda: sends <= received_sends(delivered))
@@ -0,0 +1,103 @@
+"""
+Typed records of src/models.py: __slots__, lazily decoded amounts and TokenInfo shared per tokenId by TokenRegistry
+"""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+
+from src.models import TokenInfo, Transaction, Balance
+from src.tokens import TokenRegistry
+from benchmarks.mock_node import VITE_TOKEN_ID
+from conftest import ADDRESS
+
+
+VITE = {'tokenId': VITE_TOKEN_ID, 'tokenSymbol': 'VITE', 'tokenName': 'Vite Token', 'decimals': 18, 'index': 0}
+OTHER_TOKEN_ID = 'tti_' + 'ab' * 12
+
+
+def block(height: int, token_info: dict | None = VITE, amount: str = '1500000000000000000') -> dict:
+    return {'hash': f'{height:064x}', 'height': str(height), 'blockType': 4, 'address': ADDRESS,
+            'fromAddress': 'vite_' + 'b' * 50, 'toAddress': ADDRESS, 'amount': amount, 'fee': '0',
+            'tokenId': (token_info or {}).get('tokenId', OTHER_TOKEN_ID), 'tokenInfo': token_info,
+            'timestamp': 1700000000 + height}
+
+
+def balance_data(token_info: dict | None) -> dict:
+    entry = {'balance': '2000000000000000000', **({'tokenInfo': token_info} if token_info else {})}
+    return {'balance': {'address': ADDRESS, 'blockCount': '5', 'balanceInfoMap': {VITE_TOKEN_ID: entry}},
+            'unreceived': {'address': ADDRESS, 'blockCount': '1',
+                           'balanceInfoMap': {VITE_TOKEN_ID: {'tokenInfo': VITE, 'balance': '1'}}}}
+
+
+def test_records_have_slots():
+    transaction = Transaction.from_dict(block(1))
+
+    for record in (transaction, transaction.token, Balance.from_dict(balance_data(VITE))):
+        assert not hasattr(record, '__dict__')
+
+        with pytest.raises(AttributeError):
+            record.extra = 1
+
+
+def test_transaction_amounts_are_decoded_on_use():
+    transaction = Transaction.from_dict(block(7))
+
+    assert transaction.height == 7
+    assert transaction._amount == '1500000000000000000'
+    assert transaction.amount == 1500000000000000000
+    assert transaction.value == Decimal('1.5')
+    assert transaction.token_id == VITE_TOKEN_ID
+    assert transaction.fee == 0
+
+
+def test_registry_shares_token_info():
+    registry = TokenRegistry()
+    first, second = (Transaction.from_dict(block(height), registry) for height in (1, 2))
+
+    assert first.token is second.token
+    assert Transaction.from_dict(block(3)).token is not first.token
+
+    # Records of other registries (adapters) don't share token infos, nothing is kept process-wide
+    assert Transaction.from_dict(block(4), TokenRegistry()).token is not first.token
+
+
+def test_token_known_by_id_is_completed():
+    registry = TokenRegistry()
+    partial = Balance.from_dict(balance_data(None), registry)
+    token = registry.token({'tokenId': VITE_TOKEN_ID})
+
+    assert token.symbol == 'VITE'  # from the unreceived entry with token info
+    assert partial.value('VITE') == Decimal(2)
+    assert registry.token(VITE) is token
+
+    other = registry.token({'tokenId': OTHER_TOKEN_ID})
+    assert not other.is_known
+
+    registry.add({'tokenId': OTHER_TOKEN_ID, 'tokenSymbol': 'TKN', 'decimals': 8})
+    assert registry.token({'tokenId': OTHER_TOKEN_ID}) is other
+    assert (other.symbol, other.decimals) == ('TKN', 8)
+
+
+def test_balance_amounts():
+    balance = Balance.from_dict(balance_data(VITE), TokenRegistry())
+
+    assert (balance.address, balance.block_count, balance.unreceived_count) == (ADDRESS, 5, 1)
+    assert balance.amount('vite') == 2 * 10 ** 18
+    assert balance.amount(VITE_TOKEN_ID, unreceived=True) == 1
+    assert balance.value('VITE') == Decimal(2)
+    assert balance.amount('TKN') == 0
+    assert [token.symbol for token in balance.tokens] == ['VITE']
+
+
+def test_shared_token_info_across_threads():
+    registry = TokenRegistry()
+    partial = {'tokenId': OTHER_TOKEN_ID}
+    full = {'tokenId': OTHER_TOKEN_ID, 'tokenSymbol': 'TKN', 'decimals': 8}
+
+    with ThreadPoolExecutor(8) as pool:
+        tokens = list(pool.map(lambda i: registry.token(full if i % 2 else partial), range(1000)))
+
+    assert all(token is tokens[0] for token in tokens)
+    assert (tokens[0].symbol, tokens[0].decimals) == ('TKN', 8)
+    assert TokenInfo.from_dict(full) is not tokens[0]
@@ -0,0 +1,151 @@
+"""
+Routing of reads by the pool of VITE nodes (vitejs/pool.js) in the NodeJS worker,
+against several mock nodes with latency and error rate
+"""
+import json
+import time
+
+import pytest
+
+from src import ViteJsAdapter
+from conftest import SCRIPT_PATH, ADDRESS, MNEMONICS
+
+
+pytestmark = pytest.mark.node
+
+
+def pool_adapter(tmp_path, nodes: list, **config) -> ViteJsAdapter:
+    """Worker mode adapter with pool of the mock nodes, reads go through NodeJS (rpc=False)"""
+    path = tmp_path / 'vite_nodes.json'
+    path.write_text(json.dumps({'nodes': [node.http_url for node in nodes], 'probe_interval': 60000, **config}))
+    return ViteJsAdapter(script_path=SCRIPT_PATH, worker=True, rpc=False, nodes=str(path), nodejs_logs=False)
+
+
+def pool_stats(provider: ViteJsAdapter) -> tuple[dict, dict]:
+    """Pool counters and stats of the nodes by url"""
+    response = provider.node_stats()
+    assert not response['error'], response['msg']
+    return response['data'], {node['url']: node for node in response['data']['nodes']}
+
+
+@pytest.fixture
+def adapters():
+    """Close worker of the adapters created by the test"""
+    created = list()
+    yield created
+
+    for provider in created:
+        provider.close()
+
+
+def test_failover_and_breaker(tmp_path, mock_nodes, adapters):
+    fast, slow = mock_nodes(), mock_nodes(latency=30)
+    provider = pool_adapter(tmp_path, [fast, slow], failure_threshold=3, cooldown=60000)
+    adapters.append(provider)
+
+    assert not provider.get_balance(address=ADDRESS)['error']
+    assert pool_stats(provider)[1][fast.http_url]['calls'] >= 2  # probe and the read
+
+    # Every read of the fastest node fails, it's sent once more to the next node
+    fast.error_rate = 1
+    responses = [provider.get_balance(address=ADDRESS) for _ in range(5)]
+    assert [response['error'] for response in responses] == [0] * 5
+
+    # Node failing 3 times in a row is skipped, without failover
+    stats, nodes = pool_stats(provider)
+    assert nodes[fast.http_url]['state'] == 'open'
+    assert nodes[slow.http_url]['state'] == 'closed'
+    assert stats['failovers'] == 3
+    assert fast.errors == 3
+
+
+def test_breaker_closes_after_cooldown(tmp_path, mock_nodes, adapters):
+    fast, slow = mock_nodes(), mock_nodes(latency=30)
+    provider = pool_adapter(tmp_path, [fast, slow], failure_threshold=2, cooldown=300)
+    adapters.append(provider)
+
+    assert not provider.get_balance(address=ADDRESS)['error']
+    fast.error_rate = 1
+
+    for _ in range(2):
+        assert not provider.get_balance(address=ADDRESS)['error']
+
+    assert pool_stats(provider)[1][fast.http_url]['state'] == 'open'
+
+    # After cooldown one call decides if the node is back
+    fast.error_rate = 0
+    time.sleep(0.5)
+    requests = fast.requests
+    assert not provider.get_balance(address=ADDRESS)['error']
+    assert fast.requests == requests + 1
+    assert pool_stats(provider)[1][fast.http_url]['state'] == 'closed'
+
+
+def test_failed_node_in_half_open_state_opens_again(tmp_path, mock_nodes, adapters):
+    fast, slow = mock_nodes(), mock_nodes(latency=30)
+    provider = pool_adapter(tmp_path, [fast, slow], failure_threshold=2, cooldown=300)
+    adapters.append(provider)
+
+    assert not provider.get_balance(address=ADDRESS)['error']
+    fast.error_rate = 1
+
+    for _ in range(2):
+        assert not provider.get_balance(address=ADDRESS)['error']
+
+    # Still failing after cooldown, one failure is enough to open the breaker again
+    time.sleep(0.5)
+    assert not provider.get_balance(address=ADDRESS)['error']
+    assert pool_stats(provider)[1][fast.http_url]['state'] == 'open'
+    assert fast.errors == 3
+
+
+def test_hedged_read(tmp_path, mock_nodes, adapters):
+    first, second = mock_nodes(latency=5), mock_nodes(latency=40)
+    provider = pool_adapter(tmp_path, [first, second], hedge=True)
+    adapters.append(provider)
+
+    # Latency samples of the fastest node (p95)
+    for _ in range(10):
+        assert not provider.get_balance(address=ADDRESS)['error']
+
+    # Read slower than p95 of the node is sent to the second node too, the first answer wins
+    first.latency = 3000
+    hedged = pool_stats(provider)[0]['hedged']
+    started = time.monotonic()
+    response = provider.get_balance(address=ADDRESS)
+
+    assert not response['error']
+    assert time.monotonic() - started < 1.5
+    assert pool_stats(provider)[0]['hedged'] == hedged + 1
+    assert second.requests >= 2  # probe and the hedged read
+
+
+def test_receive_through_pool_after_failover(tmp_path, mock_nodes, ledger, adapters):
+    fast, slow = mock_nodes(), mock_nodes(latency=30)
+    provider = pool_adapter(tmp_path, [fast, slow], failure_threshold=1, cooldown=60000)
+    adapters.append(provider)
+
+    # Receive blocks are written to (and bounded per) the node the pool picks, not the fastest one when it's down
+    assert not provider.get_balance(address=ADDRESS)['error']
+    fast.error_rate = 1
+    assert not provider.get_balance(address=ADDRESS)['error']
+
+    address = provider.get_address(MNEMONICS)
+    ledger.credit(address, 5)
+    requests = slow.requests
+    response = provider.receive_many([{'mnemonics': MNEMONICS}], concurrency=2)
+
+    assert len(response['data'][address]['data']['success']) == 5
+    assert not ledger.call('ledger_getUnreceivedBlocksByAddress', [address, 0, 10])
+    assert slow.requests >= requests + 5
+    assert pool_stats(provider)[1][fast.http_url]['state'] == 'open'
+
+
+def test_all_nodes_failing(tmp_path, mock_nodes, adapters):
+    nodes = [mock_nodes(error_rate=1), mock_nodes(error_rate=1)]
+    provider = pool_adapter(tmp_path, nodes, failure_threshold=1, cooldown=60000)
+    adapters.append(provider)
+
+    response = provider.get_balance(address=ADDRESS)
+    assert response['error']
+    assert all(node['state'] == 'open' for node in pool_stats(provider)[1].values())
@@ -0,0 +1,107 @@
+"""
+Local PoW solver. Vectors below are computed offline by the algorithm of gvite
+(pow.CheckPowNonce: 8 bytes blake2b of nonce + data hash, read as little-endian
+integer, has to reach 2^64 - 2^64 / difficulty), there is no network access
+in tests to ask a node's util_getPoWNonce for them.
+"""
+import threading
+import time
+
+import pytest
+
+from src import ViteJsAdapter
+from src.pow import PowSolver, nonce_hash, check_nonce, difficulty_to_threshold, _search, POW_REQUIRED
+
+
+ORIGINAL_ADDRESS = 'ab' * 21
+PREVIOUS_HASH = 'cd' * 32
+DATA_HASH = '3cdb2edc6306dd1ce4f325eda7c1ea629529bb059c5bc9e55ee0a744f2ec96e0'
+
+# Nonce solved for difficulty 1 000 000, its blake2b is 3ca9489410fcffff
+NONCE = '8nfoXOVYhlw='
+
+# First nonce counting from 0 (8 bytes little-endian) for difficulty 1000
+FIRST_NONCE = 362
+
+
+@pytest.fixture
+def solver():
+    solver = PowSolver(processes=2)
+    yield solver
+    solver.close()
+
+
+def test_nonce_hash():
+    assert nonce_hash(ORIGINAL_ADDRESS, PREVIOUS_HASH) == DATA_HASH
+
+
+def test_threshold():
+    # Default difficulty of send block without quota
+    assert difficulty_to_threshold(67108863) == 18446743798831640576
+    assert difficulty_to_threshold('1000') == 2 ** 64 - 18446744073709551
+
+
+def test_known_nonce():
+    assert check_nonce(1_000_000, DATA_HASH, NONCE)
+    assert check_nonce('1000000', DATA_HASH, NONCE)
+    assert not check_nonce(100_000_000, DATA_HASH, NONCE)
+    assert not check_nonce(1_000_000, PREVIOUS_HASH, NONCE)
+
+
+def test_first_nonce_of_search():
+    nonce = _search(difficulty_to_threshold(1000), bytes.fromhex(DATA_HASH), 0, 1, lambda: True)
+
+    assert int.from_bytes(nonce, 'little') == FIRST_NONCE
+    assert not any(check_nonce(1000, DATA_HASH, counter.to_bytes(8, 'little')) for counter in range(FIRST_NONCE))
+
+
+def test_solver_keeps_processes(solver):
+    nonce = solver.solve(100_000, DATA_HASH)
+    pids = [worker.pid for worker in solver._workers]
+
+    assert check_nonce(100_000, DATA_HASH, nonce)
+    assert check_nonce(100_000, PREVIOUS_HASH, solver.solve(100_000, PREVIOUS_HASH))
+    assert [worker.pid for worker in solver._workers] == pids
+
+
+def test_solve_timeout(solver):
+    started = time.monotonic()
+    assert solver.solve(10 ** 15, DATA_HASH, timeout=0.5) is None
+    assert time.monotonic() - started < 2
+
+    # Processes stopped searching and solve the next nonce
+    assert check_nonce(100_000, DATA_HASH, solver.solve(100_000, DATA_HASH, timeout=30))
+
+
+def test_cancel(solver):
+    solver.solve(1000, DATA_HASH)
+    timer = threading.Timer(0.3, solver.cancel)
+    timer.start()
+    started = time.monotonic()
+
+    assert solver.solve(10 ** 15, DATA_HASH) is None
+    assert time.monotonic() - started < 2
+
+
+def test_close_terminates_processes(solver):
+    solver.solve(1000, DATA_HASH)
+    workers = list(solver._workers)
+    solver.close()
+
+    assert workers and not any(worker.is_alive() for worker in workers)
+
+
+def test_send_solves_pow_within_deadline(monkeypatch):
+    provider = ViteJsAdapter(pow_mode='local', pow_processes=2, nodejs_logs=False, debug=False)
+    required = {'error': 1, 'msg': POW_REQUIRED, 'code': 'pow_required',
+                'data': {'difficulty': str(10 ** 15), 'hash': DATA_HASH, 'previousHash': PREVIOUS_HASH}}
+    monkeypatch.setattr(provider, '_execute', lambda *args, **kwargs: required)
+    started = time.monotonic()
+
+    try:
+        response = provider._send({}, 'local', timeout=1)
+    finally:
+        provider.close()
+
+    assert response['code'] == 'timeout'
+    assert time.monotonic() - started < 3
@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+from src.retry import Retrier, RetryPolicy
+from src.tools import error_response, landed_send
+from src.errors import ERROR_CLASSES
+
+
+SUCCESS = {'error': 0, 'msg': 'success', 'data': None}
+
+
+def attempts(*responses):
+    """Call returning the responses one by one, timeouts of the attempts are collected in call.timeouts"""
+    responses = iter(responses)
+
+    def call(timeout: float) -> dict:
+        call.timeouts.append(timeout)
+        return next(responses)
+
+    call.timeouts = list()
+    return call
+
+
+def test_retryable_errors_are_retried():
+    retrier = Retrier(RetryPolicy(retries=3, base_delay=0))
+    call = attempts(error_response('timeout', 'timeout'), error_response('refused', 'connection'), SUCCESS)
+
+    assert retrier.call('balance', call) == SUCCESS
+    assert len(call.timeouts) == 3
+
+    stats = retrier.metrics.stats()['balance']
+    assert (stats['calls'], stats['attempts'], stats['retries'], stats['failures']) == (1, 3, 2, 0)
+
+
+def test_not_retryable_error_is_returned():
+    retrier = Retrier(RetryPolicy(retries=3, base_delay=0))
+    call = attempts(error_response('invalid params', 'node'), SUCCESS)
+
+    assert retrier.call('balance', call)['code'] == 'node'
+    assert len(call.timeouts) == 1
+
+
+def test_retries_budget():
+    retrier = Retrier(RetryPolicy(retries=2, base_delay=0))
+    call = attempts(*[error_response('timeout', 'timeout')] * 5)
+
+    assert retrier.call('balance', call)['code'] == 'timeout'
+    assert len(call.timeouts) == 3
+    assert retrier.metrics.stats()['balance']['failures'] == 1
+
+
+def test_default_policy_retries_retryable_errors():
+    retryable = {code for code, error in ERROR_CLASSES.items() if error.retryable}
+    assert {error.code for error in RetryPolicy().retry_on} == retryable == {'timeout', 'connection', 'process'}
+
+
+def test_deadline():
+    retrier = Retrier(RetryPolicy(retries=10, deadline=0.3, base_delay=0))
+
+    def call(timeout: float) -> dict:
+        call.timeouts.append(timeout)
+        time.sleep(0.2)
+        return error_response('timeout', 'timeout')
+
+    call.timeouts = list()
+    retrier.call('balance', call)
+
+    # Second attempt gets only the rest of the deadline, there is no time for the third one
+    assert len(call.timeouts) == 2
+    assert call.timeouts[1] < 0.15
+    assert retrier.metrics.stats()['balance']['deadline_exceeded'] == 1
+
+
+def test_policy_without_deadline():
+    retrier = Retrier(RetryPolicy(retries=2, deadline=0.1, base_delay=0))
+    call = attempts(error_response('timeout', 'timeout'), SUCCESS)
+
+    # Attempts have no timeout, they use the default of the command
+    assert retrier.call('update', call, policy=retrier.policy.without_deadline()) == SUCCESS
+    assert call.timeouts == [None, None]
+
+
+def test_verify_runs_after_backoff(monkeypatch):
+    events = list()
+    monkeypatch.setattr(time, 'sleep', lambda delay: events.append('sleep'))
+    retrier = Retrier(RetryPolicy(retries=3))
+
+    def send(timeout: float) -> dict:
+        events.append('send')
+        return error_response('timeout', 'timeout') if events.count('send') == 1 else SUCCESS
+
+    def verify(response: dict) -> dict | None:
+        events.append('verify')
+
+    assert retrier.call('send', send, verify) == SUCCESS
+    assert events == ['send', 'sleep', 'verify', 'send']
+
+
+def test_landed_send_is_not_sent_again():
+    retrier = Retrier(RetryPolicy(retries=3, base_delay=0))
+    landed = {'error': 0, 'msg': 'landed', 'data': {'hash': 'a'}}
+    send = attempts(error_response('timeout', 'timeout'), SUCCESS)
+
+    assert retrier.call('send', send, lambda response: landed) == landed
+    assert len(send.timeouts) == 1
+
+
+def test_async_verify_runs_after_backoff(monkeypatch):
+    events = list()
+
+    async def sleep(delay: float) -> None:
+        events.append('sleep')
+
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+    retrier = Retrier(RetryPolicy(retries=3))
+
+    async def send(timeout: float) -> dict:
+        events.append('send')
+        return error_response('timeout', 'timeout')
+
+    async def verify(response: dict) -> dict | None:
+        events.append('verify')
+        return SUCCESS
+
+    assert asyncio.run(retrier.acall('send', send, verify)) == SUCCESS
+    assert events == ['send', 'sleep', 'verify']
+
+
+def test_landed_send_matching():
+    block = {'hash': 'a', 'height': '5', 'blockType': 2, 'toAddress': 'vite_to', 'amount': '1000000000000000000'}
+    failed = error_response('timeout', 'timeout')
+
+    # Amount given as int, decimal string or exponent is the same amount
+    for amount in (10 ** 18, '1000000000000000000', '1e18', '1000000000000000000.0'):
+        assert landed_send(block, 'vite_to', amount, failed)
+
+    assert not landed_send(block, 'vite_to', 10 ** 18 + 1, failed)
+    assert not landed_send(block, 'vite_other', 10 ** 18, failed)
+    assert not landed_send({**block, 'blockType': 4}, 'vite_to', 10 ** 18, failed)
+
+    # Failed response with hash (or height) of the block it sent
+    assert landed_send(block, 'vite_other', 1, {**failed, 'data': {'hash': 'a'}})
+    assert not landed_send(block, 'vite_to', 10 ** 18, {**failed, 'data': {'hash': 'b'}})
+    assert landed_send(block, 'vite_to', 10 ** 18, {**failed, 'data': {'height': 5}})
+    assert not landed_send(block, 'vite_to', 10 ** 18, {**failed, 'data': {'height': '6'}})
@@ -0,0 +1,178 @@
+"""
+Wallet scheduler of the transaction listener: coalesced checks, backoff of failed wallets,
+adding and removing wallets while the scheduler is running
+"""
+import threading
+import time
+
+from src.scheduler import WalletScheduler
+
+
+def balance(unreceived: int = 1, error: int = 0) -> dict:
+    return {'error': error, 'msg': 'success', 'data': {'unreceived': {'blockCount': str(unreceived)}}}
+
+
+def wallet(index: int) -> dict:
+    return {'address': f'vite_{index:050d}', 'mnemonics': 'mnemonics'}
+
+
+def wait(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    return condition()
+
+
+def test_due_wallets_are_checked_together():
+    checks = list()
+    scheduler = WalletScheduler(lambda wallets: checks.append(wallets) or {}, lambda *_: 0, interval=60)
+
+    for index in range(3):
+        scheduler.add_wallet(wallet(index))
+
+    scheduler.start()
+    assert wait(lambda: checks)
+    scheduler.stop()
+
+    assert len(checks) == 1
+    assert [item['address'] for item in checks[0]] == [wallet(index)['address'] for index in range(3)]
+
+
+def test_wallets_due_within_coalesce_window_are_checked_early():
+    checks = list()
+    scheduler = WalletScheduler(lambda wallets: checks.append(wallets) or {}, lambda *_: 0, interval=60, coalesce=1)
+    scheduler.add_wallet(wallet(0))
+    scheduler.add_wallet(wallet(1))
+
+    # Second wallet is due in 0.5 seconds
+    state = scheduler._states[wallet(1)['address']]
+    state.due += 0.5
+    scheduler._push(state)
+
+    scheduler.start()
+    assert wait(lambda: checks)
+    scheduler.stop()
+
+    assert len(checks[0]) == 2
+
+
+def test_failed_wallet_backs_off():
+    times = list()
+
+    def check(wallets: list) -> dict:
+        times.append(time.monotonic())
+        return {item['address']: balance(error=1) for item in wallets}
+
+    scheduler = WalletScheduler(check, lambda *_: 0, interval=0.1, coalesce=0)
+    scheduler.add_wallet(wallet(0))
+    scheduler.start()
+    assert wait(lambda: len(times) >= 4)
+    scheduler.stop()
+
+    # Delays after 1, 2 and 3 errors: interval, interval * 2, interval * 4
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert 0.1 <= gaps[0] < gaps[1] < gaps[2]
+    assert gaps[2] >= 0.4
+    assert scheduler.stats()['errors'] >= 3
+
+
+def test_busy_wallet_is_checked_more_often_and_idle_less_often():
+    received = {wallet(0)['address']: 2, wallet(1)['address']: 0}
+
+    scheduler = WalletScheduler(lambda wallets: {item['address']: balance() for item in wallets},
+                                lambda item, _: received[item['address']], interval=60)
+    scheduler.add_wallet(wallet(0))
+    scheduler.add_wallet(wallet(1))
+    scheduler.start()
+    assert wait(lambda: scheduler.stats()['processed'] == 2)
+    scheduler.stop()
+
+    assert scheduler._states[wallet(0)['address']].interval == 30
+    assert scheduler._states[wallet(1)['address']].interval == 90
+
+
+def test_wallet_without_unreceived_blocks_is_not_processed():
+    processed = list()
+    scheduler = WalletScheduler(lambda wallets: {item['address']: balance(unreceived=0) for item in wallets},
+                                lambda item, _: processed.append(item) or 0, interval=60)
+    scheduler.add_wallet(wallet(0))
+    scheduler.start()
+    assert wait(lambda: scheduler.stats()['processed'] == 1)
+    scheduler.stop()
+
+    assert not processed
+
+
+def test_no_check_after_stop():
+    checks = list()
+    scheduler = WalletScheduler(lambda wallets: checks.append(wallets) or {}, lambda *_: 0,
+                                interval=0.5, coalesce=10)
+    scheduler.add_wallet(wallet(0))
+    scheduler.start()
+    assert wait(lambda: checks)
+
+    # Wallet queued again is within the coalesce window when stop() wakes the loop
+    assert wait(lambda: scheduler.stats()['queued'] == 1)
+    scheduler.stop()
+    scheduler._thread.join(timeout=5)
+
+    assert len(checks) == 1
+
+
+def test_removed_wallet_is_not_checked_again():
+    checks = list()
+    scheduler = WalletScheduler(lambda wallets: checks.append(wallets) or {}, lambda *_: 0, interval=0.05)
+    scheduler.add_wallet(wallet(0))
+    scheduler.add_wallet(wallet(1))
+    scheduler.start()
+    assert wait(lambda: checks)
+
+    scheduler.remove_wallet(wallet(0)['address'])
+    count = len(checks)
+    assert wait(lambda: len(checks) > count + 2)
+    scheduler.stop()
+
+    assert all([item['address'] for item in wallets] == [wallet(1)['address']] for wallets in checks[count + 1:])
+    assert scheduler.wallets == [wallet(1)]
+
+
+def test_wallet_added_back_while_processed_is_not_processed_twice_at_once():
+    release, lock = threading.Event(), threading.Lock()
+    running, calls = [0, 0], list()
+
+    def process(item: dict, _) -> int:
+        with lock:
+            calls.append(item)
+            running[0] += 1
+            running[1] = max(running)
+
+        release.wait(5)
+
+        with lock:
+            running[0] -= 1
+
+        return 0
+
+    scheduler = WalletScheduler(lambda wallets: {item['address']: balance() for item in wallets}, process,
+                                interval=0.05, min_interval=0.05)
+    scheduler.add_wallet(wallet(0))
+    scheduler.start()
+    assert wait(lambda: calls)
+
+    # Removed and added back while the first processing is running
+    scheduler.remove_wallet(wallet(0)['address'])
+    scheduler.add_wallet({**wallet(0), 'address_id': 1})
+    time.sleep(0.3)
+
+    assert len(calls) == 1
+    assert scheduler.stats()['in_flight'] == 1
+
+    # Scheduled again after the processing is finished, with the new wallet
+    release.set()
+    assert wait(lambda: len(calls) >= 2)
+    scheduler.stop()
+
+    assert running[1] == 1
+    assert calls[1]['address_id'] == 1
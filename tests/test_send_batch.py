@@ -0,0 +1,111 @@
+"""
+send_batch() against the mock node: blocks chained locally and sent in order,
+failed transfer stops the batch, sent blocks are polled until confirmed
+"""
+import time
+
+import pytest
+
+from src import ViteJsAdapter
+from benchmarks.mock_node import VITE_TOKEN_ID
+from conftest import SCRIPT_PATH, MNEMONICS
+
+
+pytestmark = pytest.mark.node
+
+RECIPIENTS = ['vite_' + str(index) * 50 for index in range(1, 4)]
+
+
+@pytest.fixture
+def provider(mock_node, monkeypatch):
+    for key, value in mock_node.env.items():
+        monkeypatch.setenv(key, value)
+
+    monkeypatch.setenv('VITE_SEND_CONFIRM_TIMEOUT', '1500')
+    provider = ViteJsAdapter(script_path=SCRIPT_PATH, nodejs_logs=False, debug=False, rpc=False)
+    yield provider
+    provider.close()
+
+
+def transfers(count: int = 3) -> list[dict]:
+    return [{'to_address': address, 'token_id': VITE_TOKEN_ID, 'amount': 10 ** 18 + index}
+            for index, address in enumerate(RECIPIENTS[:count])]
+
+
+def test_blocks_are_chained_and_confirmed(provider, ledger):
+    address = provider.get_address(MNEMONICS)
+    height = ledger.call('ledger_getLatestAccountBlock', [address])
+    height = int(height['height']) if height else 0
+
+    response = provider.send_batch(transfers(), mnemonics=MNEMONICS)
+
+    assert not response['error'], response['msg']
+    assert [result['error'] for result in response['data']] == [0, 0, 0]
+    assert [int(result['data']['height']) for result in response['data']] == [height + 1, height + 2, height + 3]
+    assert all(result['data']['confirmed'] for result in response['data'])
+
+    # Every block is on the account chain, chained to the previous one
+    blocks = [ledger.call('ledger_getAccountBlockByHash', [result['data']['hash']]) for result in response['data']]
+    assert [block['previousHash'] for block in blocks[1:]] == [block['hash'] for block in blocks[:-1]]
+    assert [block['toAddress'] for block in blocks] == RECIPIENTS
+    assert [block['amount'] for block in blocks] == [str(10 ** 18 + index) for index in range(3)]
+
+    for recipient in RECIPIENTS:
+        assert ledger.call('ledger_getUnreceivedBlocksByAddress', [recipient, 0, 10])
+
+
+def test_transfers_after_failed_one_are_not_sent(provider, ledger, monkeypatch):
+    apply, applied = ledger.apply, list()
+
+    def failing_apply(block: dict) -> None:
+        if block['toAddress'] == RECIPIENTS[1]:
+            raise ValueError('insufficient balance')
+        apply(block)
+        applied.append(block)
+
+    monkeypatch.setattr(ledger, 'apply', failing_apply)
+    response = provider.send_batch(transfers(), mnemonics=MNEMONICS)
+    first, second, third = response['data']
+
+    assert first['error'] == 0 and first['data']['confirmed']
+    assert second['error'] and 'insufficient balance' in second['msg']
+    assert third['error'] and 'not sent' in third['msg']
+    assert [block['toAddress'] for block in applied] == RECIPIENTS[:1]
+    assert not ledger.call('ledger_getUnreceivedBlocksByAddress', [RECIPIENTS[2], 0, 10])
+
+
+def test_sent_blocks_are_polled_until_confirmed(provider, ledger, monkeypatch):
+    call, polls = ledger.call, list()
+
+    # Blocks are snapshot confirmed from the third poll
+    def call_(method: str, params: list):
+        result = call(method, params)
+
+        if method == 'ledger_getAccountBlockByHash' and result:
+            polls.append(params[0])
+            return {**result, 'confirmations': '1' if polls.count(params[0]) >= 3 else '0'}
+
+        return result
+
+    monkeypatch.setattr(ledger, 'call', call_)
+    response = provider.send_batch(transfers(2), mnemonics=MNEMONICS)
+
+    assert all(result['data']['confirmed'] for result in response['data'])
+    assert all(polls.count(result['data']['hash']) == 3 for result in response['data'])
+
+
+def test_confirmation_is_polled_until_deadline(provider, ledger, monkeypatch):
+    call = ledger.call
+
+    def call_(method: str, params: list):
+        result = call(method, params)
+        return {**result, 'confirmations': '0'} if method == 'ledger_getAccountBlockByHash' and result else result
+
+    monkeypatch.setattr(ledger, 'call', call_)
+    started = time.monotonic()
+    response = provider.send_batch(transfers(1), mnemonics=MNEMONICS)
+
+    # Sent, but not confirmed within VITE_SEND_CONFIRM_TIMEOUT
+    assert response['data'][0]['error'] == 0
+    assert not response['data'][0]['data']['confirmed']
+    assert 1 <= time.monotonic() - started < 5
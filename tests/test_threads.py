@@ -0,0 +1,81 @@
+"""
+ViteJsAdapter shared by threads: every call returns its own Response,
+self.response / self.status are the last result of the calling thread
+"""
+import threading
+import time
+
+import pytest
+
+from src import ViteJsAdapter
+from src.tools import Response, error_response
+
+
+ADDRESSES = ['vite_' + str(index) * 50 for index in range(8)]
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = ViteJsAdapter(nodejs_logs=False, debug=False, threads=4, rpc=False)
+
+    # Balance of the address, the last address fails
+    def execute(name: str, timeout=None, on_event=None, **args) -> dict:
+        time.sleep(0.01)
+
+        if args['a'] == ADDRESSES[-1]:
+            return error_response('invalid address', 'node')
+
+        return {'error': 0, 'msg': 'success', 'data': {'address': args['a']}}
+
+    monkeypatch.setattr(provider, '_execute', execute)
+    yield provider
+    provider.close()
+
+
+def test_response_of_every_thread(provider):
+    barrier = threading.Barrier(len(ADDRESSES))
+    seen = dict()
+
+    def call(address: str) -> None:
+        returned = provider.get_balance(address=address)
+
+        # Other threads finish their calls before the response is read
+        barrier.wait()
+        seen[address] = (returned, provider.response, provider.status)
+
+    threads = [threading.Thread(target=call, args=(address,)) for address in ADDRESSES]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    for address, (returned, response, status) in seen.items():
+        assert isinstance(returned, Response)
+        assert response is returned
+
+        if address == ADDRESSES[-1]:
+            assert status == 'failed' and response['code'] == 'node'
+        else:
+            assert status == 'finished' and response['data']['address'] == address
+
+
+def test_thread_without_call(provider):
+    provider.get_balance(address=ADDRESSES[0])
+    seen = list()
+
+    thread = threading.Thread(target=lambda: seen.append((provider.response, provider.status)))
+    thread.start()
+    thread.join()
+
+    assert seen == [({}, 'running')]
+    assert provider.status == 'finished'
+
+
+def test_map_balances_in_input_order(provider):
+    wallets = list(reversed(ADDRESSES)) + [{'address': ADDRESSES[0]}]
+    responses = provider.map_balances(wallets)
+
+    assert [response.status for response in responses] == ['failed'] + ['finished'] * (len(wallets) - 1)
+    assert [response['data']['address'] for response in responses[1:]] == ADDRESSES[-2::-1] + ADDRESSES[:1]
@@ -0,0 +1,123 @@
+"""
+TransactionFilter compiled once per listener: symbols resolved to tokenIds by TokenRegistry,
+exact symbol match, amount limits in token units, senders and block types
+"""
+from src.tokens import TokenRegistry, TransactionFilter
+from src.rpc import ViteRPC
+from benchmarks.mock_node import VITE_TOKEN_ID
+from conftest import ADDRESS
+
+
+VITEX_TOKEN_ID = 'tti_564954455820434f494e69b5'
+OTHER_TOKEN_ID = 'tti_' + 'ab' * 12
+
+TOKENS = [{'tokenId': VITE_TOKEN_ID, 'tokenSymbol': 'VITE', 'decimals': 18},
+          {'tokenId': VITEX_TOKEN_ID, 'tokenSymbol': 'VITEX', 'decimals': 18}]
+
+
+def transaction(token_id: str, symbol: str = None, amount: str = '1000000000000000000', block_type: int = 4,
+                sender: str = ADDRESS, decimals: int = 18) -> dict:
+    token_info = {'tokenId': token_id, 'tokenSymbol': symbol, 'decimals': decimals} if symbol else None
+    return {'blockType': block_type, 'tokenId': token_id, 'tokenInfo': token_info, 'amount': amount,
+            'fromAddress': sender}
+
+
+class Loader:
+    """Token list of the node, counts the loads"""
+
+    def __init__(self, tokens: list[dict]):
+        self.tokens = tokens
+        self.calls = 0
+
+    def __call__(self) -> list[dict]:
+        self.calls += 1
+        return self.tokens
+
+
+def test_symbol_matches_exactly():
+    filter_ = TransactionFilter(['vite'], TokenRegistry(Loader(TOKENS)))
+
+    assert filter_.token_ids == {VITE_TOKEN_ID}
+    assert filter_(transaction(VITE_TOKEN_ID, 'VITE'))
+    assert not filter_(transaction(VITEX_TOKEN_ID, 'VITEX'))
+
+
+def test_token_id_matches_without_registry():
+    filter_ = TransactionFilter([VITEX_TOKEN_ID])
+
+    assert filter_(transaction(VITEX_TOKEN_ID))
+    assert not filter_(transaction(VITE_TOKEN_ID, 'VITE'))
+
+
+def test_unknown_symbol_is_resolved_by_transaction():
+    registry = TokenRegistry()
+    filter_ = TransactionFilter(['TKN'], registry)
+
+    assert not filter_.token_ids
+    assert filter_.filter([transaction(OTHER_TOKEN_ID, 'TKN'), transaction(VITE_TOKEN_ID, 'VITE')]) \
+        == [transaction(OTHER_TOKEN_ID, 'TKN')]
+
+    # Learned tokenId is matched without token info, the other token is not checked again
+    assert filter_.token_ids == {OTHER_TOKEN_ID}
+    assert filter_(transaction(OTHER_TOKEN_ID))
+    assert VITE_TOKEN_ID in filter_._others
+    assert registry.ids('TKN') == {OTHER_TOKEN_ID}
+
+
+def test_registry_refreshes_lazily():
+    loader = Loader(TOKENS)
+    registry = TokenRegistry(loader, refresh_interval=60)
+
+    assert registry.ids('VITE') == {VITE_TOKEN_ID}
+    assert registry.ids('VITE') == {VITE_TOKEN_ID}
+    assert loader.calls == 1
+
+    # Unknown symbol reloads the registry at most once per refresh_interval
+    assert registry.ids('UNKNOWN') == set()
+    assert registry.get(OTHER_TOKEN_ID) is None
+    assert loader.calls == 1
+
+    assert registry.refresh(force=True)
+    assert loader.calls == 2
+
+
+def test_registry_keeps_tokens_when_loader_fails():
+    def loader():
+        raise ConnectionError('node is down')
+
+    registry = TokenRegistry(loader)
+    registry.add(TOKENS[0])
+
+    assert registry.ids('VITE') == {VITE_TOKEN_ID}
+    assert registry.ids('VITEX') == set()
+
+
+def test_amount_limits_in_token_units():
+    filter_ = TransactionFilter(['__all__'], TokenRegistry(Loader(TOKENS)), min_amount=0.5, max_amount='2')
+
+    assert filter_(transaction(VITE_TOKEN_ID, 'VITE', amount='500000000000000000'))
+    assert filter_(transaction(VITE_TOKEN_ID, 'VITE', amount='2000000000000000000'))
+    assert not filter_(transaction(VITE_TOKEN_ID, 'VITE', amount='499999999999999999'))
+    assert not filter_(transaction(VITE_TOKEN_ID, 'VITE', amount='2000000000000000001'))
+
+    # Decimals of the token info, 1 unit of 8 decimals token
+    assert filter_(transaction(OTHER_TOKEN_ID, 'TKN', amount='100000000', decimals=8))
+
+
+def test_senders_and_block_types():
+    sender = 'vite_' + 'b' * 50
+    filter_ = TransactionFilter(None, senders=[sender])
+
+    assert filter_(transaction(VITE_TOKEN_ID, 'VITE', sender=sender))
+    assert not filter_(transaction(VITE_TOKEN_ID, 'VITE'))
+    assert not filter_(transaction(VITE_TOKEN_ID, 'VITE', sender=sender, block_type=2))
+    assert TransactionFilter(None, block_types=None)(transaction(VITE_TOKEN_ID, 'VITE', block_type=2))
+
+
+def test_registry_loaded_from_node(mock_node):
+    registry = TokenRegistry(ViteRPC([mock_node.http_url]).tokens)
+    filter_ = TransactionFilter(['TKN1'], registry)
+
+    assert len(registry) == 2
+    assert filter_.token_ids == registry.ids('tkn1')
+    assert filter_(transaction(registry.ids('TKN1').pop()))
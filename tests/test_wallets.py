@@ -0,0 +1,119 @@
+"""
+Bulk wallet creation: shared record sink, producers of create_wallets() when writing fails,
+addresses derived by @vite/vitejs cross-checked with a known-answer vector
+"""
+import threading
+import json
+import stat
+import time
+import io
+import os
+
+import pytest
+
+from src import ViteJsAdapter
+from src.export import RecordSink
+from conftest import SCRIPT_PATH, MNEMONICS
+
+
+# Addresses of MNEMONICS (address_id 0, 1, 2) built offline by independent derivation:
+# BIP39 seed (PBKDF2-HMAC-SHA512, empty passphrase), SLIP-0010 ed25519 key of m/44'/666666'/i',
+# ed25519 public key (RFC 8032), address is 'vite_' + hex(blake2b-160(public key)) + hex(blake2b-40 checksum)
+ADDRESSES = ['vite_09aaf038c5eba701871b3b8622f951f0489c6513f4358a32c7',
+             'vite_0c7cc955ae5f62ae3ddaaf65e787b5a6a9dfbbd31aeeabfa15',
+             'vite_abaa2f1d38fe7addc37c79bd3770fe177d1a99f482ae9793ae']
+
+
+class FullDisk(io.StringIO):
+    """File failing to write once it has the given number of lines, like a full disk"""
+
+    def __init__(self, lines: int):
+        super().__init__()
+        self.lines = lines
+
+    def write(self, text: str) -> int:
+        if self.getvalue().count('\n') >= self.lines:
+            raise OSError(28, 'No space left on device')
+        return super().write(text)
+
+
+def test_sink_keeps_records_without_file():
+    with RecordSink() as sink:
+        sink.write({'address': 'vite_a'})
+
+    assert sink.data == [{'address': 'vite_a'}]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fchmod'), reason="POSIX permissions")
+def test_private_sink_restricts_existing_file(tmp_path):
+    path = tmp_path / 'wallets.ndjson'
+    path.write_text('old\n')
+    path.chmod(0o644)
+
+    with RecordSink(str(path), private=True) as sink:
+        sink.write({'mnemonics': MNEMONICS})
+
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{'mnemonics': MNEMONICS}]
+    assert sink.data == 1
+
+
+def test_csv_sink(tmp_path):
+    path = tmp_path / 'history.csv'
+
+    with RecordSink(str(path), fields=('height', 'tokenInfo.tokenSymbol')) as sink:
+        sink.write({'height': '1', 'tokenInfo': {'tokenSymbol': 'VITE'}})
+
+    assert path.read_text().splitlines() == ['height,tokenInfo.tokenSymbol', '1,VITE']
+
+
+def test_failed_write_stops_producers(monkeypatch):
+    provider = ViteJsAdapter(nodejs_logs=False, debug=False)
+    finished = list()
+
+    def stream_command(command, on_start=None, timings=None, stdin=None):
+        # Process creating wallets endlessly, more than the queue can hold
+        try:
+            index = 0
+
+            while True:
+                index += 1
+                yield {'event': 'wallet', 'mnemonics': f'mnemonics {index}', 'address': f'vite_{index}'}
+        finally:
+            finished.append(command)
+
+    monkeypatch.setattr(provider, '_stream_command', stream_command)
+    threads = threading.active_count()
+
+    with pytest.raises(OSError):
+        provider.create_wallets(5000, file=FullDisk(lines=10), processes=4)
+
+    deadline = time.monotonic() + 5
+
+    while (len(finished) < 4 or threading.active_count() > threads) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert len(finished) == 4
+    assert threading.active_count() == threads
+    provider.close()
+
+
+@pytest.mark.node
+def test_created_addresses_match_derivation():
+    provider = ViteJsAdapter(script_path=SCRIPT_PATH, nodejs_logs=False, debug=False)
+    response = provider.create_wallets(3, addresses=3, processes=1)
+    assert not response['error'], response['msg']
+
+    for wallet in response['data']:
+        derived = provider.derive_addresses(wallet['mnemonics'], range(3))['data']
+        assert wallet['addresses'] == derived
+        assert wallet['address'] == derived[0]['address']
+
+
+@pytest.mark.node
+def test_derivation_known_answer():
+    provider = ViteJsAdapter(script_path=SCRIPT_PATH, nodejs_logs=False, debug=False)
+    derived = provider.derive_addresses(MNEMONICS, range(3))
+
+    assert [address['address'] for address in derived['data']] == ADDRESSES
+    assert provider.get_address(MNEMONICS) == ADDRESSES[0]
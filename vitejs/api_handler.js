@@ -1,18 +1,8 @@
-import {
-    getBalance,
-    createWallet,
-    sendTransaction,
-    getTransactions,
-    receiveTransactions,
-} from './vite-wallet-api.js';
-
-import {
-    logAndExit,
-    DEBUG,
-    sleep,
-    ReceiveProcess
-} from './tools.js'
+import { run } from './commands.js'
+import { exitWith } from './tools.js'
+import { now } from './timings.js'
 
+import fs from 'fs';
 import _yargs from 'yargs';
 import { hideBin } from 'yargs/helpers';
 
@@ -26,12 +16,30 @@ node <this_file_path> <command> <arg1> <arg2> etc...
 
 COMMANDS & ARGS:
 - create            no args
+                    -n <count> -k <addresses_per_wallet> -v 0|1 (many wallets streamed
+                    as event frames, -v 1 cross-checks derivation, default)
 - balance           -a <address> |and/or| -m <mnemonics> -i <address_derivation_id>
+                    -b 1 -a <address> -a <address> ... (batch, many addresses in one call)
 - transactions      -a <address> -i <page_index> -s <page_size>
 - update            -m <mnemonics> -i <address_derivation_id>
+                    (received blocks are streamed as event frames)
+- receive_batch     -j <JSON list of {mnemonics, address_id}> -c <max_blocks_sent_at_once_per_node>
 - send              -m <mnemonics> -i <address_derivation_id>
                     -d <destination_address> -t <tokenId> -a <amount>
-
+                    -p local (PoW solved by the caller, 'pow required' response
+                    data is {difficulty, hash, previousHash}, re-run with
+                    -n <nonce> -f <difficulty> -r <previous_hash>)
+- send_batch        -m <mnemonics> -i <address_derivation_id>
+                    -j <JSON list of {to_address, token_id, amount}>
+                    (result of every transfer is streamed as event frame)
+- derive            -m <mnemonics> -i <address_derivation_id> -i <address_derivation_id> ...
+- subscribe         -a <address> -a <address> ... (runs until connection is closed)
+- nodes             no args (latency and state of VITE nodes, see pool.js)
+
+--stdin             arguments too long for the command line (i.e. -j of big batches)
+                    are read from stdin as JSON object {<arg>: <value>}
+
+For a long-lived process serving many calls see worker.js
 */
 
 
@@ -39,115 +47,12 @@ COMMANDS & ARGS:
 const yargs = _yargs(hideBin(process.argv));
 const args = yargs.argv
 
+// Linux limits single command line argument to 128 KiB, long ones come on stdin
+if (args.stdin) {Object.assign(args, JSON.parse(fs.readFileSync(0, 'utf-8')))}
 
-// Recognize command and run proper function withs args
-switch (args._[0]) {
-    case 'create':
-        create()
-        break
-
-    case 'balance':
-        balance(args.a, args.m, args.i)
-        break
-
-    case 'update':
-        receive(args.m, args.i);
-        break
-
-    case 'transactions':
-        transactions(args.a, args.i, args.s);
-        break
-
-    case 'send':
-        send(args.m, args.i, args.d, args.t, args.a);
-        break
-
-    default:
-        logAndExit(1, 'invalid command')
-}
-
-
-/*  #########################
-    ### COMMAND FUNCTIONS ###
-    #########################   */
-
-// Create new Vite wallet
-export async function create() {
-    try {
-        if (DEBUG) {
-            return createWallet();
-        } else {
-            let wallet = createWallet()
-            logAndExit(0, 'create success', wallet)
-        }
-    } catch (error) {logAndExit(1, error)}
-}
-
-
-// Get balance for vite_address from network
-export async function balance(address, mnemonics, address_id) {
-    try {
-        if (DEBUG) {
-            return getBalance(address, mnemonics, address_id);
-        } else {
-            let balance = await getBalance(address, mnemonics, address_id, 800)
-            logAndExit(0, 'balance success', balance)
-        }
-    } catch (error) {logAndExit(1, error.message)}
-}
-
-
-// Get transactions list for vite_address from network
-export async function transactions(address, pageIndex=0, pageSize=10) {
-    try {
-        if (DEBUG) {
-            return getTransactions(address, pageIndex, pageSize);
-        } else {
-            await getTransactions(address, pageIndex, pageSize).
-                then((transactions) => {logAndExit(0, 'txs success', transactions)}).
-                catch((error) => {logAndExit(1, error.message)})
-        }
-    } catch (error) {logAndExit(1, error.message)}
-}
-
-
-// Send transaction to VITE network
-export async function send(mnemonics, address_id, toAddress, tokenId, amount, timeout=5000) {
-    if (DEBUG) {
-        return sendTransaction(mnemonics, address_id, toAddress, tokenId, amount.toString(), timeout)
-    } else {
-        await sendTransaction(mnemonics, address_id,
-            toAddress, tokenId, amount.toString(), timeout).then((result) => {
-            console.log(">> sending " + (parseInt(amount) / 10 ** 8) + " completed")
-            logAndExit(0, 'transaction success', result)
-        }).catch(error => {
-            if (typeof error === 'string' || error instanceof String) {
-                logAndExit(1, error)
-            } else {
-                logAndExit(1, error.message)
-            }
-        })
-    }
-}
-
-
-// Update wallet balance by receiving pending transactions
-export async function receive(mnemonics, address_id) {
-    // Initialize receiving manager to provide callback flags
-    const manager = new ReceiveProcess()
-
-    try {
-        if (DEBUG) {
-            return receiveTransactions(mnemonics, address_id)
-        } else {
-            await receiveTransactions(mnemonics, address_id, manager, 1000)
 
-            // Keep process alive until receiving is finished or error appears
-            while (manager.status !== 'success') {
-                console.log(">> " + manager.msg)
-                await sleep(1000)
-            }
-            logAndExit(manager.error, manager.msg, manager.data)
-        }
-    } catch (error) {logAndExit(1, error.message)}
-}
+// Recognize command, run proper function with args and print the response,
+// time since process start is reported as startup phase
+run(args._[0], args, now()).then((result) => {
+    exitWith(result)
+})
@@ -0,0 +1,258 @@
+import {
+    getBalance,
+    getBalances,
+    createWallet,
+    createWallets,
+    sendTransaction,
+    getTransactions,
+    receiveAccounts,
+    subscribeUnreceived,
+    deriveAddresses,
+    sendBatch,
+    PowRequired,
+} from './vite-wallet-api.js';
+
+import { nodeStats } from './provider.js'
+import { withTimings } from './timings.js'
+
+import {
+    response,
+    failure,
+    writeFrame
+} from './tools.js'
+
+
+/*
+COMMAND FUNCTIONS SHARED BY api_handler.js (one process per call)
+AND worker.js (long-lived process).
+
+Every command resolves with {error: 0|1, msg: str, data: any, timings: {phase: ms}}
+and never throws, so callers only have to forward the response (see timings.js).
+
+COMMANDS & ARGS:
+- create            no args
+                    n <count> k <addresses_per_wallet> v 0|1 (many wallets, streamed as
+                    {event: 'wallet', mnemonics, address, addresses} frames, v 1 cross-checks
+                    addresses derived from the mnemonics, not available in worker.js)
+- balance           a <address> |and/or| m <mnemonics> i <address_derivation_id>
+                    b 1 a <address> a <address> ... (batch, many addresses in one call)
+- transactions      a <address> i <page_index> s <page_size>
+- update            m <mnemonics> i <address_derivation_id>
+                    (every received block is streamed as {event: 'received', address,
+                    hash, height, sendBlockHash} frame as soon as the node accepts it)
+- receive_batch     j <JSON list of {mnemonics, address_id}> c <max_blocks_sent_at_once_per_node>
+                    (many wallets received concurrently, streamed like update)
+- send              m <mnemonics> i <address_derivation_id>
+                    d <destination_address> t <tokenId> a <amount>
+                    p local (PoW solved by the caller, 'pow required' response
+                    data is {difficulty, hash, previousHash}, re-run with
+                    n <nonce> f <difficulty> r <previous_hash>)
+- send_batch        m <mnemonics> i <address_derivation_id>
+                    j <JSON list of {to_address, token_id, amount}>
+                    (result of every transfer is streamed as {event: 'transfer',
+                    index, error, msg, data} frame as soon as it is known)
+- derive            m <mnemonics> i <address_derivation_id> i <address_derivation_id> ...
+- subscribe         a <address> a <address> ... (runs until connection is closed,
+                    not available in worker.js)
+- nodes             no args (latency and state of VITE nodes, see pool.js)
+*/
+
+
+// Run command and add its phase timings to the response,
+// startup is ms from process start to the call (one-shot process only),
+// emit(frame) sends event frames of streaming commands (payload channel by default)
+export async function run(command, args, startup=0, emit=writeFrame) {
+    const [result, timings] = await withTimings(() => dispatch(command, args, emit), startup)
+    result.timings = timings
+    return result
+}
+
+
+// Recognize command and run proper function with args
+async function dispatch(command, args, emit) {
+    switch (command) {
+        case 'create':
+            if (args.n) {return create_batch(Number(args.n), Number(args.k ?? 1), Number(args.v ?? 1) !== 0)}
+            return create()
+
+        case 'balance':
+            if (args.b) {return balances([].concat(args.a))}
+            return balance(args.a, args.m, args.i)
+
+        case 'update':
+            return receive(args.m, args.i, emit)
+
+        case 'receive_batch':
+            return receive_batch(JSON.parse(args.j), Number(args.c) || undefined, emit)
+
+        case 'transactions':
+            return transactions(args.a, args.i, args.s)
+
+        case 'send':
+            return send(args.m, args.i, args.d, args.t, args.a, 5000,
+                {mode: args.p, nonce: args.n, difficulty: args.f, previousHash: args.r})
+
+        case 'send_batch':
+            return send_batch(args.m, args.i, JSON.parse(args.j), 5000, emit)
+
+        case 'derive':
+            return derive(args.m, [].concat(args.i ?? 0))
+
+        case 'subscribe':
+            return subscribe([].concat(args.a))
+
+        case 'nodes':
+            return nodes()
+
+        default:
+            return response(1, 'invalid command', null, 'invalid')
+    }
+}
+
+
+// Create new Vite wallet
+export async function create() {
+    try {
+        let wallet = createWallet()
+        return response(0, 'create success', wallet)
+    } catch (error) {return failure(error)}
+}
+
+
+// Create many wallets in one process, every wallet is streamed as event frame
+export async function create_batch(count, addressCount=1, verify=true) {
+    let created = 0
+    try {
+        createWallets(count, Math.max(1, addressCount), verify, (wallet) => {
+            writeFrame({event: 'wallet', ...wallet})
+            created++
+        })
+        return response(0, 'create success', {count: created})
+    } catch (error) {return failure(error, {count: created})}
+}
+
+
+// Get balance for vite_address from network
+export async function balance(address, mnemonics, address_id) {
+    try {
+        let balance = await getBalance(address, mnemonics, address_id, 800)
+        return response(0, 'balance success', balance)
+    } catch (error) {return failure(error)}
+}
+
+
+// Get balances for many vite_addresses from network in one batch request
+export async function balances(addresses) {
+    try {
+        let balances = await getBalances(addresses.map(String), 2000)
+        return response(0, 'balances success', balances)
+    } catch (error) {return failure(error)}
+}
+
+
+// Derive addresses of the mnemonics for many derivation ids
+export async function derive(mnemonics, address_ids) {
+    try {
+        let addresses = deriveAddresses(mnemonics, address_ids.map(Number))
+        return response(0, 'derive success', addresses)
+    } catch (error) {return failure(error)}
+}
+
+
+// Get transactions list for vite_address from network
+export async function transactions(address, pageIndex=0, pageSize=10) {
+    try {
+        let transactions = await getTransactions(address, pageIndex, pageSize)
+        return response(0, 'txs success', transactions)
+    } catch (error) {return failure(error)}
+}
+
+
+// Send transaction to VITE network
+export async function send(mnemonics, address_id, toAddress, tokenId, amount, timeout=5000, pow={}) {
+    try {
+        let result = await sendTransaction(mnemonics, address_id, toAddress, tokenId, amount.toString(), timeout, pow)
+        console.log(">> sending " + (parseInt(amount) / 10 ** 8) + " completed")
+        return response(0, 'transaction success', result)
+    } catch (error) {
+        if (error instanceof PowRequired) {return response(1, error.message, error.data, 'pow_required')}
+        return failure(error)
+    }
+}
+
+
+// Send many transactions from one account, response data has result of every transfer,
+// every result is also streamed as {event: 'transfer', index, error, msg, data} frame
+export async function send_batch(mnemonics, address_id, transfers, timeout=5000, emit=writeFrame) {
+    try {
+        let results = await sendBatch(mnemonics, address_id, transfers, timeout, (index, result) => {
+            emit({event: 'transfer', index: index, ...result})
+        })
+        let sent = results.filter((result) => !result.error).length
+        return response(0, `${sent} / ${transfers.length} transactions sent`, results)
+    } catch (error) {return failure(error)}
+}
+
+
+// Update wallet balance by receiving pending transactions
+export async function receive(mnemonics, address_id, emit=writeFrame) {
+    try {
+        const [result] = await receiveAccounts([{mnemonics: mnemonics, address_id: address_id}], (block) => {
+            console.log(`>> received ${block.height} ${block.hash}`)
+            emit({event: 'received', ...block})
+        })
+        return receiveResponse(result)
+    } catch (error) {return failure(error)}
+}
+
+
+// Receive pending transactions of many wallets at once, data is {address: update response}
+export async function receive_batch(accounts, concurrency, emit=writeFrame) {
+    try {
+        const results = await receiveAccounts(accounts, (block) => {emit({event: 'received', ...block})}, concurrency)
+        const data = {}
+
+        for (const result of results) {data[result.address] = receiveResponse(result)}
+        console.log(`>> received ${results.reduce((sum, result) => sum + result.received.length, 0)} blocks`)
+        return response(0, 'receive success', data)
+    } catch (error) {return failure(error)}
+}
+
+
+// Response of one account received by receiveAccounts()
+function receiveResponse(result) {
+    const data = {address: result.address, unreceived: result.unreceived, success: result.received, error: result.errors}
+
+    if (!result.complete) {
+        return response(1, result.errors[result.errors.length - 1] || 'receive failed', data)
+    }
+    if (!result.unreceived) {
+        return response(1, 'No pending transactions', data, 'no_pending')
+    }
+    return response(0, `${result.received.length} blocks received success`, data)
+}
+
+
+// Health, latency and counters of the VITE nodes pool
+export async function nodes() {
+    try {
+        let stats = await nodeStats()
+        if (!stats) {return response(1, 'nodes pool is not configured', null, 'invalid')}
+        return response(0, 'nodes success', stats)
+    } catch (error) {return failure(error)}
+}
+
+
+// Stream new unreceived blocks of the addresses as event frames:
+// {event: 'connected'} once subscriptions are ready, then {event: 'unreceived', address, hash}
+export async function subscribe(addresses) {
+    try {
+        const subscription = await subscribeUnreceived(addresses.map(String), (address, hash) => {
+            writeFrame({event: 'unreceived', address: address, hash: hash})
+        })
+        writeFrame({event: 'connected'})
+
+        await subscription.closed
+        return response(1, 'connection closed')
+    } catch (error) {return failure(error)}
+}
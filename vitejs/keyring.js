@@ -0,0 +1,94 @@
+import crypto from 'crypto';
+import vitejs_pkg from '@vite/vitejs';
+
+const { wallet } = vitejs_pkg;
+
+
+// Max number of cached wallets (mnemonics) and derived addresses
+export const KEYRING_SIZE = parseInt(process.env.VITE_KEYRING_SIZE) || 1000
+
+
+/*
+Keyring caching @vitejs wallets and derived addresses.
+
+wallet.getWallet(mnemonics) runs expensive BIP39 seed derivation (PBKDF2),
+with keyring it runs once per mnemonics, every (mnemonics, address_id) is
+derived once. Entries are kept in LRU maps keyed by mnemonics hash and
+wiped when evicted (buffers are zeroed, references to keys are dropped).
+Keyring lives as long as the process, so worker.js keeps it between calls.
+One-shot script (api_handler.js) starts with empty keyring: without worker keys
+are derived again by every call, only addresses are cached by Python (src/keyring.py).
+*/
+
+
+const wallets = new Map()
+const keys = new Map()
+
+
+// Hash of mnemonics used as a key, so mnemonics are not kept as map keys
+function digest(mnemonics) {
+    return crypto.createHash('sha256').update(mnemonics).digest('hex')
+}
+
+
+// Drop references to secrets and zero buffers of evicted entry
+function wipe(entry) {
+    for (const name of Object.keys(entry)) {
+        if (Buffer.isBuffer(entry[name]) || entry[name] instanceof Uint8Array) {entry[name].fill(0)}
+        entry[name] = null
+    }
+}
+
+
+// Get entry and mark it as recently used, evict the oldest ones when map is full
+function lru(map, key, create) {
+    let entry = map.get(key)
+
+    if (entry) {
+        map.delete(key)
+    } else {
+        entry = create()
+    }
+    map.set(key, entry)
+
+    while (map.size > KEYRING_SIZE) {
+        const [oldestKey, oldest] = map.entries().next().value
+        map.delete(oldestKey)
+        wipe(oldest)
+    }
+    return entry
+}
+
+
+// Get @vitejs wallet instance from mnemonics (seed derivation runs once per mnemonics)
+export function getWallet(mnemonics) {
+    return lru(wallets, digest(mnemonics), () => wallet.getWallet(mnemonics))
+}
+
+
+// Derive {address, privateKey} for mnemonics and address_id once
+export function deriveKey(mnemonics, address_id=0) {
+    const walletKey = digest(mnemonics)
+
+    return lru(keys, `${walletKey}:${address_id}`, () => {
+        const {address, privateKey} = getWallet(mnemonics).deriveAddress(address_id)
+        return {address: address, privateKey: privateKey}
+    })
+}
+
+
+// Derive many addresses of the mnemonics (HD sub-accounts)
+export function deriveAddresses(mnemonics, address_ids) {
+    return address_ids.map((address_id) => {
+        return {address_id: address_id, address: deriveKey(mnemonics, address_id).address}
+    })
+}
+
+
+// Remove all entries from keyring
+export function clearKeyring() {
+    for (const map of [wallets, keys]) {
+        for (const entry of map.values()) {wipe(entry)}
+        map.clear()
+    }
+}
@@ -0,0 +1,293 @@
+import fs from 'fs';
+
+import {log} from './tools.js'
+
+
+/*
+POOL OF VITE NODES
+
+Every call is routed to the fastest healthy node. Nodes are probed with
+a cheap RPC call (once before the first call and every probeInterval in
+long-lived worker), latency is tracked per node (EWMA and last samples).
+
+- circuit breaker: node failing failureThreshold times in a row (connection
+  errors, timeouts and JSON-RPC server errors) is not used
+  for cooldown ms, after that one call (or probe) decides if it's back
+- failover: failed read is sent once more to the next node
+- hedged reads (optional): when the node doesn't answer within its p95
+  latency, the same read is sent to the next node and the first answer wins
+
+Writes (sendRawTransaction, PoW) are sent to one node only.
+
+Nodes are read from VITE_NODES env variable (comma separated http(s)://
+and ws(s):// urls) or from JSON file in VITE_NODES_FILE:
+{"nodes": [<url>, ...], "hedge": true, "probe_interval": 10000,
+ "failure_threshold": 3, "cooldown": 30000}
+VITE_HEDGE=1 turns on hedged reads.
+*/
+
+
+// Not safe or too expensive to send twice
+const WRITE_METHODS = new Set(['ledger_sendRawTransaction', 'util_getPoWNonce'])
+
+// Cheap call used to check node health and latency
+const PROBE_METHOD = 'ledger_getSnapshotChainHeight'
+
+// Number of last latency samples kept per node (for p95)
+const SAMPLES = 50
+
+
+// Read pool configuration from env variables, null when pool is not configured
+export function poolConfig() {
+    let config = null
+
+    if (process.env.VITE_NODES_FILE) {
+        config = JSON.parse(fs.readFileSync(process.env.VITE_NODES_FILE, 'utf-8'))
+    } else if (process.env.VITE_NODES) {
+        config = {nodes: process.env.VITE_NODES.split(',').map((url) => url.trim()).filter(Boolean)}
+    }
+
+    if (config && process.env.VITE_HEDGE) {config.hedge = process.env.VITE_HEDGE !== '0'}
+    return config
+}
+
+
+export function nodeType(url) {
+    return url.startsWith('ws') ? 'ws' : 'http'
+}
+
+
+// JSON-RPC error of the node itself (internal or server error, not invalid request) in single or batch response
+function nodeError(result) {
+    const responses = Array.isArray(result) ? result : [result]
+    const failed = responses.find((response) => {
+        const code = response && response.error && response.error.code
+        return code === -32603 || (code <= -32000 && code >= -32099)
+    })
+    return failed ? failed.error : null
+}
+
+
+// Reject promise after ms
+function withDeadline(promise, ms, message) {
+    let timer
+    const deadline = new Promise((_, reject) => {timer = setTimeout(reject, ms, new Error(message))})
+    return Promise.race([promise, deadline]).finally(() => clearTimeout(timer))
+}
+
+
+class Node {
+    constructor(url) {
+        this.url = url
+        this.type = nodeType(url)
+        this.service = null
+        this.ready = null
+        this.latency = null
+        this.samples = []
+        this.failures = 0
+        this.state = 'closed'
+        this.openUntil = 0
+        this.calls = 0
+        this.errors = 0
+    }
+
+    p95() {
+        if (this.samples.length < 5) {return null}
+        const sorted = [...this.samples].sort((a, b) => a - b)
+        return sorted[Math.floor(sorted.length * 0.95)]
+    }
+}
+
+
+export class NodePool {
+    // createService(url, timeout) -> {service, ready}, service has request(method, params) and batch(requests)
+    // resolving with JSON-RPC responses, ready is promise resolved when service can be used
+    constructor(urls, createService, {hedge=false, timeout=5000, probeInterval=10000, failureThreshold=3,
+                                      cooldown=30000, hedgeDelay=500} = {}) {
+        if (!urls.length) {throw new Error('empty list of VITE nodes')}
+
+        this.nodes = urls.map((url) => new Node(url))
+        this.createService = createService
+        this.hedge = hedge
+        this.timeout = timeout
+        this.probeInterval = probeInterval
+        this.failureThreshold = failureThreshold
+        this.cooldown = cooldown
+        this.hedgeDelay = hedgeDelay
+        this.hedged = 0
+        this.failovers = 0
+        this.timer = null
+        this.first = null
+    }
+
+    // Resolve after first node answered the probe (or all of them failed)
+    ready() {
+        if (!this.first) {
+            const probes = this.nodes.map((node) => this.probeNode(node))
+            this.first = Promise.any(probes.map((probe) => probe.then((ok) => ok || Promise.reject())))
+                .catch(() => Promise.allSettled(probes))
+        }
+        return this.first
+    }
+
+    // Probe nodes periodically, for long-lived process
+    start() {
+        if (this.timer) {return}
+        this.timer = setInterval(() => {this.probe()}, this.probeInterval)
+        this.timer.unref()
+    }
+
+    stop() {
+        clearInterval(this.timer)
+        this.timer = null
+    }
+
+    probe() {
+        return Promise.all(this.nodes.map((node) => this.probeNode(node)))
+    }
+
+    async probeNode(node) {
+        if (node.state === 'open' && Date.now() < node.openUntil) {return false}
+
+        try {
+            await this.call(node, (service) => service.request(PROBE_METHOD, []))
+            return true
+        } catch (e) {return false}
+    }
+
+    // Nodes which can be used now, fastest first, not measured ones after them
+    available() {
+        const now = Date.now()
+
+        for (const node of this.nodes) {
+            if (node.state === 'open' && now >= node.openUntil) {node.state = 'half-open'}
+        }
+        return this.nodes
+            .filter((node) => node.state !== 'open')
+            .sort((a, b) => (a.latency ?? Infinity) - (b.latency ?? Infinity))
+    }
+
+    // Fastest healthy node of the type (i.e. websocket for subscriptions)
+    async best(type) {
+        await this.ready()
+        const nodes = this.available().filter((node) => node.type === type)
+        return nodes.length ? nodes[0].url : null
+    }
+
+    // Node the writes are sent to now (see send()), null when no node is healthy
+    async writer() {
+        await this.ready()
+        const nodes = this.available()
+        return nodes.length ? nodes[0].url : null
+    }
+
+    connect(node) {
+        const {service, ready} = this.createService(node.url, this.timeout)
+        node.service = service
+
+        // Connection failed, open new one next time
+        node.ready = ready.catch((error) => {
+            if (node.service === service) {node.service = null}
+            throw error
+        })
+    }
+
+    async call(node, fn) {
+        const started = Date.now()
+        node.calls += 1
+
+        try {
+            if (!node.service) {this.connect(node)}
+            await withDeadline(node.ready, this.timeout, `connection timeout ${node.url}`)
+
+            const result = await withDeadline(fn(node.service), this.timeout, `request timeout ${node.url}`)
+            const error = nodeError(result)
+            if (error) {throw new Error(`${error.message} (${node.url})`)}
+
+            this.success(node, Date.now() - started)
+            return result
+
+        } catch (error) {
+            this.failure(node, error)
+            throw error
+        }
+    }
+
+    success(node, ms) {
+        node.latency = node.latency === null ? ms : 0.8 * node.latency + 0.2 * ms
+        node.samples.push(ms)
+        if (node.samples.length > SAMPLES) {node.samples.shift()}
+
+        if (node.state !== 'closed') {log(`VITE node ${node.url} is back`)}
+        node.state = 'closed'
+        node.failures = 0
+    }
+
+    failure(node, error) {
+        node.errors += 1
+        node.failures += 1
+
+        if (node.state === 'half-open' || node.failures >= this.failureThreshold) {
+            if (node.state !== 'open') {log(`VITE node ${node.url} is down: ${error.message || error}`)}
+            node.state = 'open'
+            node.openUntil = Date.now() + this.cooldown
+
+            // Drop the connection, new one is opened when node is used again
+            if (node.service && node.service.disconnect) {node.service.disconnect()}
+            node.service = null
+        }
+    }
+
+    // Send fn(service) to the nodes, write = true sends it to one node only
+    async send(fn, write=false) {
+        await this.ready()
+        const nodes = this.available()
+
+        if (!nodes.length) {throw new Error('no healthy VITE node')}
+        if (write || nodes.length === 1) {return this.call(nodes[0], fn)}
+        if (this.hedge) {return this.hedgedSend(nodes, fn)}
+
+        try {
+            return await this.call(nodes[0], fn)
+        } catch (error) {
+            this.failovers += 1
+            return this.call(nodes[1], fn)
+        }
+    }
+
+    async hedgedSend([first, second], fn) {
+        const primary = this.call(first, fn)
+        let timer
+        const delay = new Promise((resolve) => {timer = setTimeout(resolve, first.p95() ?? this.hedgeDelay, 'slow')})
+        const outcome = await Promise.race([primary.then(() => 'done', () => 'failed'), delay])
+        clearTimeout(timer)
+
+        if (outcome === 'done') {return primary}
+
+        // Slow or failed primary, the first answer wins
+        if (outcome === 'slow') {this.hedged += 1} else {this.failovers += 1}
+        return Promise.any([primary, this.call(second, fn)]).catch((e) => {throw e.errors[e.errors.length - 1]})
+    }
+
+    request(methodName, params) {
+        return this.send((service) => service.request(methodName, params), WRITE_METHODS.has(methodName))
+    }
+
+    batch(requests) {
+        const write = requests.some((request) => WRITE_METHODS.has(request.methodName))
+        return this.send((service) => service.batch(requests), write)
+    }
+
+    stats() {
+        return {
+            hedged: this.hedged,
+            failovers: this.failovers,
+            nodes: this.nodes.map((node) => {
+                return {
+                    url: node.url, state: node.state, latency: node.latency && Math.round(node.latency),
+                    p95: node.p95(), calls: node.calls, errors: node.errors
+                }
+            })
+        }
+    }
+}
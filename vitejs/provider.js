@@ -2,32 +2,185 @@ import http_pkg from "@vite/vitejs-http";
 import vitejs_pkg from '@vite/vitejs';
 import ws from "@vite/vitejs-ws";
 
+import {log} from './tools.js'
+import {now, timed, addTiming} from './timings.js'
+import {NodePool, poolConfig, nodeType} from './pool.js'
+
 const { WS_RPC } = ws;
 const { HTTP_RPC } = http_pkg;
 const { ViteAPI } = vitejs_pkg;
 
 
-export function connect(method, timeout=5000) {
+// VITE node addresses, can be changed with VITE_HTTP_NODE and VITE_WS_NODE env variables
+export const HTTP_NODE = process.env.VITE_HTTP_NODE || "https://node.vite.net/gvite/"
+export const WS_NODE = process.env.VITE_WS_NODE || "wss://node-vite.thomiz.dev/ws"
+
+
+// Many VITE nodes, set with VITE_NODES or VITE_NODES_FILE env variables (see pool.js)
+const config = poolConfig()
+let pool = null
+
+
+// Providers reused across calls when keep-alive is enabled (worker mode)
+const shared = new Map()
+let keepAlive = false
+
+
+// Reuse one provider per connection method instead of creating new one on every call
+export function setKeepAlive(flag) {
+    keepAlive = flag
+    if (!flag) {shared.clear()}
+    if (pool) {flag ? pool.start() : pool.stop()}
+}
+
+
+// Open JSON-RPC connection to one node of the pool
+function createService(url, timeout) {
+    if (nodeType(url) === 'http') {
+        return {service: new HTTP_RPC(url, timeout), ready: Promise.resolve()}
+    }
+
+    const service = new WS_RPC(url, timeout)
+    const ready = new Promise((resolve, reject) => {
+        service.on('connect', resolve)
+        service.on('error', reject)
+        service.on('close', reject)
+    })
+    return {service, ready}
+}
+
+
+function getPool() {
+    if (!pool) {
+        pool = new NodePool(config.nodes, createService, {
+            hedge: config.hedge,
+            probeInterval: config.probe_interval,
+            failureThreshold: config.failure_threshold,
+            cooldown: config.cooldown
+        })
+        if (keepAlive) {pool.start()}
+    }
+    return pool
+}
+
+
+// Count time of provider calls as rpc phase of the current command (see timings.js),
+// time waiting for the connection is counted as connect phase, returns function to call once connected
+function instrument(provider, opened) {
+    let connectedAt = 0
+    const {request, batch} = provider
+
+    provider.request = (...args) => timed('rpc', request.apply(provider, args), () => connectedAt)
+    provider.batch = (...args) => timed('rpc', batch.apply(provider, args), () => connectedAt)
+
+    return () => {
+        if (connectedAt) {return}
+        connectedAt = now()
+        addTiming('connect', connectedAt - opened)
+    }
+}
+
+
+// Provider routing calls through the pool of nodes
+function connectPool(method, timeout, onConnect) {
+    if (onConnect) {
+        // Subscriptions need websocket connection to one node, use the fastest one
+        getPool().best('ws').then((url) => {
+            const provider = new ViteAPI(new WS_RPC(url || WS_NODE, timeout), () => {onConnect(provider)})
+        })
+        return null
+    }
+
+    if (keepAlive && shared.has('pool')) {
+        return shared.get('pool')
+    }
+
+    const service = {
+        type: 'http',
+        connectStatus: true,
+        request: (methodName, params) => getPool().request(methodName, params),
+        batch: (requests) => getPool().batch(requests),
+    }
+    const provider = new ViteAPI(service, () => {})
+
+    // Connections to pool nodes are opened on demand, time of opening them is part of rpc phase
+    instrument(provider, now())()
+
+    if (keepAlive) {shared.set('pool', provider)}
+    return provider
+}
+
+
+// Latency, state and counters of the pool nodes, null when pool is not used
+export async function nodeStats() {
+    if (!config) {return null}
+    await getPool().ready()
+    return getPool().stats()
+}
+
+
+export function connect(method, timeout=5000, onConnect=null) {
+    if (config) {
+        return connectPool(method, timeout, onConnect)
+    }
+
+    if (keepAlive && shared.has(method)) {
+        return shared.get(method)
+    }
+
+    const opened = now()
     let service
+    let connected = () => {}
 
     if (method === 'http') {
-        service = new HTTP_RPC("https://node.vite.net/gvite/", timeout);
+        service = new HTTP_RPC(HTTP_NODE, timeout);
     } else {
-        service = new WS_RPC("wss://node-vite.thomiz.dev/ws", timeout);
+        service = new WS_RPC(WS_NODE, timeout);
     }
 
     let provider = new ViteAPI(service, () => {
+        connected()
+
         if (method !== 'http') {
             if (!provider.isConnected) {
                 log(`Connected to VITE NODE: ${provider.isConnected}`)
             }
         }
+        if (onConnect) {onConnect(provider)}
     });
 
+    connected = instrument(provider, opened)
+
     if (method === 'http') {
+        connected()
+
         if (!provider.isConnected) {
             log(`Connected to VITE NODE: ${provider.isConnected}`)
         }
     }
+
+    if (keepAlive) {
+        // Drop dead connection, next call will open a new one
+        if (method !== 'http') {
+            service.on('close', () => {shared.delete(method)})
+            service.on('error', () => {shared.delete(method)})
+        }
+        shared.set(method, provider)
+    }
     return provider
 }
+
+
+// Node serving writes of the connection method, i.e. to bound concurrency per node,
+// with pool it's the node the pool sends writes to now, so it changes after failover
+export async function nodeName(method) {
+    if (config) {return await getPool().writer() ?? 'pool'}
+    return method === 'http' ? HTTP_NODE : WS_NODE
+}
+
+
+// Call back when websocket connection of the provider is closed or broken
+export function onDisconnect(provider, callback) {
+    provider._provider.on('close', callback)
+    provider._provider.on('error', callback)
+}
@@ -0,0 +1,46 @@
+import { AsyncLocalStorage } from 'async_hooks';
+import { performance } from 'perf_hooks';
+
+
+/*
+PHASE TIMINGS OF A COMMAND CALL (ms), sent with the response in 'timings' field:
+- startup    NodeJS process start until the command runs (0 in worker.js)
+- connect    opening websocket connection to VITE node (only when opened by the call)
+- rpc        waiting for VITE node responses (sum of all requests of the call)
+- serialize  JSON serialization of the response
+Timings are kept per call (AsyncLocalStorage), so concurrent worker calls don't mix.
+*/
+
+
+const storage = new AsyncLocalStorage()
+
+
+export function now() {
+    return performance.now()
+}
+
+
+// Run fn() with new timings, resolve with [result, timings]
+export function withTimings(fn, startup=0) {
+    const timings = {startup: startup, connect: 0, rpc: 0, serialize: 0}
+    return storage.run(timings, async () => [await fn(), timings])
+}
+
+
+// Add ms to the phase of the current call
+export function addTiming(phase, ms) {
+    const timings = storage.getStore()
+    if (timings) {timings[phase] += ms}
+}
+
+
+// Measure how long the promise takes, time before since (i.e. waiting for connection) is not counted
+export async function timed(phase, promise, since=() => 0) {
+    const started = now()
+
+    try {
+        return await promise
+    } finally {
+        addTiming(phase, now() - Math.max(started, since()))
+    }
+}
@@ -1,6 +1,15 @@
+import fs from 'fs';
+
+import { now } from './timings.js'
+
 export const DEBUG = false
 export const method = 'wss'
 
+// File descriptor for payload frames, set by the python adapter in VITE_PAYLOAD_FD env variable.
+// When it is stdout (fd 1) every frame is prefixed with record separator to tell it apart from logs.
+const PAYLOAD_FD = parseInt(process.env.VITE_PAYLOAD_FD) || null
+const FRAME_SEPARATOR = '\x1e'
+
 // --- Wrap function with timer and return either
 // --- success function response before timout or null
 export async function withTimeout(func, args = [], timeout = 2000) {
@@ -21,24 +30,115 @@ export async function withTimeout(func, args = [], timeout = 2000) {
 }
 
 
-// Manager for receiving VITE account blocks
-export const ReceiveProcess = class {
-    constructor() {
-        this.status = 'working';
-        this.error = 0
-        this.msg = null;
-        this.data = null;
-        this.unreceived = 0
+// Bound number of async tasks running at once, waiting tasks start in FIFO order
+export class Limit {
+    constructor(size) {
+        this.size = size
+        this.active = 0
+        this.waiting = []
+    }
+
+    async run(fn) {
+        if (this.active < this.size) {
+            this.active++
+        } else {
+            // Slot is handed over by release(), active count stays the same
+            await new Promise((resolve) => {this.waiting.push(resolve)})
+        }
+
+        try {
+            return await fn()
+        } finally {
+            const next = this.waiting.shift()
+            next ? next() : this.active--
+        }
+    }
+}
+
+
+// Build the response object returned by every command,
+// failed response has error code (python adapter re-tries calls by it, see src/errors.py)
+export function response(error, msg, data=null, code=null) {
+    const result = {error: error, msg: `${msg}`, data: data}
+    if (error) {result.code = code || errorCode(msg)}
+    return result
+}
+
+
+// Message of error thrown by @vitejs (JSON-RPC error response), node.js or this package
+export function errorMessage(error) {
+    if (error && error.error && error.error.message) {return error.error.message}
+    return error && error.message ? error.message : `${error}`
+}
+
+
+// Code of the error: timeout | connection | node | no_pending | unknown
+export function errorCode(error) {
+    const message = errorMessage(error).toLowerCase()
+
+    if (message.includes('timeout')) {return 'timeout'}
+    if (message.includes('no pending')) {return 'no_pending'}
+    if (/connect|socket|network|econn|enotfound|no healthy/.test(message)) {return 'connection'}
+    if (error && error.error) {return 'node'}
+    return 'unknown'
+}
+
+
+// Failed response from the thrown error
+export function failure(error, data=null) {
+    return response(1, errorMessage(error), data, errorCode(error))
+}
+
+
+// Write single JSON frame (one line) to the payload channel
+export function writeFrame(frame) {
+    if (!PAYLOAD_FD) {
+        console.log(JSON.stringify(frame))
+        return
+    }
+
+    const prefix = PAYLOAD_FD === 1 ? FRAME_SEPARATOR : ''
+    const buffer = Buffer.from(prefix + serialize(frame) + '\n')
+    let written = 0
+
+    while (written < buffer.length) {
+        try {
+            written += fs.writeSync(PAYLOAD_FD, buffer, written)
+        } catch (error) {
+            if (error.code !== 'EAGAIN') {throw error}
+        }
+    }
+}
+
+
+// Frame as JSON string, frame timings (if any) get time spent on serialization
+export function serialize(frame) {
+    const {timings, ...rest} = frame
+    if (!timings) {return JSON.stringify(frame)}
+
+    const started = now()
+    const json = JSON.stringify(rest)
+    timings.serialize += now() - started
+
+    return `${json.slice(0, -1)},"timings":${JSON.stringify(timings)}}`
+}
+
+
+// Send command result to the payload channel (or print nested objects to stdout) and exit process
+export function exitWith(result) {
+    if (PAYLOAD_FD) {
+        writeFrame(result)
+    } else {
+        console.log(JSON.stringify(result, null, 2));
     }
+    process.exit(0);
 }
 
 
-// Print nested objects to stdout and exit process
+// Send response to the payload channel (or print nested objects to stdout) and exit process
 export function  logAndExit(error, msg, data=null) {
     if (!DEBUG) {
-        console.log(JSON.stringify(
-            {error: error, msg: `${msg}`, data: data}, null, 2));
-        process.exit(0);
+        exitWith(response(error, msg, data))
     } else {
         console.log(msg)
     }
@@ -1,14 +1,30 @@
 import vitejs_pkg from '@vite/vitejs';
-import {connect} from './provider.js'
-import {log, method, withTimeout} from './tools.js'
+import {connect, onDisconnect, nodeName} from './provider.js'
+import {deriveKey, deriveAddresses} from './keyring.js'
+import {method, response, errorMessage, failure, sleep, Limit} from './tools.js'
 
 const { utils, accountBlock, wallet } = vitejs_pkg;
-const { ReceiveAccountBlockTask } = accountBlock;
+
+// Receive engine: max receive blocks sent at once per VITE node, unreceived blocks fetched at once,
+// failed attempts in a row per account and backoff range (ms), see receiveAccounts()
+const RECEIVE_CONCURRENCY = parseInt(process.env.VITE_RECEIVE_CONCURRENCY) || 8
+const RECEIVE_PAGE_SIZE = 50
+const RECEIVE_RETRIES = 5
+const RECEIVE_MIN_DELAY = 250
+const RECEIVE_MAX_DELAY = 4000
+
+// Send batch: ms sent blocks are polled (every SEND_CONFIRM_POLL ms) until snapshot confirmed, see sendBatch()
+const SEND_CONFIRM_TIMEOUT = parseInt(process.env.VITE_SEND_CONFIRM_TIMEOUT) || 10000
+const SEND_CONFIRM_POLL = 500
+
+const receiveLimits = new Map()
 
 export {
-    createWallet, getTransactions,
-    receiveTransactions, sendTransaction,
-    getBalance
+    createWallet, createWallets, getTransactions,
+    receiveAccounts, sendTransaction,
+    getBalance, getBalances,
+    subscribeUnreceived, deriveAddresses,
+    sendBatch, PowRequired
 }
 
 // --- CREATE WALLET ---\\
@@ -20,6 +36,33 @@ function createWallet() {
 }
 
 
+// --- CREATE MANY WALLETS --- \\
+// onWallet({mnemonics, address, addresses: [{address_id, address}]}) is called for every new wallet,
+// with verify addresses are derived once more from the mnemonics alone (as getWallet() does
+// when the wallet is used later) and creation fails when they don't match
+function createWallets(count, addressCount=1, verify=true, onWallet) {
+    for (let i = 0; i < count; i++) {
+        const newWallet = wallet.createWallet()
+        const addresses = []
+
+        for (let address_id = 0; address_id < addressCount; address_id++) {
+            addresses.push({address_id: address_id, address: newWallet.deriveAddress(address_id).address})
+        }
+
+        if (verify) {
+            const restored = wallet.getWallet(newWallet.mnemonics)
+
+            for (const {address_id, address} of addresses) {
+                if (restored.deriveAddress(address_id).address !== address) {
+                    throw `address ${address_id} of new wallet doesn't match its mnemonics`
+                }
+            }
+        }
+        onWallet({mnemonics: newWallet.mnemonics, address: addresses[0].address, addresses: addresses})
+    }
+}
+
+
 // --- GET ADDRESS BALANCE --- \\
 // :return: Wallet balance and unreceived blocks
 async function getBalance(address, mnemonics, address_id=0, timeout=1000) {
@@ -35,13 +78,64 @@ async function getBalance(address, mnemonics, address_id=0, timeout=1000) {
 
     // If mnemonics provided, get Wallet from network and use its address
     else if (mnemonics) {
-        let wallet_ = wallet.getWallet(mnemonics).deriveAddress(address_id)
+        let wallet_ = deriveKey(mnemonics, address_id)
         // console.log(">> getting balance for " + wallet_.address)
         return provider.getBalanceInfo(wallet_.address)
     }
 }
 
 
+// --- GET MANY ADDRESSES BALANCES --- \\
+// :return: {address: {error, msg, data: {balance, unreceived}}} for every address
+async function getBalances(addresses, timeout=1000) {
+    const provider = connect(method, timeout)
+    // Handle error with VITE node
+    if (!provider) { throw "ERROR Connection to VITE NODE" }
+
+    // Same calls as provider.getBalanceInfo(), two per address, all sent in one JSON-RPC batch
+    let requests = []
+    for (const address of addresses) {
+        requests.push({type: 'request', methodName: 'ledger_getAccountInfoByAddress', params: [address]})
+        requests.push({type: 'request', methodName: 'ledger_getUnreceivedBlocksInfoByAddress', params: [address]})
+    }
+    const results = await provider.batch(requests)
+
+    let balances = {}
+    addresses.forEach((address, i) => {
+        const [info, unreceived] = [results[2 * i], results[2 * i + 1]]
+        const error = !info || !unreceived ? {message: 'no response'} : info.error || unreceived.error
+
+        if (error) {
+            balances[address] = response(1, error.message || error, null, info && unreceived ? 'node' : 'connection')
+        } else {
+            balances[address] = response(0, 'balance success', {balance: info.result, unreceived: unreceived.result})
+        }
+    })
+    return balances
+}
+
+
+// --- SUBSCRIBE TO NEW UNRECEIVED BLOCKS --- \\
+// :return: promise resolved when websocket connection is closed,
+// onBlock(address, hash) is called for every new unreceived block of the addresses
+async function subscribeUnreceived(addresses, onBlock, timeout=5000) {
+    // Subscriptions are available only over websocket
+    const provider = await new Promise((resolve) => {connect('wss', timeout, resolve)})
+    const closed = new Promise((resolve) => {onDisconnect(provider, resolve)})
+
+    for (const address of addresses) {
+        const event = await provider.subscribe('newUnreceivedBlocksByAddress', address)
+
+        event.on((results) => {
+            for (const block of results) {
+                if (!block.received && !block.removed) {onBlock(address, block.hash)}
+            }
+        })
+    }
+    return {closed: closed}
+}
+
+
 // --- GET TRANSACTION LIST --- \\
 // :return: transactions array
 async function getTransactions(address, pageIndex, pageSize) {
@@ -54,99 +148,127 @@ async function getTransactions(address, pageIndex, pageSize) {
 }
 
 
-// --- UPDATE BALANCE / RECEIVE TRANSACTIONS --- \\
-// :return: None
-async function receiveTransactions(mnemonics, address_id, callback={}, timeout) {
-    let unreceivedBlocks = []
-    let successBlocks = []
-    let errorBlocks = []
-
-    // Set provider (VITE node handler)
+// --- RECEIVE TRANSACTIONS OF MANY ACCOUNTS --- \\
+// Unreceived blocks of every account are received one after another (receive blocks are chained,
+// previous block is tracked locally), accounts are received concurrently and number of receive
+// blocks being sent at once is bounded per VITE node. Cadence adapts: next page of unreceived
+// blocks is fetched right after the previous one is received, only node errors and blocks the node
+// still lists after receiving them are waited for (backoff from RECEIVE_MIN_DELAY to RECEIVE_MAX_DELAY ms).
+// onBlock({address, hash, height, sendBlockHash}) is called as soon as the node accepts a receive block.
+// :return: [{address, address_id, unreceived, received: [hash], errors: [message], complete}] in order of accounts
+async function receiveAccounts(accounts, onBlock, concurrency=RECEIVE_CONCURRENCY, timeout=5000) {
     const provider = connect(method, timeout)
 
     // Handle error with VITE node
     if (!provider) { throw "ERROR Connection to VITE NODE" }
 
-    // Get wallet instance form mnemonics
-    const wallet_ = wallet.getWallet(mnemonics);
-    const {privateKey, address} = wallet_.deriveAddress(address_id);
+    return Promise.all(accounts.map((account) => receiveAccount(provider, concurrency, account, onBlock)))
+}
 
-    // Create new ReceiveTask
-    const ReceiveTask = new ReceiveAccountBlockTask({
-        address: address,
-        privateKey: privateKey,
-        provider: provider,
-    });
 
-    // Check for unreceived transactions for account
-    callback.msg = 'checking balance..'
-    log(`Checking balance for ${address}`)
-    const {balance, unreceived} = await withTimeout(getBalance, [address], 2000)
-
-    if (balance) {  // means if addressBalance call was success
-        // Parse number of unreceivedTransactions to int
-        callback.unreceived = parseInt(unreceived.blockCount)
-
-        // Initialize ReceiveTransaction subscription task if needed
-        if (callback.unreceived) {
-            log(`Start Receiving ${callback.unreceived} Transactions`)
-            callback.msg = 'start receiving task..'
-            ReceiveTask.start({
-                checkTime: 2545,
-                transctionNumber: callback.unreceived
-            });
-        } else {
-            callback.msg = `no pending transactions`
-            callback.error = 1
-            callback.status = "success"
-            throw Error("No pending transactions")
+// Limit of receive blocks sent at once to the node serving the next write (picked per block,
+// with pool of nodes it follows failover), limits are shared by all calls of the process (worker),
+// the last call sets their size
+async function receiveLimit(concurrency) {
+    const node = await nodeName(method)
+    if (!receiveLimits.has(node)) {receiveLimits.set(node, new Limit(concurrency))}
+
+    const limit = receiveLimits.get(node)
+    limit.size = concurrency
+    return limit
+}
+
+
+async function receiveAccount(provider, concurrency, account, onBlock) {
+    const address_id = Number(account.address_id ?? 0)
+    const {privateKey, address} = deriveKey(account.mnemonics, address_id)
+    const result = {address: address, address_id: address_id, unreceived: 0, received: [], errors: [], complete: false}
+    const found = new Set()
+    const received = new Set()
+    let previous = undefined
+    let failures = 0
+    let stale = 0
+    let delay = 0
+
+    while (failures <= RECEIVE_RETRIES && stale <= RECEIVE_RETRIES) {
+        if (delay) {await sleep(delay)}
+
+        let page
+        try {
+            page = await provider.request('ledger_getUnreceivedBlocksByAddress', address, 0, RECEIVE_PAGE_SIZE) || []
+        } catch (error) {
+            result.errors.push(errorMessage(error))
+            delay = receiveBackoff(++failures)
+            continue
         }
 
-        // Handle success callback
-        ReceiveTask.onSuccess((result) => {
-            log({success: successBlocks.length, error: errorBlocks.length})
-
-            if (result.message.includes("Don't have")) {
-                // Handle last unreceived transaction and finish task
-                let data = {unreceived: callback.unreceived, success: successBlocks, error: errorBlocks}
-                callback.msg = callback.unreceived + " blocks received success"
-                callback.data = data
-                callback.status = 'success'
-                ReceiveTask.stop();
-                // log(data)
-
-            } else {
-                // Update callback status and keep receiving
-                // callback.msg = "working on transaction " + (unreceivedBlocks.length + 1)
-                //     + "/" + callback.unreceived + '..'
-                callback.msg = `${unreceivedBlocks.length + 1} / ${callback.unreceived} ${result.message}`
-                unreceivedBlocks.push(result.message)
-                successBlocks.push(result.message)
-            }
-        });
+        if (!page.length) {
+            result.complete = true
+            break
+        }
+
+        // Node may still list blocks received a moment ago, wait for it instead of receiving them twice
+        const blocks = page.filter((block) => !received.has(block.hash))
+        blocks.forEach((block) => {found.add(block.hash)})
+        result.unreceived = found.size
 
-        // Handle error responses
-        ReceiveTask.onError((error) => {
+        if (!blocks.length) {
+            delay = receiveBackoff(++stale)
+            continue
+        }
+        stale = 0
+        delay = 0
+
+        for (const sendBlock of blocks) {
             try {
-                errorBlocks.push(error.error.error.message)
-            } catch (e) {
-                errorBlocks.push(error.error.message)
+                const limit = await receiveLimit(concurrency)
+                const block = await limit.run(async () => {
+                    if (previous === undefined) {previous = await provider.request('ledger_getLatestAccountBlock', address)}
+                    return receiveBlock(provider, address, privateKey, sendBlock.hash, previous)
+                })
+
+                previous = {height: block.height, hash: block.hash}
+                received.add(sendBlock.hash)
+                result.received.push(block.hash)
+                failures = 0
+                onBlock({address: address, hash: block.hash, height: block.height, sendBlockHash: sendBlock.hash})
+            } catch (error) {
+                // Account chain state is unknown after failure, latest block is fetched again
+                previous = undefined
+                result.errors.push(errorMessage(error))
+                delay = receiveBackoff(++failures)
+                break
             }
-        });
-
-    } else {
-        // Handle custom timeout case
-        callback.msg = `connection timeout`
-        callback.error = 1
-        callback.status = "failed"
-        throw Error("Connection timeout")
+        }
     }
+    return result
+}
+
+
+// Sign and send receive block of the send block, previous is the latest account block (null for new account)
+async function receiveBlock(provider, address, privateKey, sendBlockHash, previous) {
+    const block = accountBlock.createAccountBlock('receive', {address: address, sendBlockHash: sendBlockHash})
+
+    block.setProvider(provider).setPrivateKey(privateKey)
+    block.setPreviousAccountBlock(previous ? {height: previous.height, hash: previous.hash} : null)
+
+    // Account without quota has to solve PoW also for receiving
+    await setPoW(provider, block, await getDifficulty(provider, block))
+    await block.sign().send()
+    return block
+}
+
+
+function receiveBackoff(attempt) {
+    return Math.min(RECEIVE_MAX_DELAY, RECEIVE_MIN_DELAY * 2 ** (attempt - 1))
 }
 
 
 // --- SEND TRANSACTION --- \\
+// pow: {mode: 'remote' | 'local', nonce, difficulty, previousHash}, with 'local' mode
+// PowRequired is thrown when nonce for current previousHash is not provided
 // :return: error or transaction data in JSON
-async function sendTransaction(mnemonics, address_id, toAddress, tokenId, amount, timeout=2000) {
+async function sendTransaction(mnemonics, address_id, toAddress, tokenId, amount, timeout=2000, pow={}) {
     // Connect to provider (VITE node handler)
     const provider = connect(method, timeout)
     console.log(">> sending " + (parseInt(amount) / 10**8 )+ " to: " + toAddress)
@@ -155,8 +277,7 @@ async function sendTransaction(mnemonics, address_id, toAddress, tokenId, amount
     if (!provider) { throw "ERROR Connection to VITE NODE" }
 
     // 1. Import wallet from mnemonic/seed phrase
-    const myWallet = wallet.getWallet(mnemonics);
-    const { privateKey, address } = myWallet.deriveAddress(address_id);
+    const { privateKey, address } = deriveKey(mnemonics, address_id);
 
     //2. Create accountBlock instance
     const {createAccountBlock} = accountBlock;
@@ -171,32 +292,196 @@ async function sendTransaction(mnemonics, address_id, toAddress, tokenId, amount
     sendBlock.setProvider(provider).setPrivateKey(privateKey);
 
     // 4. Autofill height and previousHash
-    await sendBlock.autoSetPreviousAccountBlock().catch(e => {throw e.message});
+    await sendBlock.autoSetPreviousAccountBlock();
 
-    // 5. Get difficulty for PoW Puzzle (when not enough quota)
+    // 5. Get difficulty for PoW Puzzle (when not enough quota) and solve it
+    const difficulty = await getDifficulty(provider, sendBlock)
+    await setPoW(provider, sendBlock, difficulty, pow)
+
+    // 6. Sign and send the AccountBlock
+    return sendBlock.sign().send()
+}
+
+
+// --- POW HELPERS --- \\
+// :return: PoW difficulty for the block, null when account has enough quota
+async function getDifficulty(provider, block) {
     const {difficulty} = await provider.request('ledger_getPoWDifficulty', {
-        address: sendBlock.address,
-        previousHash: sendBlock.previousHash,
-        blockType: sendBlock.blockType,
-        toAddress: sendBlock.toAddress,
-        data: sendBlock.data
-    }).catch(e => {throw e.error.message});
-
-    // If difficulty is null, it indicates the account has enough quota to
-    // send the transaction. There is no need to do PoW.
-    if (difficulty) {
+        address: block.address,
+        previousHash: block.previousHash,
+        blockType: block.blockType,
+        toAddress: block.toAddress,
+        data: block.data
+    });
+
+    return difficulty
+}
+
+// Thrown when PoW has to be solved by the caller (local mode), data is
+// {difficulty, hash, previousHash} needed to find and later apply the nonce
+class PowRequired extends Error {
+    constructor(data) {
+        super('pow required')
+        this.data = data
+    }
+}
+
+// If difficulty is null, it indicates the account has enough quota to
+// send the transaction. There is no need to do PoW.
+async function setPoW(provider, block, difficulty, pow={}) {
+    if (!difficulty) {return}
+
+    const getNonceHashBuffer = Buffer.from(block.originalAddress + block.previousHash, 'hex');
+    const getNonceHash = utils.blake2bHex(getNonceHashBuffer, null, 32);
+    let nonce = null
+
+    if (pow.mode === 'local') {
+        // Nonce solved by the caller is valid only for the same previous block and difficulty
+        if (!pow.nonce || `${pow.previousHash}` !== block.previousHash || `${pow.difficulty}` !== `${difficulty}`) {
+            throw new PowRequired({difficulty: difficulty, hash: getNonceHash, previousHash: block.previousHash})
+        }
+        nonce = `${pow.nonce}`
+    } else {
         // Call GVite-RPC API to calculate nonce from difficulty
-        const getNonceHashBuffer = Buffer.from(sendBlock.originalAddress + sendBlock.previousHash, 'hex');
-        const getNonceHash = utils.blake2bHex(getNonceHashBuffer, null, 32);
-        const nonce = await provider.request('util_getPoWNonce', difficulty, getNonceHash
-        ).catch(e => {throw e.error.message})
+        nonce = await provider.request('util_getPoWNonce', difficulty, getNonceHash)
+    }
+
+    block.setDifficulty(difficulty);
+    block.setNonce(nonce);
+}
+
+
+// --- SEND MANY TRANSACTIONS --- \\
+// Sign and send transfers from one account, height and previousHash are tracked locally,
+// quota (PoW difficulty) is checked once per batch and again only when account runs out of quota.
+// Steps are pipelined: next block is signed (and its PoW solved) while the previous one is being
+// broadcast, blocks are still broadcast one after another. Sent blocks are polled by hash until
+// snapshot confirmed or SEND_CONFIRM_TIMEOUT ms passed.
+// onResult(index, result) is called with result of every transfer as soon as it is known
+// (caller still knows what was sent when the batch is interrupted)
+// :return: list of {error, msg, data} for every transfer (in the same order)
+async function sendBatch(mnemonics, address_id, transfers, timeout=5000, onResult=() => {}) {
+    const provider = connect(method, timeout)
 
-        sendBlock.setDifficulty(difficulty);
-        sendBlock.setNonce(nonce);
+    // Handle error with VITE node
+    if (!provider) { throw "ERROR Connection to VITE NODE" }
+
+    const { privateKey, address } = deriveKey(mnemonics, address_id);
+    const {createAccountBlock} = accountBlock;
+
+    let difficulty = undefined
+    let results = []
+    const push = (result) => {
+        results.push(result)
+        onResult(results.length - 1, result)
     }
 
-    // 6. Sign and send the AccountBlock
-    return sendBlock.sign().send()
-        .then((result) => {return result})
-        .catch(e => {throw e.error.message});
+    // Signed block chained to the previous one, PoW is solved when account has no quota
+    const prepare = async (transfer, previous) => {
+        const block = createAccountBlock('send', {
+            address: address,
+            toAddress: transfer.to_address,
+            tokenId: transfer.token_id,
+            amount: String(transfer.amount)
+        })
+        block.setProvider(provider).setPrivateKey(privateKey);
+        block.setPreviousAccountBlock(previous ? {height: previous.height, hash: previous.hash} : null)
+
+        // Quota is checked for the first block only
+        if (difficulty === undefined) {difficulty = await getDifficulty(provider, block)}
+        const pow = Boolean(difficulty)
+        await setPoW(provider, block, difficulty)
+        return {block: block.sign(), pow: pow}
+    }
+
+    // Send signed block, :return: true when sent (block hash changes when PoW had to be added)
+    const broadcast = async ({block, pow}, transfer) => {
+        try {
+            try {
+                await block.send()
+            } catch (e) {
+                // Account ran out of quota in the middle of the batch, re-try once with PoW
+                if (pow || !errorMessage(e).toLowerCase().includes('quota')) {throw e}
+                difficulty = await getDifficulty(provider, block)
+                await setPoW(provider, block, difficulty)
+                await block.sign().send()
+            }
+
+            console.log(`>> sent ${results.length + 1} / ${transfers.length} ${block.hash}`)
+            push({error: 0, msg: 'transaction sent', data: {hash: block.hash, height: block.height, ...transfer}})
+            return true
+
+        } catch (e) {
+            push(failure(e))
+            return false
+        }
+    }
+
+    // 1. Latest account block, next ones are chained locally
+    let previous = await provider.request('ledger_getLatestAccountBlock', address)
+    let inFlight = null
+    let failed = false
+
+    for (const transfer of transfers) {
+        // Transfers after failed one would have wrong previousHash, don't send them
+        if (failed) {
+            push(response(1, 'not sent, previous transfer failed'))
+            continue
+        }
+
+        // 2. Block is signed (and PoW solved) while the previous one is being sent
+        let prepared = null
+        let error = null
+
+        try {
+            prepared = await prepare(transfer, previous)
+        } catch (e) {error = e}
+
+        if (inFlight && !await inFlight.sent) {
+            failed = true
+            push(response(1, 'not sent, previous transfer failed'))
+            continue
+        }
+
+        // Previous block was re-signed with PoW, chain this one to its new hash
+        if (prepared && inFlight && prepared.block.previousHash !== inFlight.block.hash) {
+            try {
+                prepared = await prepare(transfer, inFlight.block)
+            } catch (e) {error = e}
+        }
+
+        if (error) {
+            failed = true
+            push(failure(error))
+            continue
+        }
+
+        // 3. Blocks are sent one after another
+        inFlight = {block: prepared.block, sent: broadcast(prepared, transfer)}
+        previous = prepared.block
+    }
+
+    if (inFlight) {await inFlight.sent}
+
+    // 4. Poll sent blocks by hash (all requests in one batch) until confirmed or deadline
+    const sent = results.filter((result) => !result.error)
+    const deadline = Date.now() + SEND_CONFIRM_TIMEOUT
+    let pending = sent
+
+    while (pending.length) {
+        const blocks = await provider.batch(pending.map((result) => {
+            return {type: 'request', methodName: 'ledger_getAccountBlockByHash', params: [result.data.hash]}
+        })).catch(() => [])
+
+        pending.forEach((result, i) => {
+            const block = blocks[i] ? blocks[i].result : null
+            result.data.confirmations = block ? parseInt(block.confirmations ?? block.confirmedTimes ?? 0) || 0 : 0
+            result.data.confirmed = result.data.confirmations > 0
+        })
+        pending = pending.filter((result) => !result.data.confirmed)
+
+        if (!pending.length || Date.now() + SEND_CONFIRM_POLL > deadline) {break}
+        await sleep(SEND_CONFIRM_POLL)
+    }
+    return results
 }
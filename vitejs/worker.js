@@ -0,0 +1,64 @@
+import readline from 'readline';
+
+import { run } from './commands.js'
+import { failure, serialize } from './tools.js'
+import { setKeepAlive } from './provider.js'
+
+
+/*
+LONG-LIVED NODEJS WORKER FOR VITE BLOCKCHAIN API CALLS
+
+HOW TO USE:
+node <this_file_path>
+
+Read newline-delimited JSON requests from stdin:
+{"id": <int>, "command": <command>, "args": {<arg>: <value>, ...}}
+
+and write newline-delimited JSON responses to stdout:
+{"id": <int>, "error": 0|1, "msg": <str>, "data": <any>, "code": <str> (only when error is 1),
+ "timings": {<phase>: <ms>} (see timings.js)}
+
+Streaming commands (update, receive_batch) write event lines with the request
+id before the response: {"id": <int>, "event": <str>, ...}
+
+Commands and args are the same as in api_handler.js (args without dashes).
+Requests are handled concurrently, the VITE node connection is kept alive
+between calls. Logs are written to stderr, stdout carries only responses.
+*/
+
+
+// Keep stdout clean for responses, forward all logs to stderr
+console.log = (...args) => {process.stderr.write(args.join(' ') + '\n')}
+
+// Single failed call must not kill the worker
+process.on('uncaughtException', (error) => {console.log('>> worker error: ' + error)})
+process.on('unhandledRejection', (error) => {console.log('>> worker error: ' + error)})
+
+setKeepAlive(true)
+
+
+// Write single response line to stdout
+function reply(id, result) {
+    process.stdout.write(serialize({id: id, ...result}) + '\n')
+}
+
+
+const lines = readline.createInterface({input: process.stdin})
+
+lines.on('line', (line) => {
+    let request
+
+    try {
+        request = JSON.parse(line)
+    } catch (error) {
+        console.log('>> invalid request: ' + error.message)
+        return
+    }
+
+    run(request.command, request.args || {}, 0, (frame) => {reply(request.id, frame)})
+        .then((result) => {reply(request.id, result)})
+        .catch((error) => {reply(request.id, failure(error))})
+})
+
+// Python side closed stdin, nothing more to do
+lines.on('close', () => {process.exit(0)})